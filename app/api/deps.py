@@ -1,27 +1,37 @@
 """API dependencies."""
 
 from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
-from app.core.config import get_settings
+from app.api.exceptions import RateLimitError
 
-settings = get_settings()
 security = HTTPBasic()
 
 
 def get_current_user(
+    request: Request,
     credentials: Annotated[HTTPBasicCredentials, Depends(security)]
 ) -> str:
-    """Validate basic authentication credentials."""
+    """Validate basic authentication credentials and apply the rate limit.
+    
+    Both come from the app handling the request: its settings and its
+    ``rate_limiter`` (``None`` when rate limiting is off).
+    """
+    settings = request.app.state.settings
     if (
         credentials.username == settings.basic_auth_username
         and credentials.password == settings.basic_auth_password
     ):
+        rate_limiter = request.app.state.rate_limiter
+        if rate_limiter is not None:
+            wait = rate_limiter.acquire(credentials.username)
+            if wait:
+                raise RateLimitError(rate_limiter.retry_after(wait))
         return credentials.username
     
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication credentials",
         headers={"WWW-Authenticate": "Basic"},
-    )
\ No newline at end of file
+    )
@@ -48,4 +48,27 @@ class ConflictError(APIException):
             status_code=status.HTTP_409_CONFLICT,
             message=message,
             error_code="RESOURCE_CONFLICT"
-        )
\ No newline at end of file
+        )
+
+
+class GoneError(APIException):
+    """Requested resource is no longer available."""
+    
+    def __init__(self, message: str, error_code: str = "RESOURCE_GONE"):
+        super().__init__(
+            status_code=status.HTTP_410_GONE,
+            message=message,
+            error_code=error_code
+        )
+
+
+class RateLimitError(APIException):
+    """Too many requests from one principal."""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            message="Rate limit exceeded",
+            error_code="RATE_LIMITED",
+            headers={"Retry-After": str(retry_after)}
+        )
@@ -0,0 +1,274 @@
+"""Fast decoding of write request bodies.
+
+Validating small payloads through the full SQLModel/Pydantic machinery
+(and ``EmailStr`` in particular) costs far more than the write itself.
+Models used with ``FastBody`` get a schema compiled from their ``Field``
+definitions: a flat list of type and constraint checks applied to the
+decoded JSON, after which the model is built without validating again.
+
+The fast path only *accepts* input. Whenever a value is not one it can
+prove valid -- a wrong type, a failed constraint, an unusual email
+address, a model with custom validators -- it hands the input to the
+model's regular validation, so errors (and every edge case) are exactly
+those of the models.
+
+``FastJSONRoute`` decodes JSON bodies with ``orjson`` when it is
+installed, falling back to the stdlib for anything ``orjson`` rejects so
+decode errors are unchanged too.
+"""
+
+import json
+import re
+import types
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Type, Union, get_args, get_origin
+
+import annotated_types
+from fastapi import Request
+from fastapi.routing import APIRoute
+from pydantic import EmailStr
+from pydantic.fields import FieldInfo
+from pydantic_core import core_schema
+from sqlmodel import SQLModel
+
+from app.core.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib decoder is used instead
+    orjson = None
+
+settings = get_settings()
+
+# Email addresses accepted without email-validator: ASCII dot-atom local
+# part, lowercase domain with an alphabetic TLD. Anything else (quoted or
+# internationalized addresses, uppercase domains that would be normalized,
+# "Name <address>" forms) goes through the full validation.
+EMAIL_PATTERN = re.compile(
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}"
+)
+MAX_EMAIL_LENGTH = 254
+MAX_LOCAL_PART_LENGTH = 64
+# Domains email-validator rejects as special-use
+SPECIAL_USE_DOMAINS = ("arpa", "invalid", "local", "localhost", "onion", "test")
+
+
+def _is_plain_email(value: str) -> bool:
+    if len(value) > MAX_EMAIL_LENGTH or not EMAIL_PATTERN.fullmatch(value):
+        return False
+    local_part, domain = value.rsplit("@", 1)
+    if len(local_part) > MAX_LOCAL_PART_LENGTH or "--" in domain:
+        return False
+    return not any(domain == special or domain.endswith(f".{special}") for special in SPECIAL_USE_DOMAINS)
+
+
+@dataclass
+class FieldCheck:
+    """Checks for one field, compiled from its annotation and ``Field`` constraints."""
+
+    name: str
+    kind: type  # str, int or EmailStr
+    field: FieldInfo
+    nullable: bool
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+    gt: Optional[int] = None
+    ge: Optional[int] = None
+    lt: Optional[int] = None
+    le: Optional[int] = None
+
+    def accepts(self, value: Any) -> bool:
+        """Whether the value is certainly valid as it is, needing no coercion."""
+        if value is None:
+            return self.nullable
+        if self.kind is int:
+            if type(value) is not int:
+                return False
+            return not (
+                (self.gt is not None and value <= self.gt)
+                or (self.ge is not None and value < self.ge)
+                or (self.lt is not None and value >= self.lt)
+                or (self.le is not None and value > self.le)
+            )
+        if type(value) is not str:
+            return False
+        if not value.isascii():
+            try:
+                value.encode()
+            except UnicodeEncodeError:  # lone surrogates, rejected by Pydantic
+                return False
+        if (self.min_length is not None and len(value) < self.min_length) or \
+                (self.max_length is not None and len(value) > self.max_length):
+            return False
+        return self.kind is str or _is_plain_email(value)
+
+
+CONSTRAINTS = {
+    annotated_types.MinLen: "min_length",
+    annotated_types.MaxLen: "max_length",
+    annotated_types.Gt: "gt",
+    annotated_types.Ge: "ge",
+    annotated_types.Lt: "lt",
+    annotated_types.Le: "le",
+}
+
+
+def _compile_field(name: str, field) -> Optional[FieldCheck]:
+    """The checks for a field, or ``None`` if the fast path cannot handle it."""
+    annotation, nullable = field.annotation, False
+    if get_origin(annotation) in (Union, types.UnionType):
+        members = [member for member in get_args(annotation) if member is not type(None)]
+        if len(members) != 1:
+            return None
+        annotation, nullable = members[0], True
+    if annotation not in (str, int, EmailStr):
+        return None
+
+    check = FieldCheck(name, annotation, field, nullable)
+    for constraint in field.metadata:
+        attribute = CONSTRAINTS.get(type(constraint))
+        if attribute is not None:
+            setattr(check, attribute, getattr(constraint, attribute))
+        elif type(constraint).__module__.split(".")[0] != "sqlmodel":
+            # Anything but SQLModel's column options may constrain the value
+            return None
+    return check
+
+
+# Model options changing how values validate; models using them are never fast
+UNSUPPORTED_CONFIG = (
+    "strict", "validate_default", "str_strip_whitespace", "str_to_lower", "str_to_upper",
+    "str_min_length", "str_max_length",
+)
+
+
+class FastSchema:
+    """Compiled checks for a model; builds instances from input that passes them."""
+
+    def __init__(self, model: Type[SQLModel]):
+        self.model = model
+        decorators = model.__pydantic_decorators__
+        checks = [_compile_field(name, field) for name, field in model.model_fields.items()]
+        self.supported = (
+            all(check is not None for check in checks)
+            and not any(field.alias or field.validation_alias for field in model.model_fields.values())
+            and not (decorators.validators or decorators.field_validators
+                     or decorators.root_validators or decorators.model_validators)
+            and model.model_config.get("extra") in (None, "ignore")
+            and not any(model.model_config.get(option) for option in UNSUPPORTED_CONFIG)
+            and not model.__private_attributes__
+        )
+        self.checks: List[FieldCheck] = checks if self.supported else []
+
+    def decode(self, data: Any) -> Optional[SQLModel]:
+        """The model built from ``data``, or ``None`` if it needs full validation."""
+        if not self.supported or type(data) is not dict:
+            return None
+        values = {}
+        fields_set = set()
+        for check in self.checks:
+            if check.name in data:
+                value = data[check.name]
+                if not check.accepts(value):
+                    return None
+                values[check.name] = value
+                fields_set.add(check.name)
+            elif check.field.is_required():
+                return None
+            else:
+                values[check.name] = check.field.get_default(call_default_factory=True)
+
+        # What ``model_construct`` does, minus its per-call overhead
+        obj = self.model.__new__(self.model)
+        object.__setattr__(obj, "__dict__", values)
+        object.__setattr__(obj, "__pydantic_fields_set__", fields_set)
+        object.__setattr__(obj, "__pydantic_extra__", None)
+        object.__setattr__(obj, "__pydantic_private__", None)
+        return obj
+
+
+_schemas: Dict[type, FastSchema] = {}
+
+
+def get_schema(model: Type[SQLModel]) -> FastSchema:
+    """The compiled schema of a model, compiled on first use."""
+    schema = _schemas.get(model)
+    if schema is None:
+        schema = _schemas[model] = FastSchema(model)
+    return schema
+
+
+def validate(model: Type[SQLModel], data: Any) -> SQLModel:
+    """``model.model_validate(data)``, through the fast path when it applies."""
+    if settings.fast_body_enabled:
+        obj = get_schema(model).decode(data)
+        if obj is not None:
+            return obj
+    return model.model_validate(data)
+
+
+class FastBody:
+    """Marks a body parameter for fast decoding: ``Annotated[CustomerCreate, FastBody]``.
+
+    The parameter keeps its model's OpenAPI schema and validation errors.
+    """
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Type[SQLModel], handler) -> core_schema.CoreSchema:
+        schema = get_schema(source_type)
+
+        def decode(value: Any, validate_fully: Callable[[Any], SQLModel]) -> SQLModel:
+            if settings.fast_body_enabled:
+                obj = schema.decode(value)
+                if obj is not None:
+                    return obj
+            return validate_fully(value)
+
+        return core_schema.no_info_wrap_validator_function(decode, handler(source_type))
+
+
+def _has_float(value: Any) -> bool:
+    if type(value) is float:
+        return True
+    if type(value) is dict:
+        return any(_has_float(item) for item in value.values())
+    if type(value) is list:
+        return any(_has_float(item) for item in value)
+    return False
+
+
+def loads(body: bytes) -> Any:
+    """Decode JSON exactly as ``json.loads`` would, with ``orjson`` when installed."""
+    if orjson is None:
+        return json.loads(body)
+    try:
+        value = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        # Values orjson rejects (NaN, lone surrogates, ...) and real errors
+        return json.loads(body)
+    # orjson turns integers beyond 64 bits into floats; the stdlib keeps them
+    return json.loads(body) if _has_float(value) else value
+
+
+class FastJSONRequest(Request):
+    """Request decoding its JSON body with ``orjson`` when possible."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = loads(await self.body())
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """Route class decoding JSON bodies with ``orjson`` when it is installed."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if orjson is None or not settings.fast_body_enabled:
+            return handler
+
+        async def fast_json_handler(request: Request):
+            return await handler(FastJSONRequest(request.scope, request.receive))
+
+        return fast_json_handler
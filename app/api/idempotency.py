@@ -0,0 +1,217 @@
+"""``Idempotency-Key`` support for write requests.
+
+A POST, PATCH or DELETE carrying an ``Idempotency-Key`` header runs at
+most once per tenant, principal, route and key: the first response is
+stored and replayed for retries, marked with ``Idempotent-Replayed: true``.
+A retry arriving while the first request is still running waits for its
+result.
+Reusing a key with a different body is rejected with 422. Server errors
+and rate-limit rejections are not stored, so the request can be retried.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from app.services.idempotency import idempotency_service
+from app.db.tenancy import current_tenant
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+IDEMPOTENT_METHODS = frozenset({"POST", "PATCH", "DELETE"})
+
+MAX_KEY_LENGTH = 255
+
+# Responses that are not stored: the request may succeed when retried
+RETRYABLE_STATUS_CODES = frozenset({408, 429})
+
+# Delay between checks for a request running in another process
+POLL_INTERVAL_SECONDS = 0.05
+
+
+def _in_session(method, *args):
+    from app.db.db import get_engine
+
+    with Session(get_engine()) as session:
+        return method(session, *args)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware storing and replaying responses by idempotency key."""
+
+    def __init__(
+        self,
+        app,
+        path_prefix: str = "",
+        wait_timeout: float = settings.idempotency_wait_timeout_seconds
+    ):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.wait_timeout = wait_timeout
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in IDEMPOTENT_METHODS
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._error(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters", "INVALID_IDEMPOTENCY_KEY")
+            return
+
+        body = await self._read_body(receive)
+        key_hash = hashlib.sha256(b"\0".join([
+            (current_tenant.get() or "").encode(),
+            headers.get(b"authorization", b""),
+            scope["method"].encode(),
+            scope["path"].encode(),
+            key,
+        ])).hexdigest()
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        # Replay from memory, or wait for the same key running in this process
+        while True:
+            record = idempotency_service.cached(key_hash)
+            if record is not None:
+                await self._replay(send, record, request_hash)
+                return
+            in_flight = self._in_flight.get(key_hash)
+            if in_flight is None:
+                break
+            await asyncio.shield(in_flight)
+            if idempotency_service.cached(key_hash) is None:
+                # The first request failed and released the key; run again
+                continue
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[key_hash] = done
+        try:
+            claimed, record = await run_in_threadpool(_in_session, idempotency_service.claim, key_hash, request_hash)
+            if not claimed:
+                if record["status_code"] is None:
+                    record = await self._wait_for_other_process(key_hash)
+                if record is None:
+                    await self._error(send, 409, "A request with this Idempotency-Key is in progress or failed; retry later", "IDEMPOTENCY_KEY_IN_PROGRESS")
+                else:
+                    await self._replay(send, record, request_hash)
+                return
+
+            await self._execute(scope, receive, send, body, key_hash)
+        finally:
+            self._in_flight.pop(key_hash, None)
+            done.set_result(None)
+
+    async def _execute(self, scope, receive, send, body: bytes, key_hash: str) -> None:
+        """Run the request, streaming the response while capturing it."""
+        response = {"status": None, "content_type": None, "body": []}
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode()
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        renewal = asyncio.ensure_future(self._renew_claim(key_hash))
+        try:
+            try:
+                await self.app(scope, replay_receive, capture_send)
+            finally:
+                renewal.cancel()
+        except BaseException:
+            await run_in_threadpool(_in_session, idempotency_service.release, key_hash)
+            raise
+
+        status_code = response["status"]
+        if status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS_CODES:
+            await run_in_threadpool(_in_session, idempotency_service.release, key_hash)
+        else:
+            await run_in_threadpool(
+                _in_session,
+                idempotency_service.complete,
+                key_hash,
+                status_code,
+                response["content_type"],
+                b"".join(response["body"]),
+            )
+
+    async def _renew_claim(self, key_hash: str) -> None:
+        """Keep the claim's lease from running out while the request runs."""
+        interval = idempotency_service.claim_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(_in_session, idempotency_service.renew, key_hash)
+            except Exception as e:
+                logger.warning(f"Could not renew idempotency claim: {e}")
+
+    async def _wait_for_other_process(self, key_hash: str) -> Optional[dict]:
+        """Poll until a request running elsewhere stores its response."""
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            record = await run_in_threadpool(_in_session, idempotency_service.get, key_hash)
+            if record is None or record["status_code"] is not None:
+                return record
+        return None
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _replay(self, send, record: dict, request_hash: str) -> None:
+        if record["request_hash"] != request_hash:
+            await self._error(send, 422, "Idempotency-Key was already used with a different request", "IDEMPOTENCY_KEY_REUSED")
+            return
+        headers = [
+            (b"content-length", str(len(record["body"])).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        if record["content_type"]:
+            headers.append((b"content-type", record["content_type"].encode()))
+        await send({"type": "http.response.start", "status": record["status_code"], "headers": headers})
+        await send({"type": "http.response.body", "body": record["body"]})
+
+    async def _error(self, send, status_code: int, message: str, error_code: str) -> None:
+        body = json.dumps({"success": False, "message": message, "error_code": error_code}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
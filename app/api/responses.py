@@ -23,6 +23,12 @@ class PaginatedResponse(BaseModel, Generic[T]):
     pages: int
 
 
+class CursorPage(BaseModel, Generic[T]):
+    """Keyset-paginated response model."""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
 class ErrorResponse(BaseModel):
     """Error response model."""
     success: bool = False
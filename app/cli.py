@@ -0,0 +1,239 @@
+"""Command line entry point for maintenance tasks.
+
+Usage: python -m app.cli [--tenant NAME | --all-tenants] <command> [options]
+"""
+
+import argparse
+import sys
+
+from sqlmodel import Session
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging, get_logger
+from app.db.db import get_engine, create_db_and_tables
+from app.db.tenancy import current_tenant
+
+logger = get_logger(__name__)
+
+
+def analytics_refresh(args: argparse.Namespace) -> None:
+    """Fold new transactions into the analytics rollups."""
+    from app.services.analytics import analytics_service
+
+    with Session(get_engine()) as session:
+        processed = analytics_service.refresh(session)
+    print(f"Refreshed analytics: {processed} transactions processed")
+
+
+def analytics_rebuild(args: argparse.Namespace) -> None:
+    """Rebuild the analytics rollups from scratch."""
+    from app.services.analytics import analytics_service
+
+    with Session(get_engine()) as session:
+        processed = analytics_service.rebuild(session)
+    print(f"Rebuilt analytics: {processed} transactions processed")
+
+
+def transactions_close_days(args: argparse.Namespace) -> None:
+    """Precompute daily transaction buckets for closed days."""
+    from app.services.analytics import analytics_service
+
+    with Session(get_engine()) as session:
+        days = analytics_service.close_days(session)
+    print(f"Closed daily buckets: {days} days with transactions")
+
+
+def billing_run(args: argparse.Namespace) -> None:
+    """Run (or resume) the billing run for a period."""
+    import json
+
+    from app.services.billing import billing_service
+
+    with Session(get_engine()) as session:
+        run = billing_service.run(session, args.period, args.workers, args.chunk_size, processes=True)
+        report = billing_service.get_report(session, run.id)
+    if not args.chunks:
+        report.pop("chunks")
+    print(json.dumps(report, indent=2, default=str))
+
+
+def invoices_generate(args: argparse.Namespace) -> None:
+    """Generate invoices for all transactions not yet invoiced."""
+    from app.services.invoice import invoice_service
+
+    with Session(get_engine()) as session:
+        run = invoice_service.generate(session, args.workers, processes=True)
+    print(f"Invoice run {run.id}: {run.invoices_created} invoices")
+
+
+def search_rebuild(args: argparse.Namespace) -> None:
+    """Rebuild the customer search index."""
+    from app.db.search import rebuild_search_index
+
+    rebuild_search_index(get_engine())
+    print("Rebuilt customer search index")
+
+
+def changes_compact(args: argparse.Namespace) -> None:
+    """Remove superseded change log entries and expired tombstones."""
+    from app.services.changes import change_service
+
+    with Session(get_engine()) as session:
+        result = change_service.compact(session)
+    print(f"Compacted change log: {result['superseded_removed']} superseded, {result['tombstones_removed']} tombstones removed")
+
+
+def idempotency_purge(args: argparse.Namespace) -> None:
+    """Delete expired idempotency records."""
+    from app.services.idempotency import idempotency_service
+
+    with Session(get_engine()) as session:
+        purged = idempotency_service.purge_expired(session)
+    print(f"Purged {purged} expired idempotency records")
+
+
+def customers_purge(args: argparse.Namespace) -> None:
+    """Run unfinished purge jobs for soft-deleted customers."""
+    from app.services.purge import purge_service
+
+    with Session(get_engine()) as session:
+        jobs = purge_service.run_pending(session)
+    print(f"Completed {len(jobs)} customer purge jobs")
+
+
+def transactions_archive(args: argparse.Namespace) -> None:
+    """Move transactions older than the horizon into the archive table."""
+    from app.services.archive import archive_service
+
+    with Session(get_engine()) as session:
+        moved = archive_service.archive(session, args.horizon_days, args.max_chunks)
+        stats = archive_service.get_stats(session)
+    print(f"Archived {moved} transactions ({stats['hot_transactions']} hot, {stats['archived_transactions']} archived)")
+
+
+def plans_recount(args: argparse.Namespace) -> None:
+    """Recompute the active member count of every plan."""
+    from app.services.plan import plan_service
+
+    with Session(get_engine()) as session:
+        plan_service.recount_members(session)
+    print("Recounted plan members")
+
+
+def plan_operations_run(args: argparse.Namespace) -> None:
+    """Run unfinished bulk plan operations."""
+    from app.services.plan_operations import plan_operation_service
+
+    with Session(get_engine()) as session:
+        operations = plan_operation_service.run_pending(session)
+    print(f"Completed {len(operations)} plan operations")
+
+
+def migrate(args: argparse.Namespace) -> None:
+    """Apply schema migrations and run their backfills to completion."""
+    from app.db.migrations import migration_runner
+
+    if args.batch_size:
+        migration_runner.batch_size = args.batch_size
+    if args.throttle is not None:
+        migration_runner.throttle_seconds = args.throttle
+    rows = migration_runner.run_backfills(get_engine())
+    pending = [m["version"] for m in migration_runner.get_status(get_engine()) if m["status"] != "completed"]
+    print(f"Migrated: {rows} rows backfilled" + (f", still pending: {pending}" if pending else ""))
+
+
+def migrate_status(args: argparse.Namespace) -> None:
+    """Show applied migrations and backfill progress."""
+    import json
+
+    from app.db.migrations import migration_runner
+
+    print(json.dumps(migration_runner.get_status(get_engine()), indent=2, default=str))
+
+
+def openapi_export(args: argparse.Namespace) -> None:
+    """Write the OpenAPI schema to the cache file loaded at startup."""
+    from app.core.startup import save_openapi
+    from app.main import app
+
+    path = args.path or get_settings().openapi_cache_path
+    if not path:
+        logger.error("Pass a path or set OPENAPI_CACHE_PATH")
+        sys.exit(1)
+    save_openapi(app, path)
+    print(f"Wrote OpenAPI schema to {path}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with all subcommands."""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    shards = parser.add_mutually_exclusive_group()
+    shards.add_argument("--tenant", default=None, help="Run against this tenant's database")
+    shards.add_argument("--all-tenants", action="store_true", help="Run against the default and every tenant database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("analytics-refresh", help=analytics_refresh.__doc__).set_defaults(func=analytics_refresh)
+    commands.add_parser("analytics-rebuild", help=analytics_rebuild.__doc__).set_defaults(func=analytics_rebuild)
+    commands.add_parser("transactions-close-days", help=transactions_close_days.__doc__).set_defaults(func=transactions_close_days)
+
+    billing = commands.add_parser("billing-run", help=billing_run.__doc__)
+    billing.add_argument("period", help="Billing period (YYYY-MM)")
+    billing.add_argument("--workers", type=int, default=1, help="Parallel worker processes")
+    billing.add_argument("--chunk-size", type=int, default=None, help="Customer ids per chunk")
+    billing.add_argument("--chunks", action="store_true", help="Include per-chunk timing in the report")
+    billing.set_defaults(func=billing_run)
+
+    invoices = commands.add_parser("invoices-generate", help=invoices_generate.__doc__)
+    invoices.add_argument("--workers", type=int, default=1, help="Parallel worker processes")
+    invoices.set_defaults(func=invoices_generate)
+
+    archive = commands.add_parser("transactions-archive", help=transactions_archive.__doc__)
+    archive.add_argument("--horizon-days", type=int, default=None, help="Archive transactions older than this")
+    archive.add_argument("--max-chunks", type=int, default=None, help="Stop after this many chunks")
+    archive.set_defaults(func=transactions_archive)
+
+    commands.add_parser("plans-recount", help=plans_recount.__doc__).set_defaults(func=plans_recount)
+    commands.add_parser("plan-operations-run", help=plan_operations_run.__doc__).set_defaults(func=plan_operations_run)
+    commands.add_parser("customers-purge", help=customers_purge.__doc__).set_defaults(func=customers_purge)
+    commands.add_parser("search-rebuild", help=search_rebuild.__doc__).set_defaults(func=search_rebuild)
+    commands.add_parser("changes-compact", help=changes_compact.__doc__).set_defaults(func=changes_compact)
+    commands.add_parser("idempotency-purge", help=idempotency_purge.__doc__).set_defaults(func=idempotency_purge)
+
+    migrations = commands.add_parser("migrate", help=migrate.__doc__)
+    migrations.add_argument("--batch-size", type=int, default=None, help="Rows per backfill batch")
+    migrations.add_argument("--throttle", type=float, default=None, help="Seconds to pause between batches")
+    migrations.set_defaults(func=migrate)
+    commands.add_parser("migrate-status", help=migrate_status.__doc__).set_defaults(func=migrate_status)
+
+    openapi = commands.add_parser("openapi-export", help=openapi_export.__doc__)
+    openapi.add_argument("path", nargs="?", default=None, help="Output file (default: OPENAPI_CACHE_PATH)")
+    openapi.set_defaults(func=openapi_export)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run a maintenance command."""
+    args = build_parser().parse_args(argv)
+    setup_logging()
+    create_db_and_tables()
+    if args.all_tenants:
+        tenants = [None, *get_settings().tenants]
+    else:
+        tenants = [args.tenant]
+    for tenant in tenants:
+        if tenant is not None and tenant not in get_settings().tenants:
+            logger.error(f"Unknown tenant: {tenant}")
+            return 1
+        if len(tenants) > 1:
+            print(f"[{tenant or 'default'}]")
+        token = current_tenant.set(tenant)
+        try:
+            args.func(args)
+        finally:
+            current_tenant.reset(token)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
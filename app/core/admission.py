@@ -0,0 +1,203 @@
+"""Admission control: concurrency limits and load shedding.
+
+Requests are split into a read and a write class, each with its own
+concurrency limit and bounded FIFO wait queue. A request that finds the
+queue full, waits longer than the queue deadline, or arrives while the
+class's observed latency breaches the SLO is rejected straight away with
+``503`` and ``Retry-After`` instead of adding to the backlog.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Deque, Iterable, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.1
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(reason)
+
+
+class RequestClass:
+    """Concurrency slots and wait queue for one class of requests."""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float, latency_slo_ms: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_slo_ms = latency_slo_ms
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.latency_ms = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0, "latency_slo": 0}
+
+    @property
+    def slo_breached(self) -> bool:
+        """Whether recent latency is above the SLO."""
+        return self.latency_ms > self.latency_slo_ms
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if allowed."""
+        while self._waiters and self._waiters[0].done():
+            self._waiters.popleft()
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if self.slo_breached:
+            self._reject("latency_slo")
+        if len(self._waiters) >= self.queue_size:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the deadline passed
+                self.release()
+            else:
+                waiter.cancel()
+            self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the next live waiter."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def observe(self, latency_ms: float) -> None:
+        """Fold a request's latency into the moving average."""
+        self.latency_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.latency_ms)
+
+    def _reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+        raise Overloaded(reason)
+
+    def get_stats(self) -> dict:
+        """Current load and counters."""
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": sum(not waiter.done() for waiter in self._waiters),
+            "queue_size": self.queue_size,
+            "latency_ewma_ms": round(self.latency_ms, 3),
+            "latency_slo_ms": self.latency_slo_ms,
+            "slo_breached": self.slo_breached,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying admission control to HTTP requests."""
+
+    def __init__(
+        self,
+        app,
+        read_concurrency: int,
+        read_queue: int,
+        write_concurrency: int,
+        write_queue: int,
+        queue_timeout: float,
+        latency_slo_ms: float,
+        retry_after: int,
+        exempt_paths: Iterable[str] = (),
+    ):
+        self.app = app
+        self.classes = {
+            "read": RequestClass("read", read_concurrency, read_queue, queue_timeout, latency_slo_ms),
+            "write": RequestClass("write", write_concurrency, write_queue, queue_timeout, latency_slo_ms),
+        }
+        self.retry_after = retry_after
+        self.exempt_paths = frozenset(exempt_paths)
+        admission_controllers.append(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        request_class = self.classes["read" if scope["method"] in READ_METHODS else "write"]
+        started = time.perf_counter()
+        try:
+            await request_class.acquire()
+        except Overloaded as e:
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {request_class.name} {e.reason}")
+            await self._reject(send, e.reason)
+            return
+
+        observed = False
+
+        async def send_and_observe(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                request_class.observe((time.perf_counter() - started) * 1000)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            request_class.release()
+
+    async def _reject(self, send, reason: str) -> None:
+        body = json.dumps({
+            "success": False,
+            "message": "Service overloaded, retry later",
+            "error_code": "OVERLOADED",
+            "reason": reason,
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def get_stats(self) -> dict:
+        """Stats per request class."""
+        return {name: request_class.get_stats() for name, request_class in self.classes.items()}
+
+
+# Middleware instances built by the app, for the admin endpoint
+admission_controllers: list[AdmissionControlMiddleware] = []
+
+
+def get_admission_stats() -> Optional[dict]:
+    """Stats of the most recently built admission middleware, if any."""
+    return admission_controllers[-1].get_stats() if admission_controllers else None
@@ -1,7 +1,7 @@
 """Application configuration management."""
 
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 from functools import lru_cache
@@ -29,13 +29,147 @@ class Settings(BaseSettings):
     
     # Logging
     log_level: str = "INFO"
+    log_file: str = "logs/app.log"  # empty: log to stdout only
     
-    @field_validator("cors_origins", mode='before')
+    # Startup phases (skip table creation and demo data in production)
+    startup_create_tables: bool = True
+    startup_seed_demo_data: bool = True
+    startup_refresh_analytics: bool = True
+    startup_build_entitlement_index: bool = True
+    openapi_cache_path: str = ""  # e.g. openapi.json, written by the openapi-export command
+    
+    # Multi-worker mode (python -m app.server)
+    web_concurrency: int = 0  # Worker processes; 0 means one per available CPU
+    worker_graceful_timeout_seconds: float = 30.0  # In-flight requests get this long to finish on shutdown
+    
+    # Readiness probe (/ready) and shutdown drain
+    ready_cache_ttl_seconds: float = 1.0
+    ready_db_timeout_seconds: float = 2.0
+    ready_max_db_latency_ms: float = 250.0
+    ready_min_pool_headroom: int = 1  # Free connections (pool and overflow) required
+    ready_max_loop_lag_ms: float = 200.0
+    shutdown_drain_delay_seconds: float = 0.0  # Keep serving this long after SIGTERM with /ready failing
+    shutdown_drain_timeout_seconds: float = 15.0  # Background work gets this long to finish after the requests
+    
+    # Cache shared by the workers (plans)
+    shared_cache_slots: int = 16_384
+    shared_cache_slot_bytes: int = 1_024
+    shared_cache_key_generations: int = 65_536
+    shared_cache_ttl_seconds: float = 60.0  # Bounds staleness after writes by other programs (e.g. the CLI)
+    
+    # Schema migrations (backfills run in small committed batches while serving)
+    migration_backfill_in_background: bool = True  # Run pending backfills in a thread at startup
+    migration_backfill_batch_size: int = 2_000
+    migration_backfill_throttle_seconds: float = 0.05  # Pause between batches, leaving room for writes
+    migration_backfill_lease_seconds: int = 60
+    
+    # Maintenance scheduler (each job runs on one worker per interval, elected through a lease row)
+    scheduler_enabled: bool = True
+    scheduler_initial_delay_seconds: float = 30.0  # Leaves startup traffic alone
+    scheduler_jitter_ratio: float = 0.1  # Random extra delay, as a fraction of the interval
+    scheduler_time_budget_seconds: float = 30.0  # Per run; longer runs are reported as failed
+    scheduler_interval_seconds: Dict[str, float] = {}  # Per-job overrides, e.g. {"analyze": 7200}; 0 disables a job
+    
+    # Analytics
+    analytics_refresh_chunk_size: int = 50_000
+    timeseries_daily_buckets: bool = True
+    
+    # Billing
+    billing_chunk_size: int = 1_000
+    billing_chunk_lease_seconds: int = 600
+    
+    # Invoicing
+    invoice_batch_size: int = 10_000
+    
+    # Customer purge
+    purge_chunk_size: int = 1_000
+    purge_throttle_seconds: float = 0.05
+    
+    # Bulk plan operations
+    plan_operation_chunk_size: int = 2_000
+    plan_operation_throttle_seconds: float = 0.01
+    plan_operation_lease_seconds: int = 300  # Renewed with every chunk
+    
+    # Transaction archive (cold storage for old transactions)
+    archive_horizon_days: int = 365
+    archive_chunk_size: int = 5_000
+    archive_database_path: str | None = None  # SQLite only: keep the archive in an attached file
+    
+    # Change feed
+    change_log_tombstone_retention_hours: int = 168
+    change_stream_keepalive_seconds: int = 15
+    
+    # Webhooks
+    webhooks_enabled: bool = True
+    webhook_batch_size: int = 50
+    webhook_claim_limit: int = 500
+    webhook_claim_lease_seconds: int = 300
+    webhook_max_concurrency_per_endpoint: int = 4
+    webhook_max_connections: int = 100
+    webhook_timeout_seconds: float = 10.0
+    webhook_max_attempts: int = 8
+    webhook_backoff_base_seconds: float = 1.0
+    webhook_backoff_max_seconds: float = 600.0
+    webhook_poll_interval_seconds: float = 5.0
+    
+    # Fast decoding of write request bodies (falls back to full validation)
+    fast_body_enabled: bool = True
+    
+    # Request coalescing, opt-in (endpoint names as used by the routers: get_customer, get_plan, get_plans)
+    single_flight_endpoints: List[str] = []
+    
+    # Entitlement index (changes from other processes are synced at this interval)
+    entitlement_sync_interval_seconds: float = 1.0
+    
+    # Admission control (reads are GET/HEAD/OPTIONS, writes everything else)
+    admission_control_enabled: bool = True
+    admission_read_concurrency: int = 64
+    admission_read_queue: int = 256
+    admission_write_concurrency: int = 16
+    admission_write_queue: int = 64
+    admission_queue_timeout_seconds: float = 2.0
+    admission_latency_slo_ms: float = 1_000.0
+    admission_retry_after_seconds: int = 1
+    admission_exempt_paths: List[str] = ["/health", "/ready"]  # The change stream under api_v1_prefix is always exempt
+    
+    # Rate limiting per authenticated principal
+    rate_limit_enabled: bool = True
+    rate_limit_per_second: float = 100.0
+    rate_limit_burst: int = 200
+    
+    # Idempotency keys
+    idempotency_ttl_hours: int = 24
+    idempotency_cache_size: int = 10_000
+    idempotency_wait_timeout_seconds: float = 30.0
+    idempotency_claim_lease_seconds: int = 60  # Renewed while the request runs; a claim not renewed for this long can be taken over
+    
+    # Connection pool (per engine)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 300  # Not used for SQLite
+    db_pool_warmup_connections: int = 2
+    db_query_cache_size: int = 500  # Compiled statements cached per engine
+    
+    # Read replicas: safe requests read from these, writes go to database_url
+    database_read_urls: List[str] = []
+    replica_routing: str = "round_robin"  # round_robin or least_loaded
+    replica_health_check_seconds: float = 10.0
+    read_your_writes_seconds: float = 5.0
+    
+    # Multi-tenancy: requests carrying the tenant header use that tenant's database
+    tenants: List[str] = []  # Known tenant ids; empty disables tenant routing
+    tenant_header: str = "X-Tenant-ID"
+    tenant_database_url: str = "sqlite:///./tenants/{tenant}.db"
+    tenant_engine_cache_size: int = 16
+    
+    @field_validator("cors_origins", "single_flight_endpoints", "admission_exempt_paths", "tenants",
+                     "database_read_urls", mode='before')
     @classmethod
     def assemble_cors_origins(cls, v):
-        """Parse CORS origins from string or list."""
+        """Parse CORS origins (or other name lists) from string or list."""
         if isinstance(v, str):
-            return [i.strip() for i in v.split(",")]
+            return [i.strip() for i in v.split(",") if i.strip()]
         return v
     
     class Config:
@@ -12,19 +12,19 @@ settings = get_settings()
 
 def setup_logging() -> None:
     """Configure application logging."""
-    
-    # Create logs directory if it doesn't exist
-    logs_dir = "logs"
-    os.makedirs(logs_dir, exist_ok=True)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.log_file:
+        # Create the log file's directory if it doesn't exist
+        logs_dir = os.path.dirname(settings.log_file)
+        if logs_dir:
+            os.makedirs(logs_dir, exist_ok=True)
+        handlers.append(logging.FileHandler(settings.log_file))
     
     # Configure root logger
     logging.basicConfig(
         level=getattr(logging, settings.log_level.upper()),
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(os.path.join(logs_dir, "app.log"))
-        ]
+        handlers=handlers
     )
     
     # Configure specific loggers
@@ -0,0 +1,40 @@
+"""Token-bucket rate limiting per principal."""
+
+import math
+import threading
+import time
+from typing import Dict, Tuple
+
+
+class TokenBucketLimiter:
+    """One token bucket per key, refilled continuously.
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate`` tokens
+    per second; a request spends one token. Safe to call from threadpool
+    workers.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Spend a token for ``key``.
+
+        Returns 0 if allowed, else the seconds until a token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    def retry_after(self, wait: float) -> int:
+        """Whole seconds for a ``Retry-After`` header."""
+        return max(1, math.ceil(wait))
@@ -0,0 +1,146 @@
+"""Readiness probe and shutdown drain state.
+
+``/health`` only says the process is up. ``/ready`` says whether it
+should get traffic: startup has finished (so the pool is warm), a
+``SELECT 1`` on the primary database comes back in time, the connection
+pool has free connections and the event loop is not lagging. The result
+is cached for a short time so frequent probes cost one check, and
+concurrent probes share it.
+
+Once the process starts shutting down, ``drain`` is set and ``/ready``
+fails at once, so load balancers stop sending traffic while in-flight
+requests and background work finish.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from .config import Settings, get_settings
+from .logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class Drain:
+    """Whether the process is shutting down, and since when."""
+
+    def __init__(self):
+        self.started: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        return self.started is not None
+
+    def begin(self, reason: str = "shutdown") -> None:
+        """Mark the process as draining; safe to call from a signal handler."""
+        if self.started is None:
+            self.started = time.monotonic()
+            logger.info(f"Draining ({reason})")
+
+    def reset(self) -> None:
+        """Serve again, as an app starting up in this process does."""
+        self.started = None
+
+
+class ReadinessProbe:
+    """Cached checks of whether this process can serve traffic."""
+
+    def __init__(
+        self,
+        cache_ttl: float = settings.ready_cache_ttl_seconds,
+        db_timeout: float = settings.ready_db_timeout_seconds,
+        max_db_latency_ms: float = settings.ready_max_db_latency_ms,
+        min_pool_headroom: int = settings.ready_min_pool_headroom,
+        max_loop_lag_ms: float = settings.ready_max_loop_lag_ms
+    ):
+        self.cache_ttl = cache_ttl
+        self.db_timeout = db_timeout
+        self.max_db_latency_ms = max_db_latency_ms
+        self.min_pool_headroom = min_pool_headroom
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._pending: Optional[asyncio.Future] = None
+
+    def configure(self, config: Settings) -> None:
+        """Use the readiness settings of ``config``, dropping the cached result."""
+        self.cache_ttl = config.ready_cache_ttl_seconds
+        self.db_timeout = config.ready_db_timeout_seconds
+        self.max_db_latency_ms = config.ready_max_db_latency_ms
+        self.min_pool_headroom = config.ready_min_pool_headroom
+        self.max_loop_lag_ms = config.ready_max_loop_lag_ms
+        self._result = None
+        self._checked_at = 0.0
+
+    async def check(self, started: bool = True) -> dict:
+        """The latest result, checking again once it is older than the TTL."""
+        if drain.draining:
+            return {"ready": False, "status": "draining", "checks": {}}
+        if not started:
+            return {"ready": False, "status": "starting", "checks": {}}
+        if self._result is not None and time.monotonic() - self._checked_at < self.cache_ttl:
+            return self._result
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(self._run_checks())
+        return await asyncio.shield(self._pending)
+
+    async def _run_checks(self) -> dict:
+        checks = {
+            "event_loop": await self._check_loop_lag(),
+            "pool": self._check_pool(),
+            "database": await self._check_database(),
+        }
+        ready = all(check["ok"] for check in checks.values())
+        result = {"ready": ready, "status": "ready" if ready else "not_ready", "checks": checks}
+        if not ready and (self._result is None or self._result["ready"]):
+            failed = ", ".join(name for name, check in checks.items() if not check["ok"])
+            logger.warning(f"Not ready: {failed} check failed")
+        self._result = result
+        self._checked_at = time.monotonic()
+        return result
+
+    async def _check_loop_lag(self) -> dict:
+        # Time until the loop gets back to us: how long ready callbacks are waiting
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.sleep(0)
+        lag_ms = (loop.time() - started) * 1000
+        return {"ok": lag_ms <= self.max_loop_lag_ms, "lag_ms": round(lag_ms, 2), "max_lag_ms": self.max_loop_lag_ms}
+
+    async def _check_database(self) -> dict:
+        from sqlalchemy import text
+        from app.db.db import engine
+
+        def ping() -> float:
+            started = time.perf_counter()
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return (time.perf_counter() - started) * 1000
+
+        try:
+            latency_ms = await asyncio.wait_for(asyncio.to_thread(ping), self.db_timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"no response within {self.db_timeout:g} s"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)[:200]}
+        return {
+            "ok": latency_ms <= self.max_db_latency_ms,
+            "latency_ms": round(latency_ms, 2),
+            "max_latency_ms": self.max_db_latency_ms,
+        }
+
+    def _check_pool(self) -> dict:
+        from app.db.db import engine
+        from app.db.pool import pool_headroom
+
+        headroom = pool_headroom(engine)
+        if headroom is None:
+            return {"ok": True, "headroom": None}
+        return {"ok": headroom >= self.min_pool_headroom, "headroom": headroom, "min_headroom": self.min_pool_headroom}
+
+
+# Process-wide instances
+drain = Drain()
+readiness_probe = ReadinessProbe()
@@ -0,0 +1,116 @@
+"""Timed application startup phases and the cached OpenAPI schema."""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+
+from fastapi import FastAPI
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+APP_PACKAGE = Path(__file__).resolve().parents[1]
+
+
+class StartupReport:
+    """Durations of the phases an application went through to start."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[dict] = []
+        self.total_ms: Optional[float] = None
+
+    def record(self, name: str, ms: Optional[float]) -> None:
+        """Record a phase timed elsewhere; ``None`` marks it skipped."""
+        self.phases.append({"name": name, "ms": round(ms, 2) if ms is not None else None, "skipped": ms is None})
+
+    def run(self, name: str, func: Callable[[], Any], enabled: bool = True) -> Any:
+        """Run and time a phase, or record it as skipped."""
+        if not enabled:
+            self.record(name, None)
+            return None
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    async def run_async(self, name: str, func: Callable[[], Awaitable[Any]], enabled: bool = True) -> Any:
+        """Run and time an async phase, or record it as skipped."""
+        if not enabled:
+            self.record(name, None)
+            return None
+        started = time.perf_counter()
+        try:
+            return await func()
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def finish(self) -> None:
+        """Mark startup complete and log the breakdown."""
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        breakdown = ", ".join(
+            f"{phase['name']} {'skipped' if phase['skipped'] else str(phase['ms']) + ' ms'}"
+            for phase in self.phases
+        )
+        logger.info(f"Started in {self.total_ms} ms ({breakdown})")
+
+    def to_dict(self) -> dict:
+        return {"total_ms": self.total_ms, "phases": self.phases}
+
+
+def openapi_fingerprint(app: FastAPI) -> str:
+    """Identify the code a cached schema was generated from.
+
+    Hashes the application's title, version and Python sources, so any
+    code change invalidates the cache.
+    """
+    digest = hashlib.sha256(f"{app.title}\0{app.version}".encode())
+    for source in sorted(APP_PACKAGE.rglob("*.py")):
+        digest.update(str(source.relative_to(APP_PACKAGE)).encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def cache_openapi(app: FastAPI) -> None:
+    """Serve the first schema generated or loaded, never regenerating it."""
+    def openapi() -> dict:
+        if not app.openapi_schema:
+            app.openapi_schema = FastAPI.openapi(app)
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
+def load_openapi(app: FastAPI, path: Optional[str]) -> bool:
+    """Use the schema stored at ``path`` if it matches this application."""
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable OpenAPI cache {path}: {e}")
+        return False
+    if cached.get("fingerprint") != openapi_fingerprint(app):
+        logger.info(f"OpenAPI cache {path} is stale, generating the schema")
+        return False
+    app.openapi_schema = cached["schema"]
+    return True
+
+
+def save_openapi(app: FastAPI, path: str) -> None:
+    """Generate the schema if needed and store it at ``path``."""
+    schema = app.openapi()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write a temporary file first so readers never see a partial schema
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": openapi_fingerprint(app), "schema": schema}, f)
+    os.replace(temporary, path)
@@ -1,50 +1,195 @@
 """Database configuration and session management."""
 
-from typing import Annotated, Generator
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Annotated, Generator, Optional
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import Session, SQLModel, create_engine, select
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
 from app.core.logging import get_logger
+from app.core.readiness import drain
+from app.core.startup import StartupReport
+from app.db.search import create_search_index
+from app.db.tenancy import EngineRegistry, current_tenant
+from app.db.replicas import ReplicaPool, RoutingSession, replica_reads_allowed
+from app.db.pool import InstrumentedQueuePool, warm_up
+from app.models.archive import ARCHIVE_SCHEMA
 
 settings = get_settings()
 logger = get_logger(__name__)
 
-# Check if using SQLite
-is_sqlite = settings.database_url.startswith("sqlite")
+def _pool_options(database_url: str) -> dict:
+    """Pool sizing from the settings; in-memory SQLite keeps its own pool."""
+    if make_url(database_url).database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
 
-# Create engine with appropriate settings
-if is_sqlite:
-    # SQLite specific settings
-    engine = create_engine(
-        settings.database_url,
-        echo=settings.debug,
-        connect_args={"check_same_thread": False}
-    )
-else:
+
+def build_engine(database_url: str, archive_database_path: Optional[str] = None) -> Engine:
+    """Create an engine with the settings for its database type.
+    
+    Without ``archive_database_path``, archived rows live in the main
+    database: the archive schema is translated away on every statement.
+    """
+    execution_options = {} if archive_database_path else {"schema_translate_map": {ARCHIVE_SCHEMA: None}}
+    if database_url.startswith("sqlite"):
+        # SQLite specific settings
+        sqlite_engine = create_engine(
+            database_url,
+            echo=settings.debug,
+            connect_args={"check_same_thread": False},
+            query_cache_size=settings.db_query_cache_size,
+            execution_options=execution_options,
+            **_pool_options(database_url),
+        )
+        
+        if archive_database_path:
+            @event.listens_for(sqlite_engine, "connect")
+            def attach_archive(dbapi_connection, connection_record) -> None:
+                """Attach the archive file so cold rows stay out of the main file."""
+                dbapi_connection.execute("ATTACH DATABASE ? AS archive", (archive_database_path,))
+        
+        return sqlite_engine
+    
     # Other databases (PostgreSQL, MySQL, etc.)
-    engine = create_engine(
-        settings.database_url,
+    return create_engine(
+        database_url,
         echo=settings.debug,
         pool_pre_ping=True,
-        pool_recycle=300,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        query_cache_size=settings.db_query_cache_size,
+        execution_options=execution_options,
+        **_pool_options(database_url),
+    )
+
+
+# Check if using SQLite
+is_sqlite = settings.database_url.startswith("sqlite")
+
+# Engine of the default database
+engine = build_engine(settings.database_url, settings.archive_database_path)
+
+
+def _build_replica_pool() -> ReplicaPool:
+    """Engines of the read replicas of the default database."""
+    return ReplicaPool(
+        [build_engine(url, settings.archive_database_path) for url in settings.database_read_urls],
+        policy=settings.replica_routing,
+        check_interval=settings.replica_health_check_seconds,
     )
 
 
-def create_db_and_tables() -> None:
-    """Create database tables."""
+replica_pool = _build_replica_pool()
+
+
+def create_db_and_tables(target: Optional[Engine] = None) -> None:
+    """Create database tables (on the default database unless ``target`` is given).
+    
+    Tables of an existing database are brought up to date by the schema
+    migrations; their backfills run separately (see ``app.db.migrations``).
+    """
+    import app.models  # noqa: F401 - register all tables on the metadata
+    from app.db.migrations import migration_runner
+    
+    target = target or engine
     try:
-        SQLModel.metadata.create_all(engine)
-        logger.info("Database tables created successfully")
+        fresh = not inspect(target).get_table_names()
+        if fresh and target.dialect.name == "sqlite":
+            with target.connect() as conn:
+                # Only takes effect before the first table; lets the file shrink
+                # through the maintenance scheduler's incremental_vacuum job
+                conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        SQLModel.metadata.create_all(target)
+        migration_runner.upgrade(target, stamp=fresh)
+        create_search_index(target)
+        logger.info(f"Database tables created successfully on {target.url.render_as_string(hide_password=True)}")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
         raise
 
 
+def _build_tenant_engine(tenant: str) -> Engine:
+    """Create a tenant's engine and its tables."""
+    database_url = settings.tenant_database_url.format(tenant=tenant)
+    database = make_url(database_url).database
+    if database_url.startswith("sqlite") and database and database != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    
+    archive_database_path = None
+    if settings.archive_database_path:
+        path = Path(settings.archive_database_path)
+        archive_database_path = str(path.with_name(f"{path.stem}_{tenant}{path.suffix}"))
+    
+    tenant_engine = build_engine(database_url, archive_database_path)
+    create_db_and_tables(tenant_engine)
+    return tenant_engine
+
+
+# Engines of tenant databases, opened on first use
+tenant_engines = EngineRegistry(_build_tenant_engine, settings.tenant_engine_cache_size)
+
+# Settings the engines above are built from
+ENGINE_SETTINGS = (
+    "database_url", "archive_database_path", "database_read_urls", "replica_routing",
+    "replica_health_check_seconds", "tenant_database_url", "tenant_engine_cache_size",
+    "db_pool_size", "db_max_overflow", "db_pool_timeout_seconds", "db_pool_recycle_seconds",
+    "db_query_cache_size", "debug",
+)
+
+
+def configure(config: Settings) -> None:
+    """Use ``config`` for the database layer, rebuilding the engines if it changes them.
+    
+    The engines are process-wide: ``create_app`` calls this with the
+    settings it was given, so an app created for another database
+    really uses it. Code must look the engines up through this module
+    (or ``get_engine``) rather than keep references from import time.
+    """
+    global settings, is_sqlite, engine, replica_pool, tenant_engines
+    
+    rebuild = any(getattr(config, name) != getattr(settings, name) for name in ENGINE_SETTINGS)
+    settings = config
+    if not rebuild:
+        return
+    tenant_engines.dispose_all()
+    replica_pool.dispose()
+    engine.dispose()
+    is_sqlite = settings.database_url.startswith("sqlite")
+    engine = build_engine(settings.database_url, settings.archive_database_path)
+    replica_pool = _build_replica_pool()
+    tenant_engines = EngineRegistry(_build_tenant_engine, settings.tenant_engine_cache_size)
+    logger.info(f"Database engines built for {engine.url.render_as_string(hide_password=True)}")
+
+
+def get_engine(tenant: Optional[str] = None) -> Engine:
+    """Engine of ``tenant``, or of the current request's tenant."""
+    tenant = tenant or current_tenant.get()
+    return tenant_engines.get(tenant) if tenant else engine
+
+
+def get_read_engine() -> Engine:
+    """Engine for read-only work: a replica when the request allows it."""
+    if current_tenant.get() is None and replica_reads_allowed.get():
+        return replica_pool.choose() or engine
+    return get_engine()
+
+
 def seed_demo_data() -> None:
     """Seed database with demo data for portfolio showcase."""
     from app.models import Customer, Plan, Transaction, CustomerPlan
+    from app.services.plan import plan_service
     
     with Session(engine) as session:
         # Check if data already exists
@@ -96,6 +241,7 @@ def seed_demo_data() -> None:
         for assoc in associations:
             session.add(assoc)
         session.commit()
+        plan_service.recount_members(session)
         
         # Create demo transactions
         transactions = [
@@ -115,26 +261,125 @@ def seed_demo_data() -> None:
         logger.info(f"Demo data seeded: {len(customers)} customers, {len(plans)} plans, {len(transactions)} transactions")
 
 
+def refresh_analytics(target: Optional[Engine] = None) -> int:
+    """Fold transactions written since the last run into the rollups; returns how many."""
+    from app.services.analytics import analytics_service
+    
+    with Session(target or engine) as session:
+        processed = analytics_service.refresh(session)
+        if settings.timeseries_daily_buckets:
+            analytics_service.close_days(session)
+    return processed
+
+
+def build_entitlement_index() -> None:
+    """Load active memberships into the in-memory entitlement index."""
+    from app.services.entitlements import entitlement_service
+    
+    with Session(engine) as session:
+        entitlement_service.build(session)
+
+
+def warm_up_pools() -> None:
+    """Open idle connections to the primary and replicas ahead of traffic."""
+    for target in (engine, *(replica.engine for replica in replica_pool.replicas)):
+        opened = warm_up(target, min(settings.db_pool_warmup_connections, settings.db_pool_size))
+        logger.info(f"Warmed up {opened} connections to {target.url.render_as_string(hide_password=True)}")
+
+
+def start_migration_backfills() -> None:
+    """Run unfinished migration backfills of every database in the background."""
+    from app.db.migrations import migration_runner
+    
+    migration_runner.start_background(lambda: [engine, *(get_engine(tenant) for tenant in settings.tenants)])
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> Generator:
-    """Application lifespan manager."""
-    # Startup
+    """Application lifespan manager.
+    
+    Each startup phase is timed into ``app.state.startup``; table creation,
+    demo data, the analytics refresh and the entitlement index can be
+    turned off through the settings the app was created with. Pending
+    migration backfills run in a background thread while serving, the
+    entitlement indexes are synced from the change feed, and the
+    maintenance scheduler runs periodic housekeeping. On shutdown, after
+    the server has finished in-flight requests, background work is given
+    until ``shutdown_drain_timeout_seconds`` to finish before the engines
+    are disposed.
+    """
+    # Startup; a previous app in this process may have drained
     logger.info("Starting up application...")
-    create_db_and_tables()
-    seed_demo_data()  # Seed demo data on startup
+    drain.reset()
+    report = getattr(app.state, "startup", None) or StartupReport()
+    config = getattr(app.state, "settings", settings)
+    report.run("create_tables", create_db_and_tables, config.startup_create_tables)
+    report.run("seed_demo_data", seed_demo_data, config.startup_seed_demo_data)
+    report.run("refresh_analytics", refresh_analytics, config.startup_refresh_analytics)
+    report.run("build_entitlement_index", build_entitlement_index, config.startup_build_entitlement_index)
+    report.run("warm_up_pools", warm_up_pools, config.db_pool_warmup_connections > 0)
+    dispatchers = []
+    if config.webhooks_enabled:
+        from app.services.webhooks import webhook_dispatcher, WebhookDispatcher, webhook_service
+        dispatchers = [webhook_dispatcher, *(WebhookDispatcher(webhook_service, tenant=tenant) for tenant in config.tenants)]
+    
+    async def start_dispatchers() -> None:
+        for dispatcher in dispatchers:
+            await dispatcher.start()
+    
+    await report.run_async("start_webhook_dispatchers", start_dispatchers, bool(dispatchers))
+    from app.services.entitlements import entitlement_service
+    
+    async def start_entitlement_sync() -> None:
+        await entitlement_service.start(config.entitlement_sync_interval_seconds)
+    
+    await report.run_async("start_entitlement_sync", start_entitlement_sync, config.entitlement_sync_interval_seconds > 0)
+    report.run("start_migration_backfills", start_migration_backfills, config.migration_backfill_in_background)
+    from app.services.maintenance import maintenance_scheduler
+    
+    async def start_scheduler() -> None:
+        await maintenance_scheduler.start(config.scheduler_initial_delay_seconds, tenants=config.tenants)
+    
+    await report.run_async("start_maintenance_scheduler", start_scheduler, config.scheduler_enabled)
     yield
-    # Shutdown
+    # Shutdown: background work gets until the drain deadline to finish
     logger.info("Shutting down application...")
+    drain.begin()
+    deadline = time.monotonic() + config.shutdown_drain_timeout_seconds
+    
+    def remaining() -> float:
+        return max(deadline - time.monotonic(), 0.0)
+    
+    if config.migration_backfill_in_background:
+        from app.db.migrations import migration_runner
+        await asyncio.to_thread(migration_runner.stop, remaining())
+    for dispatcher in dispatchers:
+        await dispatcher.stop(remaining())
+    await entitlement_service.stop()
+    await maintenance_scheduler.stop(remaining())
+    logger.info(f"Drained in {(time.monotonic() - drain.started) * 1000:.0f} ms")
+    tenant_engines.dispose_all()
+    replica_pool.dispose()
+    engine.dispose()
 
 
 def get_session() -> Generator[Session, None, None]:
-    """Get database session."""
-    with Session(engine) as session:
+    """Get a database session for the current tenant.
+    
+    Reads of safe requests on the default database go to a replica when
+    replicas are configured; see ``app.db.replicas``.
+    """
+    replica = None
+    if current_tenant.get() is None and replica_reads_allowed.get():
+        replica = replica_pool.choose()
+    with RoutingSession(get_engine(), replica) as session:
         try:
             yield session
         except Exception as e:
             logger.error(f"Database session error: {e}")
             session.rollback()
+            if replica is not None and isinstance(e, DBAPIError):
+                replica_pool.mark_failed(replica, e)
             raise
         finally:
             session.close()
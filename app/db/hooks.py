@@ -0,0 +1,53 @@
+"""Session commit hooks.
+
+Services register callbacks with ``on_commit`` for side effects that must
+only happen once their changes are durable (cache updates, notifying
+listeners). Callbacks are dropped if the session rolls back instead.
+"""
+
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlmodel import Session as SQLModelSession
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_CALLBACKS_KEY = "after_commit_callbacks"
+
+
+def on_commit(db: Session, callback: Callable[[], None]) -> None:
+    """Run ``callback`` after the session's current transaction commits."""
+    db.info.setdefault(_CALLBACKS_KEY, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session: Session) -> None:
+    for callback in session.info.pop(_CALLBACKS_KEY, []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error in after-commit callback {callback!r}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_callbacks(session: Session) -> None:
+    session.info.pop(_CALLBACKS_KEY, None)
+
+
+class SingleCommitSession(SQLModelSession):
+    """Session whose ``commit`` only flushes until ``commit_all`` is called.
+
+    Service methods commit their own work; calling several of them on this
+    session applies them in one database transaction. Commit callbacks wait
+    for the real commit, and a rollback discards the work of every call.
+    """
+
+    def commit(self) -> None:
+        self.flush()
+
+    def commit_all(self) -> None:
+        """Commit everything done in the session."""
+        super().commit()
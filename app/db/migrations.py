@@ -0,0 +1,351 @@
+"""Online schema migrations with batched backfills.
+
+Each ``Migration`` has a schema step and, optionally, a ``Backfill``.
+The schema step only makes additive changes that are quick on a live
+table (a nullable or constant-default column, a missing index) and is
+recorded in the ``SchemaMigration`` version table in the same
+transaction. The backfill then fills the new column in small batches of
+primary-key ranges, each committed on its own together with the cursor,
+with a pause between batches. Writes are never blocked for longer than a
+batch, and an interrupted backfill resumes from its last committed batch.
+
+Only one process runs a given backfill at a time: it holds a lease on
+the version row, renewed with every batch. Rows inserted after the
+backfill starts are written by code that already sets the new column.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Type
+
+from sqlalchemy import Column, ColumnElement, inspect, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel, func
+
+from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+from app.models import (
+    Customer, CustomerPlan, IdempotencyRecord, JobStatusEnum, Plan, PlanOperation, SchemaMigration, StatusEnum, Transaction,
+)
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def add_column(conn: Connection, model: Type[SQLModel], name: str) -> bool:
+    """Add a model's column to its table unless it exists; ``True`` if added.
+
+    The column gets its server default only when that is a constant;
+    expressions such as ``now()`` cannot be added to existing rows
+    cheaply (SQLite rejects them outright), so those columns are added
+    nullable and left to a backfill.
+    """
+    table = model.__table__
+    if name in {column["name"] for column in inspect(conn).get_columns(table.name)}:
+        return False
+    column: Column = table.c[name]._copy()
+    default = column.server_default
+    if default is not None and not isinstance(getattr(default, "arg", None), str):
+        column.server_default = None
+        column.nullable = True
+    if column.server_default is None:
+        column.nullable = True
+    preparer = conn.dialect.identifier_preparer
+    spec = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {spec}")
+    logger.info(f"Added column {table.name}.{name}")
+    return True
+
+
+def create_indexes(conn: Connection, *models: Type[SQLModel]) -> None:
+    """Create the models' indexes missing on their tables (all tables if none given)."""
+    tables = [model.__table__ for model in models] or list(SQLModel.metadata.sorted_tables)
+    existing = set(inspect(conn).get_table_names())
+    for table in tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+@dataclass
+class Backfill:
+    """Column values to set, batch by batch, on the rows matching ``where``."""
+
+    model: Type[SQLModel]
+    values: Dict[str, ColumnElement]
+    where: Optional[Callable[[], ColumnElement]] = None
+
+    @property
+    def key(self) -> Column:
+        (key,) = self.model.__table__.primary_key.columns
+        return key
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    backfill: Optional[Backfill] = field(default=None)
+
+
+def _transaction_timestamps(conn: Connection) -> None:
+    add_column(conn, Transaction, "plan_id")
+    add_column(conn, Transaction, "created_at")
+    create_indexes(conn, Transaction)
+
+
+def _customer_soft_delete(conn: Connection) -> None:
+    add_column(conn, Customer, "deleted_at")
+    create_indexes(conn, Customer)
+
+
+def _plan_member_counts(conn: Connection) -> None:
+    add_column(conn, Plan, "active_member_count")
+
+
+def _plan_operation_leases(conn: Connection) -> None:
+    add_column(conn, PlanOperation, "claim_token")
+    add_column(conn, PlanOperation, "lease_expires_at")
+
+
+def _active_member_count() -> ColumnElement:
+    return (
+        select(func.count())
+        .where(CustomerPlan.plan_id == Plan.id, CustomerPlan.status == StatusEnum.active)
+        .scalar_subquery()
+    )
+
+
+# In order; never change or reorder released migrations, only append
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1, "transaction plan and timestamps", _transaction_timestamps,
+        # The real creation time of old rows is unknown: they get the migration time
+        Backfill(Transaction, {"created_at": func.now()}, where=lambda: Transaction.created_at.is_(None)),
+    ),
+    Migration(2, "customer soft delete", _customer_soft_delete),
+    Migration(
+        3, "plan active member counts", _plan_member_counts,
+        Backfill(Plan, {"active_member_count": _active_member_count()}),
+    ),
+    Migration(4, "missing indexes", lambda conn: create_indexes(conn)),
+    Migration(5, "plan operation leases", _plan_operation_leases),
+    Migration(6, "idempotency claim leases", lambda conn: add_column(conn, IdempotencyRecord, "claimed_until")),
+]
+
+
+class MigrationRunner:
+    """Applies schema steps and runs their backfills."""
+
+    def __init__(
+        self,
+        migrations: List[Migration] = MIGRATIONS,
+        batch_size: int = settings.migration_backfill_batch_size,
+        throttle_seconds: float = settings.migration_backfill_throttle_seconds,
+        lease_seconds: int = settings.migration_backfill_lease_seconds
+    ):
+        self.migrations = migrations
+        self.batch_size = batch_size
+        self.throttle_seconds = throttle_seconds
+        self.lease_seconds = lease_seconds
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def configure(self, config: Settings) -> None:
+        """Use the backfill settings of ``config``."""
+        self.batch_size = config.migration_backfill_batch_size
+        self.throttle_seconds = config.migration_backfill_throttle_seconds
+        self.lease_seconds = config.migration_backfill_lease_seconds
+
+    def upgrade(self, engine: Engine, stamp: bool = False) -> int:
+        """Apply the schema steps not yet recorded; returns how many were applied.
+
+        With ``stamp`` (a database just created from the models) every
+        migration is recorded as done without running it.
+        """
+        SchemaMigration.__table__.create(engine, checkfirst=True)
+        with engine.connect() as conn:
+            applied = set(conn.scalars(select(SchemaMigration.version)))
+
+        count = 0
+        for migration in self.migrations:
+            if migration.version in applied:
+                continue
+            now = datetime.now(timezone.utc)
+            done = stamp or migration.backfill is None
+            try:
+                with engine.begin() as conn:
+                    # Recording the version first makes concurrent upgrades wait here
+                    conn.execute(insert(SchemaMigration).values(
+                        version=migration.version,
+                        name=migration.name,
+                        status=JobStatusEnum.completed if done else JobStatusEnum.pending,
+                        applied_at=now,
+                        finished_at=now if done else None,
+                    ))
+                    if not stamp:
+                        migration.upgrade(conn)
+            except IntegrityError:
+                # Another process applied it
+                continue
+            count += 1
+            if not stamp:
+                logger.info(f"Applied migration {migration.version} ({migration.name})")
+        if stamp and count:
+            logger.info(f"Stamped {count} migrations as applied")
+        return count
+
+    def _claim(self, conn: Connection, version: int) -> bool:
+        now = datetime.now(timezone.utc)
+        claimed = conn.execute(
+            update(SchemaMigration)
+            .where(
+                SchemaMigration.version == version,
+                SchemaMigration.status != JobStatusEnum.completed,
+                SchemaMigration.lease_expires_at.is_(None) | (SchemaMigration.lease_expires_at < now),
+            )
+            .values(status=JobStatusEnum.running, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        ).rowcount
+        conn.commit()
+        return bool(claimed)
+
+    def backfill(self, engine: Engine, migration: Migration) -> Optional[int]:
+        """Run one migration's backfill; rows updated, or ``None`` if not claimed."""
+        backfill = migration.backfill
+        key = backfill.key
+        version_row = SchemaMigration.version == migration.version
+        total = 0
+        with engine.connect() as conn:
+            if not self._claim(conn, migration.version):
+                return None
+            try:
+                row = conn.execute(select(SchemaMigration).where(version_row)).one()
+                last_id = row.backfill_last_id
+                if last_id is None:
+                    last_id = conn.scalar(select(func.max(key))) or 0
+                    conn.execute(update(SchemaMigration).where(version_row).values(backfill_last_id=last_id))
+                    conn.commit()
+                cursor = row.backfill_cursor
+                logger.info(f"Backfilling migration {migration.version} ({migration.name}) from id {cursor} to {last_id}")
+
+                while cursor < last_id:
+                    if self._stop.is_set():
+                        conn.execute(update(SchemaMigration).where(version_row).values(lease_expires_at=None))
+                        conn.commit()
+                        logger.info(f"Paused backfill of migration {migration.version} at id {cursor}")
+                        return total
+                    # Upper bound of the next batch_size ids, skipping gaps
+                    upper = conn.scalar(
+                        select(key).where(key > cursor, key <= last_id)
+                        .order_by(key).offset(self.batch_size - 1).limit(1)
+                    ) or last_id
+                    conditions = [key > cursor, key <= upper]
+                    if backfill.where is not None:
+                        conditions.append(backfill.where())
+                    updated = conn.execute(update(backfill.model).where(*conditions).values(backfill.values)).rowcount
+                    conn.execute(
+                        update(SchemaMigration).where(version_row).values(
+                            backfill_cursor=upper,
+                            rows_backfilled=SchemaMigration.rows_backfilled + updated,
+                            lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds),
+                        )
+                    )
+                    conn.commit()
+                    cursor = upper
+                    total += updated
+                    logger.debug(f"Migration {migration.version}: backfilled up to id {cursor} of {last_id}")
+                    if self.throttle_seconds:
+                        self._stop.wait(self.throttle_seconds)
+
+                conn.execute(update(SchemaMigration).where(version_row).values(
+                    status=JobStatusEnum.completed,
+                    lease_expires_at=None,
+                    finished_at=datetime.now(timezone.utc),
+                    error=None,
+                ))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                conn.execute(update(SchemaMigration).where(version_row).values(
+                    status=JobStatusEnum.failed, lease_expires_at=None, error=str(e)[:255],
+                ))
+                conn.commit()
+                logger.error(f"Backfill of migration {migration.version} failed: {e}")
+                raise
+        logger.info(f"Backfilled migration {migration.version} ({migration.name}): {total} rows")
+        return total
+
+    def run_backfills(self, engine: Engine) -> int:
+        """Run every unfinished backfill not held by another process; returns rows updated."""
+        with engine.connect() as conn:
+            unfinished = set(conn.scalars(
+                select(SchemaMigration.version).where(SchemaMigration.status != JobStatusEnum.completed)
+            ))
+        total = 0
+        for migration in self.migrations:
+            if migration.version in unfinished and migration.backfill is not None and not self._stop.is_set():
+                total += self.backfill(engine, migration) or 0
+        return total
+
+    def get_status(self, engine: Engine) -> List[dict]:
+        """Every known migration with its backfill progress."""
+        with engine.connect() as conn:
+            rows = {row.version: row for row in conn.execute(select(SchemaMigration))}
+        status = []
+        for migration in self.migrations:
+            row = rows.get(migration.version)
+            entry = {"version": migration.version, "name": migration.name, "status": "not_applied"}
+            if row is not None:
+                entry.update({
+                    "status": row.status.value if isinstance(row.status, JobStatusEnum) else row.status,
+                    "applied_at": row.applied_at,
+                    "finished_at": row.finished_at,
+                    "error": row.error,
+                })
+                if migration.backfill is not None:
+                    progress = None
+                    if row.backfill_last_id is not None:
+                        progress = 1.0 if not row.backfill_last_id else min(row.backfill_cursor / row.backfill_last_id, 1.0)
+                    if entry["status"] == JobStatusEnum.completed.value:
+                        progress = 1.0
+                    entry["backfill"] = {
+                        "cursor": row.backfill_cursor,
+                        "last_id": row.backfill_last_id,
+                        "rows_backfilled": row.rows_backfilled,
+                        "progress": round(progress, 4) if progress is not None else None,
+                    }
+            status.append(entry)
+        return status
+
+    def start_background(self, engines: Callable[[], List[Engine]]) -> None:
+        """Run the pending backfills of ``engines()`` in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run() -> None:
+            for engine in engines():
+                if self._stop.is_set():
+                    return
+                try:
+                    self.run_backfills(engine)
+                except Exception as e:
+                    logger.error(f"Background backfill on {engine.url.render_as_string(hide_password=True)} stopped: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="migration-backfill", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Pause a background backfill after its current batch."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Process-wide instance
+migration_runner = MigrationRunner()
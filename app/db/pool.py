@@ -0,0 +1,133 @@
+"""Connection pool instrumentation and warmup."""
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Checkouts waiting longer than this count as waits
+WAIT_THRESHOLD_MS = 1.0
+
+
+class PoolTelemetry:
+    """Checkout counters of one pool, kept across pool re-creation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.saturated = 0
+        self.timeouts = 0
+
+    def record(self, wait_ms: float, saturated: bool, timed_out: bool) -> None:
+        """Record one checkout attempt."""
+        with self._lock:
+            self.checkouts += 1
+            self.saturated += saturated
+            self.timeouts += timed_out
+            if wait_ms >= WAIT_THRESHOLD_MS:
+                self.waits += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 3),
+                "saturated_checkouts": self.saturated,
+                "timeouts": self.timeouts,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` timing every checkout.
+
+    A checkout is *saturated* when all ``pool_size + max_overflow``
+    connections were in use as it started, and times out when no
+    connection was returned within ``pool_timeout``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.telemetry = PoolTelemetry()
+
+    def _do_get(self):
+        saturated = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.telemetry.record((time.perf_counter() - started) * 1000, saturated, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+def warm_up(engine: Engine, connections: int) -> int:
+    """Open and ping up to ``connections`` pooled connections at once.
+
+    They are returned to the pool idle, so the first requests do not pay
+    for connecting. Returns the number of connections opened.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Pool warmup stopped after {len(opened)} connections: {e}")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def pool_headroom(engine: Engine) -> Optional[int]:
+    """Connections that can still be checked out without waiting; ``None`` if unbounded."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return None
+    return pool.size() + pool._max_overflow - pool.checkedout()
+
+
+def get_pool_stats(engine: Engine) -> dict:
+    """Pool occupancy, checkout telemetry and compiled cache size of an engine."""
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    telemetry = getattr(pool, "telemetry", None)
+    if telemetry is not None:
+        stats.update(telemetry.get_stats())
+    cache = engine._compiled_cache
+    stats["compiled_cache"] = {
+        "entries": len(cache) if cache is not None else 0,
+        "capacity": cache.capacity if cache is not None else 0,
+    }
+    return stats
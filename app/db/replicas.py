@@ -0,0 +1,201 @@
+"""Read-replica routing.
+
+Reads of safe (``GET``/``HEAD``) requests go to a healthy replica picked
+round-robin or by fewest checked-out connections; everything else goes to
+the primary. After a successful write, the client is pinned to the primary
+for ``read_your_writes_seconds`` through a cookie (or the
+``X-Read-Primary-Until`` header for clients without cookies), so it reads
+its own writes despite replication lag.
+"""
+
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import List, Optional
+
+from sqlalchemy import Select, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Whether the current request may read from a replica
+replica_reads_allowed: ContextVar[bool] = ContextVar("replica_reads_allowed", default=False)
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+PRIMARY_COOKIE = "read_primary_until"
+PRIMARY_HEADER = "x-read-primary-until"
+
+ROUTING_POLICIES = ("round_robin", "least_loaded")
+
+
+class Replica:
+    """A replica engine and its last health check."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = 0.0
+        self.failures = 0
+        self.reads = 0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaPool:
+    """Healthy replicas to read from.
+
+    Each replica is probed with ``SELECT 1`` when its last check is older
+    than ``check_interval``; a replica that fails a probe or a query is
+    skipped until a later probe succeeds. With no healthy replica, reads
+    fall back to the primary.
+    """
+
+    def __init__(self, engines: List[Engine], policy: str = "round_robin", check_interval: float = 10.0):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown replica routing policy: {policy}")
+        self.replicas = [Replica(engine) for engine in engines]
+        self.policy = policy
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[Engine]:
+        """Pick a healthy replica, or ``None`` to use the primary."""
+        healthy = [replica for replica in self.replicas if self._is_healthy(replica)]
+        if not healthy:
+            return None
+        if self.policy == "least_loaded":
+            replica = min(healthy, key=lambda r: getattr(r.engine.pool, "checkedout", lambda: 0)())
+        else:
+            replica = healthy[next(self._counter) % len(healthy)]
+        replica.reads += 1
+        return replica.engine
+
+    def _is_healthy(self, replica: Replica) -> bool:
+        now = time.monotonic()
+        if now - replica.checked_at < self.check_interval:
+            return replica.healthy
+        with self._lock:
+            if now - replica.checked_at < self.check_interval:
+                return replica.healthy
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                if not replica.healthy:
+                    logger.info(f"Replica {replica.name} is healthy again")
+                replica.healthy = True
+            except Exception as e:
+                self._mark_unhealthy(replica, e)
+            replica.checked_at = time.monotonic()
+            return replica.healthy
+
+    def mark_failed(self, engine: Engine, error: Exception) -> None:
+        """Take a replica out of rotation after a failed query."""
+        for replica in self.replicas:
+            if replica.engine is engine:
+                self._mark_unhealthy(replica, error)
+                replica.checked_at = time.monotonic()
+
+    def _mark_unhealthy(self, replica: Replica, error: Exception) -> None:
+        if replica.healthy:
+            logger.warning(f"Replica {replica.name} is unhealthy, reading from the primary: {error}")
+        replica.healthy = False
+        replica.failures += 1
+
+    def dispose(self) -> None:
+        """Dispose every replica engine."""
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def get_stats(self) -> dict:
+        """Health and read counts per replica."""
+        return {
+            "policy": self.policy,
+            "replicas": [
+                {
+                    "url": replica.name,
+                    "healthy": replica.healthy,
+                    "reads": replica.reads,
+                    "failures": replica.failures,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+
+class RoutingSession(Session):
+    """Session sending plain reads to a replica and the rest to the primary.
+
+    Once the session has flushed or run a write statement, all later
+    statements use the primary so the session sees its own writes.
+    """
+
+    def __init__(self, primary: Engine, replica: Optional[Engine] = None, **kwargs):
+        super().__init__(bind=primary, **kwargs)
+        self.replica = replica
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if self.replica is not None and not self.info.get("wrote"):
+            if not self._flushing and isinstance(clause, Select) and clause._for_update_arg is None:
+                return self.replica
+            self.info["wrote"] = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware deciding which requests may read from a replica.
+
+    Successful non-safe requests set the primary pin; safe requests read
+    from a replica unless the client is still pinned.
+    """
+
+    def __init__(self, app, pin_seconds: float):
+        self.app = app
+        self.pin_seconds = pin_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in READ_METHODS:
+            token = replica_reads_allowed.set(not self._pinned(scope))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                replica_reads_allowed.reset(token)
+            return
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = f"{time.time() + self.pin_seconds:.3f}"
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", (
+                        f"{PRIMARY_COOKIE}={until}; Max-Age={max(1, round(self.pin_seconds))}; "
+                        "Path=/; HttpOnly; SameSite=Lax"
+                    ).encode()),
+                    (PRIMARY_HEADER.encode(), until.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+    def _pinned(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        until = headers.get(PRIMARY_HEADER.encode(), b"").decode("latin-1")
+        if not until and b"cookie" in headers:
+            morsel = SimpleCookie(headers[b"cookie"].decode("latin-1")).get(PRIMARY_COOKIE)
+            until = morsel.value if morsel else ""
+        try:
+            return float(until) > time.time()
+        except ValueError:
+            return False
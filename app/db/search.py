@@ -0,0 +1,122 @@
+"""Full-text search index for customers.
+
+On SQLite the index is an external-content FTS5 table using the trigram
+tokenizer (substring and prefix matches), kept in sync by triggers on
+``customer``. On PostgreSQL a ``pg_trgm`` GIN index over the same columns
+serves ``ILIKE`` lookups.
+"""
+
+from sqlalchemy import Engine, text
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+SEARCH_COLUMNS = ("name", "email", "description")
+
+_SQLITE_TABLE = """
+CREATE VIRTUAL TABLE customer_fts USING fts5(
+    name, email, description,
+    content='customer', content_rowid='id', tokenize='trigram'
+)
+"""
+
+_SQLITE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_fts_ai AFTER INSERT ON customer BEGIN
+        INSERT INTO customer_fts(rowid, name, email, description)
+        VALUES (new.id, new.name, new.email, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_fts_ad AFTER DELETE ON customer BEGIN
+        INSERT INTO customer_fts(customer_fts, rowid, name, email, description)
+        VALUES ('delete', old.id, old.name, old.email, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_fts_au AFTER UPDATE ON customer BEGIN
+        INSERT INTO customer_fts(customer_fts, rowid, name, email, description)
+        VALUES ('delete', old.id, old.name, old.email, old.description);
+        INSERT INTO customer_fts(rowid, name, email, description)
+        VALUES (new.id, new.name, new.email, new.description);
+    END
+    """,
+)
+
+# Expression indexed with pg_trgm; must match the one used by the search query
+POSTGRES_SEARCH_EXPRESSION = (
+    "(coalesce(name, '') || ' ' || coalesce(email, '') || ' ' || coalesce(description, ''))"
+)
+
+_POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_customer_search_trgm ON customer "
+    f"USING gin ({POSTGRES_SEARCH_EXPRESSION} gin_trgm_ops)",
+)
+
+
+# Engines (by URL) on which the search index could be created
+_available: dict[str, bool] = {}
+
+
+def _index_exists(engine: Engine) -> bool:
+    """Check whether the search index exists in the database."""
+    if engine.dialect.name == "postgresql":
+        query = "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_customer_search_trgm'"
+    else:
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customer_fts'"
+    with engine.connect() as conn:
+        return conn.execute(text(query)).first() is not None
+
+
+def search_backend(engine: Engine) -> str:
+    """Name of the search backend used for an engine."""
+    url = str(engine.url)
+    if url not in _available:
+        _available[url] = _index_exists(engine)
+    if not _available[url]:
+        return "like"
+    return "postgres_trgm" if engine.dialect.name == "postgresql" else "sqlite_fts5"
+
+
+def create_search_index(engine: Engine) -> bool:
+    """Create the search index (and SQLite sync triggers) if missing.
+
+    Failures are logged rather than raised: without the index, search
+    falls back to ``LIKE`` scans.
+    """
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                for statement in _POSTGRES_DDL:
+                    conn.execute(text(statement))
+                _available[str(engine.url)] = True
+                return True
+
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customer_fts'")
+            ).first()
+            if not exists:
+                conn.execute(text(_SQLITE_TABLE))
+                conn.execute(text("INSERT INTO customer_fts(customer_fts) VALUES ('rebuild')"))
+                logger.info("Customer search index created")
+            for statement in _SQLITE_TRIGGERS:
+                conn.execute(text(statement))
+    except Exception as e:
+        logger.warning(f"Customer search index unavailable, falling back to LIKE: {e}")
+        _available[str(engine.url)] = False
+        return False
+
+    _available[str(engine.url)] = True
+    return True
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Rebuild the search index from the customer table."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("REINDEX INDEX ix_customer_search_trgm"))
+        else:
+            conn.execute(text("INSERT INTO customer_fts(customer_fts) VALUES ('rebuild')"))
+    logger.info("Customer search index rebuilt")
@@ -0,0 +1,242 @@
+"""Cache in shared memory, readable by every worker process.
+
+The cache is one anonymous ``mmap`` allocated by the launcher before it
+forks the workers, so all of them map the same pages:
+
+- a table of namespace generations,
+- a table of key generations (keys hash onto these slots),
+- the entry slots; a key hashes onto exactly one slot, and a newer entry
+  simply replaces whatever the slot held.
+
+Each entry records the namespace and key generations current when its
+value was *read from the source*. Invalidating bumps a generation, which
+every worker sees at once, and makes entries written with the old one
+stale. Because callers take a ``stamp`` of the generations before loading
+a value, a value loaded concurrently with an invalidation is never
+served afterwards. Slots are written under striped process-shared locks
+and read lock-free through a per-slot sequence number.
+"""
+
+import hashlib
+import json
+import mmap
+import multiprocessing
+import struct
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from app.db.tenancy import current_tenant
+from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+MAGIC = b"MAPICACH"
+NAMESPACE_SLOTS = 64
+LOCK_STRIPES = 64
+
+# sequence, namespace generation, key generation, key hash, expiry, key length, value length
+ENTRY_HEADER = struct.Struct("<IQIQdHI")
+
+Stamp = Tuple[int, int]
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+class SharedCache:
+    """Hash-slot cache of JSON values shared by forked worker processes.
+
+    Until ``allocate`` is called the cache is disabled: reads miss and
+    writes are dropped. Keys are scoped to the current tenant.
+    """
+
+    def __init__(
+        self,
+        slots: int = settings.shared_cache_slots,
+        slot_size: int = settings.shared_cache_slot_bytes,
+        key_generations: int = settings.shared_cache_key_generations,
+        ttl_seconds: float = settings.shared_cache_ttl_seconds
+    ):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.key_generations = key_generations
+        self.ttl_seconds = ttl_seconds
+        self._buffer: Optional[mmap.mmap] = None
+        self._locks = []
+        self._stats_lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.too_large = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._buffer is not None
+
+    def configure(self, config: Settings) -> None:
+        """Use the shared cache settings of ``config``; the layout is fixed once allocated."""
+        self.ttl_seconds = config.shared_cache_ttl_seconds
+        layout = (config.shared_cache_slots, config.shared_cache_slot_bytes, config.shared_cache_key_generations)
+        if self.enabled:
+            if layout != (self.slots, self.slot_size, self.key_generations):
+                logger.warning("Shared cache already allocated; keeping its slot layout")
+            return
+        self.slots, self.slot_size, self.key_generations = layout
+
+    @property
+    def _key_generations_offset(self) -> int:
+        return len(MAGIC) + NAMESPACE_SLOTS * 8
+
+    @property
+    def _slots_offset(self) -> int:
+        return self._key_generations_offset + self.key_generations * 4
+
+    def allocate(self) -> None:
+        """Map the shared memory; call once, before forking workers."""
+        if self._buffer is not None:
+            return
+        size = self._slots_offset + self.slots * self.slot_size
+        self._buffer = mmap.mmap(-1, size)
+        self._buffer[:len(MAGIC)] = MAGIC
+        context = multiprocessing.get_context("fork")
+        self._locks = [context.Lock() for _ in range(LOCK_STRIPES)]
+        logger.info(f"Allocated shared cache: {self.slots} slots of {self.slot_size} bytes ({size // 1024} KiB)")
+
+    def _scoped(self, namespace: str, key: Any = "") -> Tuple[str, str]:
+        tenant = current_tenant.get() or ""
+        return f"{tenant}/{namespace}", f"{tenant}/{namespace}/{key}"
+
+    def _namespace_offset(self, namespace: str) -> int:
+        return len(MAGIC) + (_hash(namespace) % NAMESPACE_SLOTS) * 8
+
+    def _key_generation_offset(self, key_hash: int) -> int:
+        return self._key_generations_offset + (key_hash % self.key_generations) * 4
+
+    def _slot_offset(self, key_hash: int) -> int:
+        return self._slots_offset + (key_hash % self.slots) * self.slot_size
+
+    def _lock(self, offset: int):
+        return self._locks[offset % LOCK_STRIPES]
+
+    def _bump(self, offset: int, fmt: str) -> None:
+        with self._lock(offset):
+            (value,) = struct.unpack_from(fmt, self._buffer, offset)
+            struct.pack_into(fmt, self._buffer, offset, (value + 1) % (1 << (8 * struct.calcsize(fmt))))
+
+    def generation(self, namespace: str) -> int:
+        """Current generation of a namespace; changes whenever it is invalidated."""
+        if self._buffer is None:
+            return 0
+        scoped_namespace, _ = self._scoped(namespace)
+        return struct.unpack_from("<Q", self._buffer, self._namespace_offset(scoped_namespace))[0]
+
+    def stamp(self, namespace: str, key: Any) -> Stamp:
+        """Generations to store a value under; take it before loading the value."""
+        if self._buffer is None:
+            return (0, 0)
+        scoped_namespace, scoped_key = self._scoped(namespace, key)
+        return (
+            struct.unpack_from("<Q", self._buffer, self._namespace_offset(scoped_namespace))[0],
+            struct.unpack_from("<I", self._buffer, self._key_generation_offset(_hash(scoped_key)))[0],
+        )
+
+    def get(self, namespace: str, key: Any) -> Optional[Any]:
+        """The cached value, or ``None`` if missing, stale or being written."""
+        if self._buffer is None:
+            return None
+        _, scoped_key = self._scoped(namespace, key)
+        key_hash = _hash(scoped_key)
+        offset = self._slot_offset(key_hash)
+        current = self.stamp(namespace, key)
+
+        sequence, namespace_gen, key_gen, stored_hash, expires_at, key_length, value_length = \
+            ENTRY_HEADER.unpack_from(self._buffer, offset)
+        if sequence % 2 or stored_hash != key_hash or key_length == 0:
+            self._count("misses")
+            return None
+        start = offset + ENTRY_HEADER.size
+        stored_key = bytes(self._buffer[start:start + key_length])
+        value = bytes(self._buffer[start + key_length:start + key_length + value_length])
+        if struct.unpack_from("<I", self._buffer, offset)[0] != sequence or stored_key != scoped_key.encode():
+            self._count("misses")
+            return None
+        if (namespace_gen, key_gen) != current or expires_at < time.time():
+            self._count("stale")
+            return None
+        self._count("hits")
+        return json.loads(value)
+
+    def set(self, namespace: str, key: Any, value: Any, stamp: Stamp) -> bool:
+        """Store a value loaded after ``stamp`` was taken; ``False`` if it does not fit."""
+        if self._buffer is None:
+            return False
+        _, scoped_key = self._scoped(namespace, key)
+        key_bytes = scoped_key.encode()
+        value_bytes = json.dumps(value, separators=(",", ":"), default=str).encode()
+        if ENTRY_HEADER.size + len(key_bytes) + len(value_bytes) > self.slot_size:
+            self._count("too_large")
+            return False
+
+        key_hash = _hash(scoped_key)
+        offset = self._slot_offset(key_hash)
+        with self._lock(offset):
+            sequence = struct.unpack_from("<I", self._buffer, offset)[0]
+            # An odd sequence tells readers the slot is being written
+            struct.pack_into("<I", self._buffer, offset, (sequence + 1) % (1 << 32))
+            start = offset + ENTRY_HEADER.size
+            self._buffer[start:start + len(key_bytes)] = key_bytes
+            self._buffer[start + len(key_bytes):start + len(key_bytes) + len(value_bytes)] = value_bytes
+            ENTRY_HEADER.pack_into(
+                self._buffer, offset, (sequence + 1) % (1 << 32), stamp[0], stamp[1], key_hash,
+                time.time() + self.ttl_seconds, len(key_bytes), len(value_bytes),
+            )
+            struct.pack_into("<I", self._buffer, offset, (sequence + 2) % (1 << 32))
+        return True
+
+    def get_or_load(self, namespace: str, key: Any, loader: Callable[[], Any]) -> Any:
+        """The cached value, or ``loader()``'s result, stored for the other workers."""
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+        return self.load(namespace, key, loader)
+
+    def load(self, namespace: str, key: Any, loader: Callable[[], Any]) -> Any:
+        """``loader()``'s result, stored whatever is cached (to refresh ahead of expiry)."""
+        stamp = self.stamp(namespace, key)
+        value = loader()
+        if value is not None:
+            self.set(namespace, key, value, stamp)
+        return value
+
+    def invalidate(self, namespace: str, key: Any = None) -> None:
+        """Make one key, or with no key the whole namespace, stale in every worker."""
+        if self._buffer is None:
+            return
+        scoped_namespace, scoped_key = self._scoped(namespace, key)
+        if key is None:
+            self._bump(self._namespace_offset(scoped_namespace), "<Q")
+        else:
+            self._bump(self._key_generation_offset(_hash(scoped_key)), "<I")
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_stats(self) -> dict:
+        """Layout and this process's hit counters."""
+        lookups = self.hits + self.misses + self.stale
+        return {
+            "enabled": self.enabled,
+            "slots": self.slots,
+            "slot_bytes": self.slot_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "too_large": self.too_large,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# Process-wide instance, allocated by the launcher
+shared_cache = SharedCache()
@@ -0,0 +1,181 @@
+"""Per-tenant database routing.
+
+Each tenant has its own database (a SQLite file, or a database on a
+Postgres server) built from ``tenant_database_url``. The tenant of a
+request is taken from the tenant header and kept in a context variable,
+so sessions opened anywhere while handling the request, including worker
+threads and background tasks, use that tenant's engine.
+"""
+
+import json
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy.engine import Engine
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Tenant of the current request or command; ``None`` means the default database
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+class EngineRegistry:
+    """Engines per tenant, created on first use.
+
+    At most ``max_engines`` engines are kept; beyond that the least
+    recently used engines without checked-out connections are disposed.
+    A disposed tenant's engine is simply created again when next needed.
+
+    Engines are created outside the registry lock, one at a time per
+    tenant, so opening a new tenant's database (tables, migrations)
+    does not hold up requests of other tenants. An evicted engine may
+    still be held by a session that opens a connection later, which
+    fills a new pool; evicted engines are kept (weakly) and such pools
+    are disposed again on later evictions and by ``dispose_all``.
+    """
+
+    def __init__(self, factory: Callable[[str], Engine], max_engines: int):
+        self.factory = factory
+        self.max_engines = max_engines
+        self._engines: OrderedDict[str, Engine] = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a tenant's engine is being created
+        self._creating: Dict[str, threading.Lock] = {}
+        # Evicted engines still referenced elsewhere
+        self._evicted: weakref.WeakSet = weakref.WeakSet()
+        self.created = 0
+        self.evicted = 0
+
+    def _lookup(self, tenant: str) -> Optional[Engine]:
+        engine = self._engines.get(tenant)
+        if engine is not None:
+            self._engines.move_to_end(tenant)
+        return engine
+
+    def get(self, tenant: str) -> Engine:
+        """Get (or create) the engine of a tenant."""
+        with self._lock:
+            engine = self._lookup(tenant)
+            if engine is not None:
+                return engine
+            creating = self._creating.setdefault(tenant, threading.Lock())
+
+        with creating:
+            with self._lock:
+                engine = self._lookup(tenant)
+                if engine is not None:
+                    return engine
+            try:
+                engine = self.factory(tenant)
+            finally:
+                with self._lock:
+                    if self._creating.get(tenant) is creating:
+                        del self._creating[tenant]
+            with self._lock:
+                existing = self._lookup(tenant)
+                if existing is not None:
+                    # Created concurrently after an eviction; keep the registered one
+                    engine.dispose()
+                    return existing
+                self._engines[tenant] = engine
+                self.created += 1
+                self._evict_idle()
+            return engine
+
+    def _evict_idle(self) -> None:
+        for engine in list(self._evicted):
+            pool = engine.pool
+            if getattr(pool, "checkedin", lambda: 0)() and not getattr(pool, "checkedout", lambda: 0)():
+                engine.dispose()
+        for tenant in list(self._engines)[:-1]:
+            if len(self._engines) <= self.max_engines:
+                return
+            engine = self._engines[tenant]
+            if getattr(engine.pool, "checkedout", lambda: 0)():
+                continue
+            del self._engines[tenant]
+            engine.dispose()
+            self._evicted.add(engine)
+            self.evicted += 1
+            logger.info(f"Disposed idle engine of tenant {tenant}")
+
+    def items(self) -> list:
+        """Open ``(tenant, engine)`` pairs."""
+        with self._lock:
+            return list(self._engines.items())
+
+    def dispose_all(self) -> None:
+        """Dispose every engine, including evicted ones still in use."""
+        with self._lock:
+            for engine in [*self._engines.values(), *self._evicted]:
+                engine.dispose()
+            self._engines.clear()
+
+    def get_stats(self) -> dict:
+        """Open engines, most recently used last, and counters."""
+        with self._lock:
+            return {
+                "open": list(self._engines),
+                "max_engines": self.max_engines,
+                "created": self.created,
+                "evicted": self.evicted,
+                "evicted_referenced": len(self._evicted),
+            }
+
+
+class TenantMiddleware:
+    """ASGI middleware resolving the tenant of a request from a header.
+
+    Requests without the header use the default database; an unknown
+    tenant is rejected with ``400``.
+    """
+
+    def __init__(self, app, header: str, tenants: Iterable[str]):
+        self.app = app
+        self.header = header.lower().encode()
+        self.tenants = frozenset(tenants)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = dict(scope["headers"]).get(self.header)
+        if value is None:
+            await self.app(scope, receive, send)
+            return
+
+        tenant = value.decode("latin-1").strip().lower()
+        if not TENANT_ID_PATTERN.match(tenant) or tenant not in self.tenants:
+            await self._reject(send, tenant)
+            return
+
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+    async def _reject(self, send, tenant: str) -> None:
+        body = json.dumps({
+            "success": False,
+            "message": f"Unknown tenant: {tenant}",
+            "error_code": "UNKNOWN_TENANT",
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,85 @@
+"""Database helpers shared by services."""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Type
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, SQLModel, func
+
+from app.models import Checkpoint
+
+
+def dialect_insert(db: Session, model: Type[SQLModel]):
+    """Build an INSERT that supports ON CONFLICT for the session's dialect."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def upsert_increment(
+    db: Session,
+    model: Type[SQLModel],
+    key: str,
+    rows: list[dict],
+) -> None:
+    """Insert rows or add their values onto existing rows with the same key."""
+    if not rows:
+        return
+    statement = dialect_insert(db, model)
+    columns = [column for column in rows[0] if column != key]
+    statement = statement.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            column: getattr(model, column) + getattr(statement.excluded, column)
+            for column in columns
+        },
+    )
+    db.exec(statement, params=rows)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize a datetime to aware UTC; naive values are assumed to be UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def bucket_expression(db: Session, column, bucket: str):
+    """SQL expression truncating a timestamp column to an ISO date string.
+
+    ``bucket`` is one of ``day``, ``week`` (starting Monday) or ``month``.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(func.date_trunc(bucket, column), "YYYY-MM-DD")
+    if bucket == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", column)
+    return func.strftime("%Y-%m-%d", column)
+
+
+def bucket_key(day: date, bucket: str) -> str:
+    """Python equivalent of ``bucket_expression`` for a single day."""
+    if bucket == "week":
+        day = day - timedelta(days=day.weekday())
+    elif bucket == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
+
+def get_checkpoint(db: Session, name: str) -> int:
+    """Get the value of a named checkpoint (0 if unset)."""
+    checkpoint = db.get(Checkpoint, name)
+    return checkpoint.value if checkpoint else 0
+
+
+def set_checkpoint(db: Session, name: str, value: int) -> None:
+    """Set a named checkpoint; takes effect with the caller's commit."""
+    checkpoint = db.get(Checkpoint, name)
+    if checkpoint is None:
+        checkpoint = Checkpoint(name=name)
+    checkpoint.value = value
+    checkpoint.updated_at = datetime.now(timezone.utc)
+    db.add(checkpoint)
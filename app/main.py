@@ -1,67 +1,175 @@
 """FastAPI Professional Application."""
 
 import time
+
+_imports_started = time.perf_counter()
+
+import asyncio
 import zoneinfo
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import FastAPI, Request, Depends, HTTPException, status
+from fastapi import APIRouter, FastAPI, Request, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
 from app.core.logging import setup_logging, get_logger
+from app.core.startup import StartupReport, cache_openapi, load_openapi, save_openapi
+from app.core.admission import AdmissionControlMiddleware
+from app.core.rate_limit import TokenBucketLimiter
+from app.core.readiness import readiness_probe
+from app.db import db as database
 from app.db.db import lifespan
+from app.db.migrations import migration_runner
+from app.db.shared_cache import shared_cache
+from app.db.tenancy import TenantMiddleware
+from app.db.replicas import ReadYourWritesMiddleware
 from app.api.deps import get_current_user
 from app.api.responses import APIResponse
 from app.api.exceptions import APIException
+from app.api.idempotency import IdempotencyMiddleware
 from app.models import Invoice
-from .routers import customers, transactions, plans
+from app.services.idempotency import idempotency_service
+from app.services.maintenance import maintenance_scheduler
+from app.services.single_flight import single_flight
+from .routers import customers, transactions, plans, analytics, billing, invoices, changes, webhooks, entitlements, batch, admin
 
-# Setup logging
-setup_logging()
-logger = get_logger(__name__)
+_imports_ms = (time.perf_counter() - _imports_started) * 1000
 
-# Get settings
-settings = get_settings()
+logger = get_logger(__name__)
 
-# Create FastAPI app
-app = FastAPI(
-    title=settings.app_name,
-    version=settings.app_version,
-    description="A professional FastAPI application with SQLite",
-    lifespan=lifespan,
-    debug=settings.debug,
+# Routers served under the API prefix, with their OpenAPI tags
+API_ROUTERS = (
+    (customers.router, "customers"),
+    (transactions.router, "transactions"),
+    (plans.router, "plans"),
+    (analytics.router, "analytics"),
+    (billing.router, "billing"),
+    (invoices.router, "invoices"),
+    (changes.router, "changes"),
+    (webhooks.router, "webhooks"),
+    (entitlements.router, "entitlements"),
+    (batch.router, "batch"),
+    (admin.router, "admin"),
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Endpoints outside the API prefix
+router = APIRouter()
 
-# Include routers with API prefix
-app.include_router(
-    customers.router, 
-    prefix=settings.api_v1_prefix,
-    tags=["customers"]
-)
-app.include_router(
-    transactions.router, 
-    prefix=settings.api_v1_prefix,
-    tags=["transactions"]
-)
-app.include_router(
-    plans.router, 
-    prefix=settings.api_v1_prefix,
-    tags=["plans"]
-)
+
+@asynccontextmanager
+async def app_lifespan(app: FastAPI):
+    """Run the database lifespan, then load or pre-generate the OpenAPI schema."""
+    async with lifespan(app):
+        report: StartupReport = app.state.startup
+        cache_path = app.state.settings.openapi_cache_path
+        if not report.run("load_openapi", lambda: load_openapi(app, cache_path), bool(cache_path)):
+            # Generate off the event loop so startup does not wait for it
+            asyncio.get_running_loop().run_in_executor(None, _generate_openapi, app, cache_path)
+        report.finish()
+        yield
+
+
+def _generate_openapi(app: FastAPI, cache_path: str) -> None:
+    try:
+        if cache_path:
+            save_openapi(app, cache_path)
+        else:
+            app.openapi()
+    except Exception as e:
+        logger.warning(f"Could not pre-generate the OpenAPI schema: {e}")
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application: logging, middleware, routes and startup phases.
+    
+    ``app.state.startup`` records how long imports, building the app and
+    each startup phase took. Routes, authentication and the lifespan read
+    ``app.state.settings``. The process-wide components (database engines,
+    readiness probe, idempotency store, request coalescing, shared cache,
+    migration runner and maintenance scheduler) are configured from
+    ``settings`` too, so the last app created in a process sets them.
+    Tuning of the batch services (chunk sizes, throttles, webhook
+    delivery) is still read from the environment at import.
+    """
+    settings = settings or get_settings()
+    started = time.perf_counter()
+    setup_logging()
+    database.configure(settings)
+    for component in (readiness_probe, idempotency_service, single_flight, shared_cache,
+                      migration_runner, maintenance_scheduler):
+        component.configure(settings)
+    
+    app = FastAPI(
+        title=settings.app_name,
+        version=settings.app_version,
+        description="A professional FastAPI application with SQLite",
+        lifespan=app_lifespan,
+        debug=settings.debug,
+    )
+    app.state.settings = settings
+    app.state.rate_limiter = (
+        TokenBucketLimiter(settings.rate_limit_per_second, settings.rate_limit_burst)
+        if settings.rate_limit_enabled else None
+    )
+    
+    # Add admission control (load shedding) inside CORS so 503s carry CORS headers
+    if settings.admission_control_enabled:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            read_concurrency=settings.admission_read_concurrency,
+            read_queue=settings.admission_read_queue,
+            write_concurrency=settings.admission_write_concurrency,
+            write_queue=settings.admission_write_queue,
+            queue_timeout=settings.admission_queue_timeout_seconds,
+            latency_slo_ms=settings.admission_latency_slo_ms,
+            retry_after=settings.admission_retry_after_seconds,
+            # Change streams stay open for as long as the client listens
+            exempt_paths=[*settings.admission_exempt_paths, f"{settings.api_v1_prefix}/changes/stream"],
+        )
+    
+    # Replay write requests made with an Idempotency-Key; outside admission
+    # control so replays and waiting duplicates never take a slot
+    app.add_middleware(
+        IdempotencyMiddleware,
+        path_prefix=settings.api_v1_prefix,
+        wait_timeout=settings.idempotency_wait_timeout_seconds,
+    )
+    
+    # Route requests with a tenant header to that tenant's database; outside
+    # the idempotency layer so stored responses are kept per tenant
+    if settings.tenants:
+        app.add_middleware(TenantMiddleware, header=settings.tenant_header, tenants=settings.tenants)
+    
+    # Let safe requests read from replicas, pinning writers to the primary
+    if settings.database_read_urls:
+        app.add_middleware(ReadYourWritesMiddleware, pin_seconds=settings.read_your_writes_seconds)
+    
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.middleware("http")(log_request_time)
+    
+    # Include routers with API prefix
+    for api_router, tag in API_ROUTERS:
+        app.include_router(api_router, prefix=settings.api_v1_prefix, tags=[tag])
+    app.include_router(router)
+    app.add_exception_handler(APIException, api_exception_handler)
+    cache_openapi(app)
+    
+    app.state.startup = StartupReport()
+    app.state.startup.record("imports", _imports_ms)
+    app.state.startup.record("create_app", (time.perf_counter() - started) * 1000)
+    return app
 
 
-@app.exception_handler(APIException)
 async def api_exception_handler(request: Request, exc: APIException):
     """Handle custom API exceptions."""
     return JSONResponse(
@@ -70,11 +178,11 @@ async def api_exception_handler(request: Request, exc: APIException):
             "success": False,
             "message": exc.detail,
             "error_code": getattr(exc, 'error_code', None)
-        }
+        },
+        headers=exc.headers
     )
 
 
-@app.middleware("http")
 async def log_request_time(request: Request, call_next):
     """Log request processing time."""
     start_time = time.time()
@@ -84,9 +192,10 @@ async def log_request_time(request: Request, call_next):
     return response
 
 
-@app.get("/", response_model=APIResponse[dict])
-async def root(current_user: Annotated[str, Depends(get_current_user)]):
+@router.get("/", response_model=APIResponse[dict])
+async def root(request: Request, current_user: Annotated[str, Depends(get_current_user)]):
     """Root endpoint with authentication."""
+    settings = request.app.state.settings
     return APIResponse(
         message=f"Welcome to {settings.app_name}",
         data={
@@ -97,19 +206,33 @@ async def root(current_user: Annotated[str, Depends(get_current_user)]):
     )
 
 
-@app.get("/health", response_model=APIResponse[dict])
-async def health_check():
+@router.get("/health", response_model=APIResponse[dict])
+async def health_check(request: Request):
     """Health check endpoint."""
     return APIResponse(
         message="Application is healthy",
         data={
             "status": "healthy",
-            "version": settings.app_version,
+            "version": request.app.state.settings.app_version,
             "timestamp": datetime.utcnow().isoformat()
         }
     )
 
 
+@router.get("/ready", response_model=APIResponse[dict], responses={503: {"model": APIResponse[dict]}})
+async def readiness_check(request: Request):
+    """Readiness probe: 503 while starting, draining or when a check fails."""
+    result = await readiness_probe.check(started=request.app.state.startup.total_ms is not None)
+    response = APIResponse(
+        success=result["ready"],
+        message="Application is ready" if result["ready"] else f"Application is not ready ({result['status']})",
+        data=result
+    )
+    if not result["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=response.model_dump(mode="json"))
+    return response
+
+
 # Country timezone mapping
 COUNTRY_TIMEZONES = {
     "CO": "America/Bogota",
@@ -120,7 +243,7 @@ COUNTRY_TIMEZONES = {
 }
 
 
-@app.get("/time/{iso_code}", response_model=APIResponse[dict])
+@router.get("/time/{iso_code}", response_model=APIResponse[dict])
 async def get_time_by_iso_code(iso_code: str):
     """Get current time for a country by ISO code."""
     iso = iso_code.upper()
@@ -153,7 +276,7 @@ async def get_time_by_iso_code(iso_code: str):
         )
 
 
-@app.post("/invoices", response_model=APIResponse[Invoice])
+@router.post("/invoices", response_model=APIResponse[Invoice])
 async def create_invoice(
     invoice_data: Invoice,
     current_user: Annotated[str, Depends(get_current_user)]
@@ -163,4 +286,7 @@ async def create_invoice(
     return APIResponse(
         message="Invoice created successfully",
         data=invoice_data
-    )
\ No newline at end of file
+    )
+
+
+app = create_app()
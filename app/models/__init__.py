@@ -1,7 +1,7 @@
 """Models package for the application."""
 
 # Base models and enums
-from .base import StatusEnum, BaseModel
+from .base import StatusEnum, JobStatusEnum, BaseModel
 
 # Import all models from core (properly configured)
 from .core import (
@@ -11,11 +11,30 @@ from .core import (
     Transaction, TransactionBase, TransactionCreate, TransactionUpdate,
     Invoice
 )
+from .analytics import (
+    PlanRollup, CustomerSpendRollup, TransactionDailyBucket, UNATTRIBUTED_PLAN_ID
+)
+from .invoice import InvoiceRun, CustomerInvoice
+from .billing import BillingRunCreate, BillingRun, BillingRunChunk
+from .purge import CustomerPurge
+from .plan_operations import (
+    PlanOperationKindEnum, PlanOperationBase, PlanOperationCreate, PlanOperation
+)
+from .archive import TransactionArchive, ARCHIVE_SCHEMA
+from .changes import ChangeLogEntry
+from .webhooks import (
+    DeliveryStatusEnum, WebhookEndpoint, WebhookEndpointBase, WebhookEndpointCreate,
+    OutboxEvent, WebhookDelivery
+)
+from .entitlements import EntitlementCheck, EntitlementCheckRequest
+from .batch import BatchOperationEnum, BatchOperation, BatchPlanLink, BatchRequest
+from .system import Checkpoint, IdempotencyRecord, SchemaMigration, ScheduledJob
 
 # Export all models
 __all__ = [
     # Base
     "StatusEnum",
+    "JobStatusEnum",
     "BaseModel",
     
     # Associations
@@ -38,7 +57,58 @@ __all__ = [
     "TransactionBase",
     "TransactionCreate",
     "TransactionUpdate",
+    "TransactionArchive",
+    "ARCHIVE_SCHEMA",
     
     # Invoice models
     "Invoice",
+    "InvoiceRun",
+    "CustomerInvoice",
+    
+    # Analytics models
+    "PlanRollup",
+    "CustomerSpendRollup",
+    "TransactionDailyBucket",
+    "UNATTRIBUTED_PLAN_ID",
+    
+    # Billing models
+    "BillingRunCreate",
+    "BillingRun",
+    "BillingRunChunk",
+    
+    # Purge models
+    "CustomerPurge",
+    
+    # Plan operation models
+    "PlanOperationKindEnum",
+    "PlanOperationBase",
+    "PlanOperationCreate",
+    "PlanOperation",
+    
+    # Change feed models
+    "ChangeLogEntry",
+    
+    # Webhook models
+    "DeliveryStatusEnum",
+    "WebhookEndpoint",
+    "WebhookEndpointBase",
+    "WebhookEndpointCreate",
+    "OutboxEvent",
+    "WebhookDelivery",
+    
+    # Entitlement models
+    "EntitlementCheck",
+    "EntitlementCheckRequest",
+    
+    # Batch models
+    "BatchOperationEnum",
+    "BatchOperation",
+    "BatchPlanLink",
+    "BatchRequest",
+    
+    # System models
+    "Checkpoint",
+    "IdempotencyRecord",
+    "SchemaMigration",
+    "ScheduledJob",
 ]
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Materialized rollup models for analytics."""
+
+from datetime import date
+
+from sqlmodel import SQLModel, Field
+
+# Rollup row that collects revenue from transactions without a plan
+UNATTRIBUTED_PLAN_ID = 0
+
+
+class PlanRollup(SQLModel, table=True):
+    """Revenue and membership figures per plan."""
+    plan_id: int = Field(primary_key=True)
+    revenue: int = Field(default=0, description="Revenue in cents")
+    transaction_count: int = Field(default=0)
+    active_members: int = Field(default=0)
+    inactive_members: int = Field(default=0)
+
+
+class CustomerSpendRollup(SQLModel, table=True):
+    """Total spend per customer."""
+    customer_id: int = Field(primary_key=True)
+    total_amount: int = Field(default=0, index=True, description="Spend in cents")
+    transaction_count: int = Field(default=0)
+
+
+class TransactionDailyBucket(SQLModel, table=True):
+    """Precomputed transaction totals for a closed (past) UTC day."""
+    day: date = Field(primary_key=True)
+    amount: int = Field(default=0, description="Amount in cents")
+    transaction_count: int = Field(default=0)
@@ -0,0 +1,30 @@
+"""Cold storage model for archived transactions."""
+
+from datetime import datetime
+
+from sqlalchemy import Index
+from sqlmodel import Field
+
+from .core import TransactionBase
+
+# Schema name of the attached archive database; engines without one map
+# it to the main database (see ``app.db.db.build_engine``)
+ARCHIVE_SCHEMA = "archive"
+
+
+class TransactionArchive(TransactionBase, table=True):
+    """Transaction moved out of the hot ``transaction`` table.
+
+    Rows keep their original id and are read-only. There are no foreign
+    keys, so the table can live in a separate (attached) database file.
+    """
+    __tablename__ = "transaction_archive"
+    __table_args__ = (
+        Index("ix_transaction_archive_customer_id_id", "customer_id", "id"),
+        {"schema": ARCHIVE_SCHEMA},
+    )
+    
+    id: int = Field(..., primary_key=True, sa_column_kwargs={"autoincrement": False})
+    customer_id: int = Field(...)
+    plan_id: int | None = Field(default=None)
+    created_at: datetime = Field(..., index=True)
@@ -10,6 +10,14 @@ class StatusEnum(str, Enum):
     inactive = "inactive"
 
 
+class JobStatusEnum(str, Enum):
+    """Status enumeration for background jobs and their chunks."""
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
 class BaseModel(SQLModel):
     """Base model with common functionality."""
     pass
\ No newline at end of file
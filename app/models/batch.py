@@ -0,0 +1,43 @@
+"""Batch request models."""
+
+from enum import Enum
+from typing import Any
+
+from sqlmodel import SQLModel, Field
+
+# Operations accepted per batch request
+MAX_BATCH_OPERATIONS = 100
+
+
+class BatchOperationEnum(str, Enum):
+    """Service calls a batch can make."""
+    customer_create = "customer.create"
+    customer_update = "customer.update"
+    customer_add_plan = "customer.add_plan"
+    customer_remove_plan = "customer.remove_plan"
+    plan_create = "plan.create"
+    plan_update = "plan.update"
+    transaction_create = "transaction.create"
+    transaction_update = "transaction.update"
+
+
+class BatchOperation(SQLModel):
+    """One operation of a batch.
+
+    String arguments of the form ``"$ref"`` or ``"$ref.field"`` are replaced
+    by the id (or field) of the result of an earlier operation named ``ref``.
+    """
+    op: BatchOperationEnum
+    ref: str | None = Field(default=None, regex=r"^[A-Za-z_][A-Za-z0-9_]*$", max_length=50)
+    args: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchPlanLink(SQLModel):
+    """Arguments of ``customer.add_plan`` and ``customer.remove_plan``."""
+    customer_id: int = Field(..., ge=1)
+    plan_id: int = Field(..., ge=1)
+
+
+class BatchRequest(SQLModel):
+    """Model for a batch of operations applied in one transaction."""
+    operations: list[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
@@ -0,0 +1,50 @@
+"""Billing run ledger models."""
+
+import re
+from datetime import datetime
+
+from pydantic import field_validator
+from sqlmodel import SQLModel, Field
+
+from .base import JobStatusEnum
+
+
+class BillingRunCreate(SQLModel):
+    """Model for starting a billing run."""
+    period: str = Field(..., description="Billing period (YYYY-MM)")
+    workers: int = Field(default=1, ge=1, le=32, description="Parallel worker threads")
+    chunk_size: int | None = Field(default=None, ge=1, description="Customer ids per chunk")
+    
+    @field_validator("period")
+    @classmethod
+    def validate_period(cls, v):
+        """Ensure the period is a calendar month."""
+        if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", v):
+            raise ValueError("period must be formatted as YYYY-MM")
+        return v
+
+
+class BillingRun(SQLModel, table=True):
+    """One billing run per period; the ledger that makes runs idempotent."""
+    id: int | None = Field(default=None, primary_key=True)
+    period: str = Field(..., unique=True, max_length=7)
+    status: JobStatusEnum = Field(default=JobStatusEnum.pending)
+    chunk_size: int = Field(..., gt=0)
+    transactions_created: int = Field(default=0)
+    started_at: datetime | None = Field(default=None)
+    finished_at: datetime | None = Field(default=None)
+    error: str | None = Field(default=None, max_length=255)
+
+
+class BillingRunChunk(SQLModel, table=True):
+    """A customer-id range of a billing run, billed in a single commit."""
+    id: int | None = Field(default=None, primary_key=True)
+    run_id: int = Field(..., foreign_key="billingrun.id", index=True)
+    first_customer_id: int
+    last_customer_id: int
+    status: JobStatusEnum = Field(default=JobStatusEnum.pending)
+    claim_token: str | None = Field(default=None, max_length=32)
+    claimed_at: datetime | None = Field(default=None)
+    transactions_created: int = Field(default=0)
+    duration_ms: float | None = Field(default=None)
+    completed_at: datetime | None = Field(default=None)
@@ -0,0 +1,25 @@
+"""Change feed models."""
+
+from datetime import datetime
+
+from sqlalchemy import Index, func
+from sqlmodel import SQLModel, Field
+
+
+class ChangeLogEntry(SQLModel, table=True):
+    """One committed change to a tracked entity, in commit order."""
+    __table_args__ = (
+        Index("ix_changelogentry_entity_entity_id", "entity", "entity_id"),
+        # Never reuse the sequence number of a deleted latest entry
+        {"sqlite_autoincrement": True},
+    )
+    
+    seq: int | None = Field(default=None, primary_key=True)
+    entity: str = Field(..., max_length=50)
+    entity_id: str = Field(..., max_length=50)
+    op: str = Field(..., max_length=10, description="create, update or delete")
+    payload: str | None = Field(default=None, description="JSON snapshot after the change")
+    created_at: datetime | None = Field(
+        default=None,
+        sa_column_kwargs={"default": func.now(), "server_default": func.now()},
+    )
@@ -1,7 +1,10 @@
 """Core models with proper relationship configuration."""
 
+from datetime import datetime, timezone
+from functools import cached_property
 from typing import TYPE_CHECKING
 from pydantic import EmailStr, computed_field, BaseModel as PydanticBaseModel
+from sqlalchemy import Index, func
 from sqlmodel import SQLModel, Field, Relationship
 
 from .base import StatusEnum, BaseModel
@@ -9,6 +12,11 @@ from .base import StatusEnum, BaseModel
 # Association model (defined first)
 class CustomerPlan(SQLModel, table=True):
     """Association model for Customer-Plan many-to-many relationship."""
+    __table_args__ = (
+        # Serves plan member listings filtered by status, in customer order
+        Index("ix_customerplan_plan_id_status_customer_id", "plan_id", "status", "customer_id"),
+    )
+    
     customer_id: int = Field(foreign_key="customer.id", primary_key=True)
     plan_id: int = Field(foreign_key="plan.id", primary_key=True)
     status: StatusEnum = Field(default=StatusEnum.active)
@@ -52,6 +60,7 @@ class PlanUpdate(PlanBase):
 class TransactionCreate(TransactionBase):
     """Model for creating a new transaction."""
     customer_id: int = Field(..., foreign_key="customer.id")
+    plan_id: int | None = Field(default=None, foreign_key="plan.id")
 
 class TransactionUpdate(TransactionBase):
     """Model for updating an existing transaction."""
@@ -61,6 +70,7 @@ class TransactionUpdate(TransactionBase):
 class Customer(CustomerBase, table=True):
     """Customer database model."""
     id: int | None = Field(default=None, primary_key=True)
+    deleted_at: datetime | None = Field(default=None, index=True, description="Set when soft-deleted, pending purge")
     
     # Relationships
     transactions: list["Transaction"] = Relationship(back_populates="customer")
@@ -69,14 +79,33 @@ class Customer(CustomerBase, table=True):
 class Plan(PlanBase, table=True):
     """Plan database model."""
     id: int | None = Field(default=None, primary_key=True)
+    active_member_count: int = Field(
+        default=0,
+        description="Active memberships, maintained with every membership change",
+        sa_column_kwargs={"server_default": "0"},
+    )
     
     # Relationships
     customers: list[Customer] = Relationship(back_populates="plans", link_model=CustomerPlan)
 
 class Transaction(TransactionBase, table=True):
     """Transaction database model."""
+    __table_args__ = (
+        Index("ix_transaction_customer_id_id", "customer_id", "id"),
+        Index("ix_transaction_customer_id_created_at", "customer_id", "created_at"),
+    )
+    
     id: int | None = Field(default=None, primary_key=True)
     customer_id: int = Field(..., foreign_key="customer.id")
+    plan_id: int | None = Field(default=None, foreign_key="plan.id", index=True)
+    created_at: datetime | None = Field(
+        default=None,
+        index=True,
+        description="Set on insert",
+        # Set in Python so stored values have the same (microsecond) format as
+        # bound range parameters; SQLite's now() has no fractional seconds
+        sa_column_kwargs={"default": lambda: datetime.now(timezone.utc), "server_default": func.now()},
+    )
     
     # Relationships
     customer: Customer = Relationship(back_populates="transactions")
@@ -89,9 +118,9 @@ class Invoice(PydanticBaseModel):
     transactions: list[Transaction]
     
     @computed_field
-    @property
+    @cached_property
     def total(self) -> int:
-        """Calculate total amount from all transactions."""
+        """Calculate total amount from all transactions (computed once)."""
         return sum(transaction.amount for transaction in self.transactions)
     
     @computed_field
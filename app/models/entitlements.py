@@ -0,0 +1,17 @@
+"""Entitlement check models."""
+
+from sqlmodel import SQLModel, Field
+
+# Checks accepted per batch request
+MAX_ENTITLEMENT_CHECKS = 1_000
+
+
+class EntitlementCheck(SQLModel):
+    """One "does this customer have this active plan?" question."""
+    customer_id: int = Field(..., ge=1)
+    plan_id: int = Field(..., ge=1)
+
+
+class EntitlementCheckRequest(SQLModel):
+    """Model for a batch of entitlement checks."""
+    checks: list[EntitlementCheck] = Field(..., min_length=1, max_length=MAX_ENTITLEMENT_CHECKS)
@@ -0,0 +1,43 @@
+"""Stored invoice models."""
+
+from datetime import datetime
+
+from sqlalchemy import Index, UniqueConstraint, func
+from sqlmodel import SQLModel, Field
+
+from .base import JobStatusEnum
+
+
+class InvoiceRun(SQLModel, table=True):
+    """An invoice generation pass over a range of transaction ids."""
+    id: int | None = Field(default=None, primary_key=True)
+    from_transaction_id: int = Field(..., description="Exclusive lower bound")
+    to_transaction_id: int = Field(..., description="Inclusive upper bound")
+    first_customer_id: int | None = Field(default=None)
+    last_customer_id: int | None = Field(default=None)
+    partitions: int = Field(default=1, ge=1, description="Customer id ranges processed independently")
+    status: JobStatusEnum = Field(default=JobStatusEnum.pending)
+    invoices_created: int = Field(default=0)
+    started_at: datetime | None = Field(default=None)
+    finished_at: datetime | None = Field(default=None)
+    error: str | None = Field(default=None, max_length=255)
+
+
+class CustomerInvoice(SQLModel, table=True):
+    """A generated invoice covering a customer's transactions in one run."""
+    __table_args__ = (
+        UniqueConstraint("run_id", "customer_id"),
+        Index("ix_customerinvoice_customer_id_id", "customer_id", "id"),
+    )
+    
+    id: int | None = Field(default=None, primary_key=True)
+    run_id: int = Field(..., foreign_key="invoicerun.id")
+    customer_id: int = Field(..., foreign_key="customer.id")
+    total: int = Field(..., description="Total amount in cents")
+    transaction_count: int
+    first_transaction_id: int
+    last_transaction_id: int
+    created_at: datetime | None = Field(
+        default=None,
+        sa_column_kwargs={"default": func.now(), "server_default": func.now()},
+    )
@@ -0,0 +1,69 @@
+"""Bulk plan membership operation models."""
+
+from datetime import datetime
+from enum import Enum
+
+from pydantic import model_validator
+from sqlmodel import SQLModel, Field
+
+from .base import StatusEnum, JobStatusEnum
+
+
+class PlanOperationKindEnum(str, Enum):
+    """Kinds of bulk plan membership operations."""
+    migrate = "migrate"
+    attach = "attach"
+    set_status = "set_status"
+
+
+class PlanOperationBase(SQLModel):
+    """Shared fields of bulk plan operations."""
+    kind: PlanOperationKindEnum
+    plan_id: int = Field(..., ge=1, description="Source plan (migrate, set_status) or plan to attach (attach)")
+    target_plan_id: int | None = Field(default=None, ge=1, description="Plan members move to (migrate)")
+    member_status: StatusEnum | None = Field(
+        default=None, description="Only memberships with this status (migrate, set_status); status of new memberships (attach)"
+    )
+    new_status: StatusEnum | None = Field(default=None, description="Status to set (set_status)")
+    has_plan_id: int | None = Field(default=None, ge=1, description="Only customers on this plan (attach)")
+    first_customer_id: int | None = Field(default=None, ge=1, description="Lowest customer id affected")
+    last_customer_id: int | None = Field(default=None, ge=1, description="Highest customer id affected")
+
+
+class PlanOperationCreate(PlanOperationBase):
+    """Model for starting a bulk plan operation."""
+    chunk_size: int | None = Field(default=None, ge=1, le=50_000, description="Customers per commit")
+
+    @model_validator(mode="after")
+    def validate_kind(self):
+        """Ensure the fields the operation needs are given."""
+        if self.kind == PlanOperationKindEnum.migrate:
+            if self.target_plan_id is None:
+                raise ValueError("target_plan_id is required to migrate members")
+            if self.target_plan_id == self.plan_id:
+                raise ValueError("target_plan_id must differ from plan_id")
+        if self.kind == PlanOperationKindEnum.set_status and self.new_status is None:
+            raise ValueError("new_status is required to set the status of memberships")
+        if (
+            self.first_customer_id is not None and self.last_customer_id is not None
+            and self.first_customer_id > self.last_customer_id
+        ):
+            raise ValueError("first_customer_id must not exceed last_customer_id")
+        return self
+
+
+class PlanOperation(PlanOperationBase, table=True):
+    """A bulk plan operation, applied one customer-id chunk per commit."""
+    id: int | None = Field(default=None, primary_key=True)
+    status: JobStatusEnum = Field(default=JobStatusEnum.pending)
+    chunk_size: int = Field(..., gt=0)
+    cursor: int = Field(default=0, description="Highest customer id already processed")
+    customers_total: int = Field(default=0, description="Customers matched when the operation was created")
+    customers_processed: int = Field(default=0)
+    memberships_changed: int = Field(default=0)
+    created_at: datetime | None = Field(default=None)
+    started_at: datetime | None = Field(default=None)
+    finished_at: datetime | None = Field(default=None)
+    error: str | None = Field(default=None, max_length=255)
+    claim_token: str | None = Field(default=None, max_length=32)
+    lease_expires_at: datetime | None = Field(default=None, description="Until when the runner holding it may apply chunks")
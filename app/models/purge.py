@@ -0,0 +1,22 @@
+"""Customer purge job models."""
+
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+from .base import JobStatusEnum
+
+
+class CustomerPurge(SQLModel, table=True):
+    """Background removal of a soft-deleted customer and its history."""
+    id: int | None = Field(default=None, primary_key=True)
+    customer_id: int = Field(..., index=True)
+    status: JobStatusEnum = Field(default=JobStatusEnum.pending)
+    transactions_total: int = Field(default=0, description="Transactions found when the customer was deleted")
+    transactions_deleted: int = Field(default=0)
+    invoices_deleted: int = Field(default=0)
+    plan_links_deleted: int = Field(default=0)
+    created_at: datetime | None = Field(default=None)
+    started_at: datetime | None = Field(default=None)
+    finished_at: datetime | None = Field(default=None)
+    error: str | None = Field(default=None, max_length=255)
@@ -0,0 +1,67 @@
+"""Internal bookkeeping models."""
+
+from datetime import datetime, timezone
+
+from sqlmodel import SQLModel, Field
+
+from .base import JobStatusEnum
+
+
+class Checkpoint(SQLModel, table=True):
+    """Named high-water mark used by incremental background jobs."""
+    name: str = Field(primary_key=True, max_length=100)
+    value: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    """Stored outcome of a write request made with an ``Idempotency-Key``.
+
+    A row without ``status_code`` is a request still in progress, or one
+    whose process died if ``claimed_until`` has passed.
+    """
+    key_hash: str = Field(primary_key=True, max_length=64, description="SHA-256 of principal, method, path and key")
+    request_hash: str = Field(..., max_length=64, description="SHA-256 of the request body")
+    status_code: int | None = Field(default=None)
+    content_type: str | None = Field(default=None, max_length=100)
+    body: bytes | None = Field(default=None, description="zlib-compressed response body")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    claimed_until: datetime | None = Field(default=None, description="Until when the claiming request may still store its response")
+    expires_at: datetime = Field(..., index=True)
+
+
+class SchemaMigration(SQLModel, table=True):
+    """Applied schema migration, with the progress of its backfill.
+
+    The backfill walks the table's ids in ranges up to ``backfill_last_id``,
+    fixed when it starts (later rows are written by code that already
+    fills the new column). ``backfill_cursor`` is the last id done.
+    """
+    version: int = Field(primary_key=True)
+    name: str = Field(..., max_length=100)
+    status: JobStatusEnum = Field(default=JobStatusEnum.pending, description="completed once backfilled")
+    applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    backfill_last_id: int | None = Field(default=None)
+    backfill_cursor: int = Field(default=0)
+    rows_backfilled: int = Field(default=0)
+    lease_expires_at: datetime | None = Field(default=None, description="Set while a process runs the backfill")
+    finished_at: datetime | None = Field(default=None)
+    error: str | None = Field(default=None, max_length=255)
+
+
+class ScheduledJob(SQLModel, table=True):
+    """Lease and last run of a maintenance job, shared by every worker.
+
+    A worker runs the job only after taking the lease with a conditional
+    update, so each job runs on one worker per interval.
+    """
+    name: str = Field(primary_key=True, max_length=50)
+    leader: str | None = Field(default=None, max_length=100, description="host:pid holding the lease")
+    lease_expires_at: datetime | None = Field(default=None)
+    last_started_at: datetime | None = Field(default=None)
+    last_finished_at: datetime | None = Field(default=None)
+    last_status: JobStatusEnum | None = Field(default=None)
+    last_duration_ms: float | None = Field(default=None)
+    last_result: str | None = Field(default=None, max_length=255)
+    runs: int = Field(default=0)
+    failures: int = Field(default=0)
@@ -0,0 +1,81 @@
+"""Webhook endpoint and outbox models."""
+
+from datetime import datetime
+from enum import Enum
+
+from pydantic import field_validator
+from sqlalchemy import Index, UniqueConstraint, func
+from sqlmodel import SQLModel, Field
+
+
+class DeliveryStatusEnum(str, Enum):
+    """Webhook delivery status."""
+    pending = "pending"
+    delivered = "delivered"
+    dead = "dead"
+
+
+class WebhookEndpointBase(SQLModel):
+    """Base webhook endpoint model."""
+    url: str = Field(..., max_length=500, description="URL receiving POSTed event batches")
+    event_types: str | None = Field(
+        default=None,
+        max_length=255,
+        description="Comma-separated event types to deliver; all events when empty",
+    )
+    is_active: bool = Field(default=True)
+
+    @field_validator("url")
+    @classmethod
+    def validate_url(cls, v):
+        """Only deliver over HTTP(S)."""
+        if not v.startswith(("http://", "https://")):
+            raise ValueError("url must start with http:// or https://")
+        return v
+
+
+class WebhookEndpointCreate(WebhookEndpointBase):
+    """Model for registering a webhook endpoint."""
+    secret: str | None = Field(default=None, max_length=100, description="Key for the HMAC signature header")
+
+
+class WebhookEndpoint(WebhookEndpointBase, table=True):
+    """Registered webhook endpoint."""
+    id: int | None = Field(default=None, primary_key=True)
+    secret: str | None = Field(default=None, max_length=100, exclude=True)
+
+    def accepts(self, event_type: str) -> bool:
+        """Whether this endpoint subscribes to an event type."""
+        if not self.event_types:
+            return True
+        return event_type in {t.strip() for t in self.event_types.split(",")}
+
+
+class OutboxEvent(SQLModel, table=True):
+    """An event written in the same commit as the change it announces."""
+    id: int | None = Field(default=None, primary_key=True)
+    event_type: str = Field(..., max_length=50)
+    payload: str = Field(..., description="JSON event data")
+    created_at: datetime | None = Field(
+        default=None,
+        sa_column_kwargs={"default": func.now(), "server_default": func.now()},
+    )
+    fanned_out_at: datetime | None = Field(default=None, index=True)
+
+
+class WebhookDelivery(SQLModel, table=True):
+    """Delivery state of one outbox event to one endpoint."""
+    __table_args__ = (
+        UniqueConstraint("event_id", "endpoint_id"),
+        Index("ix_webhookdelivery_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    event_id: int = Field(..., foreign_key="outboxevent.id", index=True)
+    endpoint_id: int = Field(..., foreign_key="webhookendpoint.id", index=True)
+    status: DeliveryStatusEnum = Field(default=DeliveryStatusEnum.pending)
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(...)
+    claim_token: str | None = Field(default=None, max_length=32, exclude=True)
+    last_error: str | None = Field(default=None, max_length=255)
+    delivered_at: datetime | None = Field(default=None)
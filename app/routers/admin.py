@@ -0,0 +1,108 @@
+"""Admin API routes for runtime metrics."""
+
+import os
+
+from fastapi import APIRouter, Depends, Request
+from sqlmodel import Session
+
+from app.core.admission import get_admission_stats
+from app.services.single_flight import single_flight
+from app.services.maintenance import maintenance_scheduler
+from app.db import db as database
+from app.db.db import get_engine
+from app.db.migrations import migration_runner
+from app.db.pool import get_pool_stats
+from app.db.shared_cache import shared_cache
+from app.api.responses import APIResponse
+from app.api.deps import get_current_user
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.get("/admin/single-flight", response_model=APIResponse[dict])
+async def get_single_flight_stats(current_user: str = Depends(get_current_user)):
+    """Get request coalescing counters and ratios."""
+    return APIResponse(
+        message="Single-flight stats retrieved successfully",
+        data=single_flight.get_stats()
+    )
+
+
+@router.get("/admin/admission", response_model=APIResponse[dict])
+async def get_admission_control_stats(current_user: str = Depends(get_current_user)):
+    """Get admission control load, latency and rejection counters."""
+    return APIResponse(
+        message="Admission control stats retrieved successfully",
+        data=get_admission_stats() or {"enabled": False}
+    )
+
+
+@router.get("/admin/tenants", response_model=APIResponse[dict])
+async def get_tenant_engine_stats(current_user: str = Depends(get_current_user)):
+    """Get the open tenant engines and eviction counters."""
+    return APIResponse(
+        message="Tenant engine stats retrieved successfully",
+        data=database.tenant_engines.get_stats()
+    )
+
+
+@router.get("/admin/replicas", response_model=APIResponse[dict])
+async def get_replica_stats(current_user: str = Depends(get_current_user)):
+    """Get read-replica health and read counts."""
+    return APIResponse(
+        message="Replica stats retrieved successfully",
+        data=database.replica_pool.get_stats()
+    )
+
+
+@router.get("/admin/pool", response_model=APIResponse[dict])
+async def get_connection_pool_stats(current_user: str = Depends(get_current_user)):
+    """Get connection pool occupancy, checkout waits and exhaustion counters."""
+    return APIResponse(
+        message="Connection pool stats retrieved successfully",
+        data={
+            "primary": get_pool_stats(database.engine),
+            "replicas": {replica.name: get_pool_stats(replica.engine) for replica in database.replica_pool.replicas},
+            "tenants": {tenant: get_pool_stats(tenant_engine) for tenant, tenant_engine in database.tenant_engines.items()},
+        }
+    )
+
+
+@router.get("/admin/shared-cache", response_model=APIResponse[dict])
+async def get_shared_cache_stats(current_user: str = Depends(get_current_user)):
+    """Get the shared cache's layout and this worker's hit counters."""
+    return APIResponse(
+        message="Shared cache stats retrieved successfully",
+        data={"pid": os.getpid(), **shared_cache.get_stats()}
+    )
+
+
+@router.get("/admin/startup", response_model=APIResponse[dict])
+async def get_startup_report(request: Request, current_user: str = Depends(get_current_user)):
+    """Get how long each startup phase of this worker took."""
+    return APIResponse(
+        message="Startup report retrieved successfully",
+        data=request.app.state.startup.to_dict()
+    )
+
+
+@router.get("/admin/migrations", response_model=APIResponse[dict])
+def get_migration_status(current_user: str = Depends(get_current_user)):
+    """Get applied schema migrations and the progress of their backfills."""
+    return APIResponse(
+        message="Migration status retrieved successfully",
+        data={"migrations": migration_runner.get_status(get_engine())}
+    )
+
+
+@router.get("/admin/scheduler", response_model=APIResponse[dict])
+def get_scheduler_status(current_user: str = Depends(get_current_user)):
+    """Get the maintenance jobs with their last run and this worker's schedule."""
+    with Session(get_engine()) as session:
+        data = maintenance_scheduler.get_status(session)
+    return APIResponse(
+        message="Scheduler status retrieved successfully",
+        data=data
+    )
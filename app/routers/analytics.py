@@ -0,0 +1,68 @@
+"""Analytics API routes."""
+
+from typing import List
+from fastapi import APIRouter, Query, Depends
+
+from app.db.db import SessionDep
+from app.services.analytics import analytics_service
+from app.api.responses import APIResponse
+from app.api.deps import get_current_user
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.get("/analytics/plans", response_model=APIResponse[List[dict]])
+async def get_plan_analytics(session: SessionDep):
+    """Get revenue and active member counts per plan."""
+    plans = analytics_service.get_plans(session)
+    
+    return APIResponse(
+        message="Plan analytics retrieved successfully",
+        data=plans
+    )
+
+
+@router.get("/analytics/top-customers", response_model=APIResponse[List[dict]])
+async def get_top_customers(
+    session: SessionDep,
+    n: int = Query(10, ge=1, le=1000, description="Number of customers to return")
+):
+    """Get the customers with the highest total spend."""
+    customers = analytics_service.get_top_customers(session, n)
+    
+    return APIResponse(
+        message="Top customers retrieved successfully",
+        data=customers
+    )
+
+
+@router.get("/analytics/summary", response_model=APIResponse[dict])
+async def get_analytics_summary(session: SessionDep):
+    """Get overall revenue and membership totals."""
+    summary = analytics_service.get_summary(session)
+    
+    return APIResponse(
+        message="Analytics summary retrieved successfully",
+        data=summary
+    )
+
+
+@router.post("/analytics/refresh", response_model=APIResponse[dict])
+async def refresh_analytics(
+    session: SessionDep,
+    rebuild: bool = Query(False, description="Rebuild rollups from scratch"),
+    current_user: str = Depends(get_current_user)
+):
+    """Refresh the analytics rollups (authenticated endpoint)."""
+    if rebuild:
+        processed = analytics_service.rebuild(session)
+    else:
+        processed = analytics_service.refresh(session)
+    logger.info(f"Analytics {'rebuilt' if rebuild else 'refreshed'} by {current_user}")
+    
+    return APIResponse(
+        message="Analytics refreshed successfully",
+        data={"processed_transactions": processed, "rebuild": rebuild}
+    )
@@ -0,0 +1,34 @@
+"""Batch API routes."""
+
+from fastapi import APIRouter, Depends
+
+from app.db.db import get_engine
+from app.db.hooks import SingleCommitSession
+from app.models import BatchRequest
+from app.services.batch import batch_service
+from app.api.responses import APIResponse
+from app.api.deps import get_current_user
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.post("/batch", response_model=APIResponse[list[dict]])
+async def run_batch(
+    batch: BatchRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """Run up to 100 operations in order, in one database transaction.
+    
+    Later operations can use ids created earlier in the batch through
+    ``"$ref"`` arguments. If any operation fails, none is applied.
+    """
+    with SingleCommitSession(get_engine()) as session:
+        results = batch_service.execute(session, batch.operations)
+    logger.info(f"Batch of {len(results)} operations run by {current_user}")
+    
+    return APIResponse(
+        message="Batch completed successfully",
+        data=results
+    )
@@ -0,0 +1,53 @@
+"""Billing API routes."""
+
+from fastapi import APIRouter, BackgroundTasks, status, Depends
+from sqlmodel import Session
+
+from app.db.db import SessionDep, get_engine
+from app.models import BillingRunCreate
+from app.services.billing import billing_service
+from app.api.responses import APIResponse
+from app.api.deps import get_current_user
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+def _execute_run(run_id: int, workers: int) -> None:
+    """Execute a billing run outside the request."""
+    with Session(get_engine()) as session:
+        billing_service.execute(session, run_id, workers)
+
+
+@router.post("/billing/runs", response_model=APIResponse[dict], status_code=status.HTTP_202_ACCEPTED)
+async def start_billing_run(
+    run_data: BillingRunCreate,
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    current_user: str = Depends(get_current_user)
+):
+    """Start (or resume) the billing run for a period."""
+    run = billing_service.get_or_create_run(session, run_data.period, run_data.chunk_size)
+    background_tasks.add_task(_execute_run, run.id, run_data.workers)
+    logger.info(f"Billing run {run.id} for {run.period} started by {current_user}")
+    
+    return APIResponse(
+        message="Billing run started",
+        data=billing_service.get_report(session, run.id)
+    )
+
+
+@router.get("/billing/runs/{run_id}", response_model=APIResponse[dict])
+async def get_billing_run(
+    run_id: int,
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Get a billing run report with per-chunk timing."""
+    report = billing_service.get_report(session, run_id)
+    
+    return APIResponse(
+        message="Billing run retrieved successfully",
+        data=report
+    )
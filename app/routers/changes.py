@@ -0,0 +1,161 @@
+"""Change feed API routes."""
+
+import asyncio
+import json
+import time
+from typing import List, Optional
+from fastapi import APIRouter, Request, Query, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.db.db import SessionDep, get_engine
+from app.db.shared_cache import shared_cache
+from app.services.changes import change_service, change_broadcaster
+from app.api.responses import APIResponse
+from app.api.deps import get_current_user
+from app.core.config import get_settings
+from app.core.readiness import drain
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+router = APIRouter()
+
+# Changes read from the database per catch-up query
+CATCH_UP_BATCH = 500
+
+# How often a stream checks for commits made by other worker processes,
+# and whether the server is draining
+POLL_SECONDS = 0.5
+
+
+def _read_since(since: int, entities: Optional[List[str]]) -> dict:
+    """Read a batch of logged changes in a fresh session."""
+    with Session(get_engine()) as session:
+        return change_service.list_since(session, since, CATCH_UP_BATCH, entities)
+
+
+def _format_event(change: dict) -> str:
+    """Format a change as a server-sent event."""
+    return f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change)}\n\n"
+
+
+async def _stream_changes(request: Request, since: int, entities: Optional[List[str]]):
+    """Yield logged changes after ``since``, then live ones as they commit.
+
+    The subscription is opened before catching up from the log so no
+    commit between the two is missed; live changes already sent during
+    catch-up are skipped by sequence number. Commits made by other worker
+    processes are only announced through the shared ``changes``
+    generation, which is polled; when it moves, the stream reads the log.
+    Streams end when the server starts draining, so shutdown does not
+    wait on them; clients reconnect with ``Last-Event-ID``.
+    """
+    subscriber = change_broadcaster.subscribe()
+    last_seq = since
+    keepalive_at = time.monotonic() + settings.change_stream_keepalive_seconds
+    try:
+        catching_up = True
+        while True:
+            if catching_up:
+                subscriber.overflowed = False
+                generation = shared_cache.generation("changes")
+                page = await run_in_threadpool(_read_since, last_seq, entities)
+                for change in page["changes"]:
+                    yield _format_event(change)
+                last_seq = page["next_since"]
+                catching_up = page["has_more"]
+                continue
+            if drain.draining:
+                break
+
+            try:
+                change = await asyncio.wait_for(
+                    subscriber.queue.get(),
+                    timeout=min(POLL_SECONDS, max(keepalive_at - time.monotonic(), 0))
+                )
+            except asyncio.TimeoutError:
+                if shared_cache.generation("changes") != generation:
+                    catching_up = True
+                    continue
+                if time.monotonic() < keepalive_at:
+                    continue
+                if await request.is_disconnected():
+                    break
+                keepalive_at = time.monotonic() + settings.change_stream_keepalive_seconds
+                yield ": keepalive\n\n"
+                continue
+
+            if subscriber.overflowed:
+                # Live changes were dropped; fall back to the log
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                catching_up = True
+                continue
+
+            if change["seq"] <= last_seq or (entities and change["entity"] not in entities):
+                continue
+            last_seq = change["seq"]
+            yield _format_event(change)
+    finally:
+        change_broadcaster.unsubscribe(subscriber)
+
+
+@router.get("/changes", response_model=APIResponse[dict])
+async def get_changes(
+    session: SessionDep,
+    since: int = Query(0, ge=0, description="Return changes after this sequence number"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of changes to return"),
+    entity: Optional[List[str]] = Query(None, description="Only changes to these entities")
+):
+    """Get changes after a sequence number, oldest first."""
+    page = change_service.list_since(session, since, limit, entity)
+
+    return APIResponse(
+        message="Changes retrieved successfully",
+        data=page
+    )
+
+
+@router.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Replay changes after this sequence number"),
+    entity: Optional[List[str]] = Query(None, description="Only changes to these entities")
+):
+    """Stream changes as server-sent events.
+
+    Without ``since`` (or a ``Last-Event-ID`` header) the stream starts at
+    the current end of the log.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    if since is None and last_event_id.isdigit():
+        since = int(last_event_id)
+    if since is None:
+        with Session(get_engine()) as session:
+            since = change_service.latest_seq(session)
+    else:
+        # Fail fast with 410 if the client is too far behind
+        await run_in_threadpool(_read_since, since, entity)
+
+    return StreamingResponse(
+        _stream_changes(request, since, entity),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/changes/compact", response_model=APIResponse[dict])
+async def compact_changes(
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Remove superseded changes and expired deletion tombstones."""
+    result = change_service.compact(session)
+    logger.info(f"Change log compacted by {current_user}")
+
+    return APIResponse(
+        message="Change log compacted successfully",
+        data=result
+    )
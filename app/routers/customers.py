@@ -1,22 +1,32 @@
 """Customer API routes."""
 
-from typing import List, Optional
-from fastapi import APIRouter, status, Query, Depends
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, BackgroundTasks, status, Query, Depends
+from sqlmodel import Session
 
-from app.db.db import SessionDep
+from app.db.db import SessionDep, get_engine
 from app.models import Customer, CustomerCreate, CustomerUpdate, CustomerPlan, StatusEnum
 from app.services.customer import customer_service
-from app.api.responses import APIResponse, PaginatedResponse
+from app.services.purge import purge_service
+from app.services.single_flight import single_flight
+from app.api.fast_body import FastBody, FastJSONRoute
+from app.api.responses import APIResponse, PaginatedResponse, CursorPage
 from app.api.deps import get_current_user
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+
+
+def _run_purge(job_id: int) -> None:
+    """Purge a soft-deleted customer outside the request."""
+    with Session(get_engine()) as session:
+        purge_service.run(session, job_id)
 
 
 @router.post("/customers", response_model=APIResponse[Customer], status_code=status.HTTP_201_CREATED)
 async def create_customer(
-    customer_data: CustomerCreate, 
+    customer_data: Annotated[CustomerCreate, FastBody], 
     session: SessionDep,
     current_user: str = Depends(get_current_user)
 ):
@@ -30,10 +40,26 @@ async def create_customer(
     )
 
 
+@router.get("/customers/search", response_model=APIResponse[CursorPage[Customer]])
+async def search_customers(
+    session: SessionDep,
+    q: str = Query(..., min_length=1, max_length=100, description="Name, email or description fragment"),
+    limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page")
+):
+    """Search customers, best matches first."""
+    customers, next_cursor = customer_service.search(session, q, limit=limit, cursor=cursor)
+    
+    return APIResponse(
+        message="Customers retrieved successfully",
+        data=CursorPage(items=customers, next_cursor=next_cursor)
+    )
+
+
 @router.get("/customers/{customer_id}", response_model=APIResponse[Customer])
 async def get_customer(customer_id: int, session: SessionDep):
     """Get a customer by ID."""
-    customer = customer_service.get_or_404(session, customer_id)
+    customer = await single_flight.run("get_customer", customer_service.get_or_404, session, customer_id)
     
     return APIResponse(
         message="Customer retrieved successfully",
@@ -44,7 +70,7 @@ async def get_customer(customer_id: int, session: SessionDep):
 @router.patch("/customers/{customer_id}", response_model=APIResponse[Customer])
 async def update_customer(
     customer_id: int, 
-    customer_data: CustomerUpdate, 
+    customer_data: Annotated[CustomerUpdate, FastBody], 
     session: SessionDep,
     current_user: str = Depends(get_current_user)
 ):
@@ -63,15 +89,35 @@ async def update_customer(
 async def delete_customer(
     customer_id: int, 
     session: SessionDep,
+    background_tasks: BackgroundTasks,
     current_user: str = Depends(get_current_user)
 ):
-    """Delete a customer."""
-    customer_service.delete(session, customer_id)
+    """Delete a customer.
+    
+    The customer is hidden immediately; its data is purged in the background.
+    """
+    job = customer_service.delete(session, customer_id)
+    background_tasks.add_task(_run_purge, job.id)
     logger.info(f"Customer {customer_id} deleted by {current_user}")
     
     return APIResponse(
         message="Customer deleted successfully",
-        data={"deleted_id": customer_id}
+        data={"deleted_id": customer_id, "purge_job_id": job.id}
+    )
+
+
+@router.get("/customers/{customer_id}/purge", response_model=APIResponse[dict])
+async def get_customer_purge(
+    customer_id: int, 
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Get the progress of a deleted customer's purge."""
+    job = purge_service.get_for_customer(session, customer_id)
+    
+    return APIResponse(
+        message="Customer purge retrieved successfully",
+        data=purge_service.get_progress(session, job)
     )
 
 
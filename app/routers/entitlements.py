@@ -0,0 +1,51 @@
+"""Entitlement API routes."""
+
+from typing import List, Optional
+from fastapi import APIRouter, Query
+
+from app.db.db import SessionDep
+from app.models import EntitlementCheckRequest
+from app.services.entitlements import entitlement_service
+from app.api.responses import APIResponse
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.get("/entitlements/stats", response_model=APIResponse[dict])
+async def get_entitlement_index_stats(session: SessionDep):
+    """Get the size and memory footprint of the entitlement index."""
+    return APIResponse(
+        message="Entitlement index stats retrieved successfully",
+        data=entitlement_service.get_stats(session)
+    )
+
+
+@router.get("/entitlements/{customer_id}", response_model=APIResponse[dict])
+async def get_entitlements(
+    customer_id: int,
+    session: SessionDep,
+    plan_id: Optional[int] = Query(None, description="Only check this plan")
+):
+    """Get the active plans of a customer, or check a single plan."""
+    if plan_id is not None:
+        data = entitlement_service.check(session, [{"customer_id": customer_id, "plan_id": plan_id}])[0]
+    else:
+        data = entitlement_service.get_for_customer(session, customer_id)
+    
+    return APIResponse(
+        message="Entitlements retrieved successfully",
+        data=data
+    )
+
+
+@router.post("/entitlements:check", response_model=APIResponse[List[dict]])
+async def check_entitlements(request: EntitlementCheckRequest, session: SessionDep):
+    """Check a batch of customer/plan pairs."""
+    results = entitlement_service.check(session, [check.model_dump() for check in request.checks])
+    
+    return APIResponse(
+        message="Entitlements checked successfully",
+        data=results
+    )
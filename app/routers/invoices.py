@@ -0,0 +1,73 @@
+"""Invoice API routes."""
+
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, status, Query, Depends
+from sqlmodel import Session
+
+from app.db.db import SessionDep, get_engine
+from app.models import InvoiceRun, CustomerInvoice
+from app.services.invoice import invoice_service
+from app.services.customer import customer_service
+from app.api.responses import APIResponse, CursorPage
+from app.api.deps import get_current_user
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+def _generate_invoices(workers: int) -> None:
+    """Run invoice generation outside the request."""
+    with Session(get_engine()) as session:
+        invoice_service.generate(session, workers)
+
+
+@router.post("/invoices/generate", response_model=APIResponse[InvoiceRun], status_code=status.HTTP_202_ACCEPTED)
+async def generate_invoices(
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    workers: int = Query(1, ge=1, le=32, description="Parallel worker threads"),
+    current_user: str = Depends(get_current_user)
+):
+    """Generate invoices for all transactions not yet invoiced."""
+    run = invoice_service.get_or_create_run(session, partitions=workers * 4 if workers > 1 else 1)
+    background_tasks.add_task(_generate_invoices, workers)
+    logger.info(f"Invoice run {run.id} started by {current_user}")
+    
+    return APIResponse(
+        message="Invoice generation started",
+        data=run
+    )
+
+
+@router.get("/invoices/runs/{run_id}", response_model=APIResponse[InvoiceRun])
+async def get_invoice_run(
+    run_id: int,
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Get the status of an invoice run."""
+    run = invoice_service.get_run(session, run_id)
+    
+    return APIResponse(
+        message="Invoice run retrieved successfully",
+        data=run
+    )
+
+
+@router.get("/customers/{customer_id}/invoices", response_model=APIResponse[CursorPage[CustomerInvoice]])
+async def get_customer_invoices(
+    customer_id: int,
+    session: SessionDep,
+    cursor: Optional[int] = Query(None, description="Return invoices older than this cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+):
+    """Get stored invoices for a customer, newest first."""
+    customer_service.get_or_404(session, customer_id)
+    invoices = invoice_service.get_by_customer(session, customer_id, before_id=cursor, limit=limit)
+    next_cursor = str(invoices[-1].id) if len(invoices) == limit else None
+    
+    return APIResponse(
+        message="Customer invoices retrieved successfully",
+        data=CursorPage(items=invoices, next_cursor=next_cursor)
+    )
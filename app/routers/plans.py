@@ -1,11 +1,15 @@
 """Plan API routes."""
 
-from fastapi import APIRouter, status, Query, Depends
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, status, Query, Depends
+from sqlmodel import Session
 
-from app.db.db import SessionDep
-from app.models import Plan, PlanCreate, PlanUpdate
+from app.db.db import SessionDep, get_engine
+from app.models import Plan, PlanCreate, PlanUpdate, Customer, StatusEnum, PlanOperationCreate
 from app.services.plan import plan_service
-from app.api.responses import APIResponse, PaginatedResponse
+from app.services.plan_operations import plan_operation_service
+from app.services.single_flight import single_flight
+from app.api.responses import APIResponse, PaginatedResponse, CursorPage
 from app.api.deps import get_current_user
 from app.core.logging import get_logger
 
@@ -13,6 +17,12 @@ logger = get_logger(__name__)
 router = APIRouter()
 
 
+def _run_operation(operation_id: int) -> None:
+    """Run a bulk plan operation outside the request."""
+    with Session(get_engine()) as session:
+        plan_operation_service.run(session, operation_id)
+
+
 @router.post("/plans", response_model=APIResponse[Plan], status_code=status.HTTP_201_CREATED)
 async def create_plan(
     plan_data: PlanCreate, 
@@ -32,7 +42,7 @@ async def create_plan(
 @router.get("/plans/{plan_id}", response_model=APIResponse[Plan])
 async def get_plan(plan_id: int, session: SessionDep):
     """Get a plan by ID."""
-    plan = plan_service.get_or_404(session, plan_id)
+    plan = await single_flight.run("get_plan", plan_service.get_cached, session, plan_id)
     
     return APIResponse(
         message="Plan retrieved successfully",
@@ -40,6 +50,23 @@ async def get_plan(plan_id: int, session: SessionDep):
     )
 
 
+@router.get("/plans/{plan_id}/customers", response_model=APIResponse[CursorPage[Customer]])
+async def get_plan_customers(
+    plan_id: int,
+    session: SessionDep,
+    status: Optional[StatusEnum] = Query(None, description="Only memberships with this status"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page")
+):
+    """Get the customers of a plan, keyset-paginated."""
+    customers, next_cursor = plan_service.get_members(session, plan_id, status, limit=limit, cursor=cursor)
+    
+    return APIResponse(
+        message="Plan customers retrieved successfully",
+        data=CursorPage(items=customers, next_cursor=next_cursor)
+    )
+
+
 @router.patch("/plans/{plan_id}", response_model=APIResponse[Plan])
 async def update_plan(
     plan_id: int,
@@ -81,8 +108,7 @@ async def get_plans(
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
 ):
     """Get plans with pagination."""
-    plans = plan_service.get_multi(session, skip=skip, limit=limit)
-    total = plan_service.count(session)
+    plans, total = await single_flight.run("get_plans", plan_service.get_page_cached, session, skip, limit)
     
     paginated_data = PaginatedResponse(
         items=plans,
@@ -95,4 +121,36 @@ async def get_plans(
     return APIResponse(
         message="Plans retrieved successfully",
         data=paginated_data
-    )
\ No newline at end of file
+    )
+
+@router.post("/plan-operations", response_model=APIResponse[dict], status_code=status.HTTP_202_ACCEPTED)
+async def start_plan_operation(
+    operation_data: PlanOperationCreate,
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    current_user: str = Depends(get_current_user)
+):
+    """Start a bulk plan operation: migrate members, attach a plan or set membership status."""
+    operation = plan_operation_service.create(session, operation_data)
+    background_tasks.add_task(_run_operation, operation.id)
+    logger.info(f"Plan operation {operation.id} ({operation.kind.value}) started by {current_user}")
+    
+    return APIResponse(
+        message="Plan operation started",
+        data=plan_operation_service.get_progress(session, operation)
+    )
+
+
+@router.get("/plan-operations/{operation_id}", response_model=APIResponse[dict])
+async def get_plan_operation(
+    operation_id: int,
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Get the progress of a bulk plan operation."""
+    operation = plan_operation_service.get_operation(session, operation_id)
+    
+    return APIResponse(
+        message="Plan operation retrieved successfully",
+        data=plan_operation_service.get_progress(session, operation)
+    )
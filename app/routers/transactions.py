@@ -1,22 +1,24 @@
 """Transaction API routes."""
 
-from typing import List
+from datetime import datetime
+from typing import Annotated, List, Literal, Optional
 from fastapi import APIRouter, status, Query, Depends
 
 from app.db.db import SessionDep
 from app.models import Transaction, TransactionCreate, TransactionUpdate
 from app.services.transaction import transaction_service
+from app.api.fast_body import FastBody, FastJSONRoute
 from app.api.responses import APIResponse, PaginatedResponse
 from app.api.deps import get_current_user
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 @router.post("/transactions", response_model=APIResponse[Transaction], status_code=status.HTTP_201_CREATED)
 async def create_transaction(
-    transaction_data: TransactionCreate, 
+    transaction_data: Annotated[TransactionCreate, FastBody], 
     session: SessionDep,
     current_user: str = Depends(get_current_user)
 ):
@@ -30,10 +32,26 @@ async def create_transaction(
     )
 
 
+@router.get("/transactions/timeseries", response_model=APIResponse[List[dict]])
+async def get_transaction_timeseries(
+    session: SessionDep,
+    bucket: Literal["day", "week", "month"] = Query("day", description="Bucket size"),
+    created_from: Optional[datetime] = Query(None, alias="from", description="Start of range (inclusive, UTC)"),
+    created_to: Optional[datetime] = Query(None, alias="to", description="End of range (exclusive, UTC)")
+):
+    """Get transaction totals aggregated per day, week or month."""
+    series = transaction_service.get_timeseries(session, bucket, created_from, created_to)
+    
+    return APIResponse(
+        message="Transaction time series retrieved successfully",
+        data=series
+    )
+
+
 @router.get("/transactions/{transaction_id}", response_model=APIResponse[Transaction])
 async def get_transaction(transaction_id: int, session: SessionDep):
-    """Get a transaction by ID."""
-    transaction = transaction_service.get_or_404(session, transaction_id)
+    """Get a transaction by ID, including archived transactions."""
+    transaction = transaction_service.get_with_archive(session, transaction_id)
     
     return APIResponse(
         message="Transaction retrieved successfully",
@@ -44,7 +62,7 @@ async def get_transaction(transaction_id: int, session: SessionDep):
 @router.patch("/transactions/{transaction_id}", response_model=APIResponse[Transaction])
 async def update_transaction(
     transaction_id: int,
-    transaction_data: TransactionUpdate,
+    transaction_data: Annotated[TransactionUpdate, FastBody],
     session: SessionDep,
     current_user: str = Depends(get_current_user)
 ):
@@ -79,11 +97,15 @@ async def delete_transaction(
 async def get_transactions(
     session: SessionDep,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    created_from: Optional[datetime] = Query(None, alias="from", description="Start of range (inclusive, UTC)"),
+    created_to: Optional[datetime] = Query(None, alias="to", description="End of range (exclusive, UTC)")
 ):
     """Get transactions with pagination."""
-    transactions = transaction_service.get_multi(session, skip=skip, limit=limit)
-    total = transaction_service.count(session)
+    transactions = transaction_service.get_multi(
+        session, skip=skip, limit=limit, created_from=created_from, created_to=created_to
+    )
+    total = transaction_service.count(session, created_from=created_from, created_to=created_to)
     
     paginated_data = PaginatedResponse(
         items=transactions,
@@ -104,10 +126,14 @@ async def get_customer_transactions(
     customer_id: int,
     session: SessionDep,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    created_from: Optional[datetime] = Query(None, alias="from", description="Start of range (inclusive, UTC)"),
+    created_to: Optional[datetime] = Query(None, alias="to", description="End of range (exclusive, UTC)")
 ):
     """Get all transactions for a specific customer."""
-    transactions = transaction_service.get_by_customer(session, customer_id, skip, limit)
+    transactions = transaction_service.get_by_customer(
+        session, customer_id, skip, limit, created_from=created_from, created_to=created_to
+    )
     
     return APIResponse(
         message="Customer transactions retrieved successfully",
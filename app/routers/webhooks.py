@@ -0,0 +1,109 @@
+"""Webhook API routes."""
+
+from typing import List, Optional
+from fastapi import APIRouter, status, Query, Depends
+
+from app.db.db import SessionDep
+from app.models import WebhookEndpoint, WebhookEndpointCreate, WebhookDelivery, DeliveryStatusEnum
+from app.services.webhooks import webhook_service, webhook_dispatcher
+from app.api.responses import APIResponse, CursorPage
+from app.api.deps import get_current_user
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+@router.post("/webhooks/endpoints", response_model=APIResponse[WebhookEndpoint], status_code=status.HTTP_201_CREATED)
+async def create_webhook_endpoint(
+    endpoint_data: WebhookEndpointCreate,
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Register an endpoint to receive event batches."""
+    endpoint = webhook_service.create(session, endpoint_data)
+    logger.info(f"Webhook endpoint created by {current_user}: {endpoint.id}")
+
+    return APIResponse(
+        message="Webhook endpoint created successfully",
+        data=endpoint
+    )
+
+
+@router.get("/webhooks/endpoints", response_model=APIResponse[List[WebhookEndpoint]])
+async def get_webhook_endpoints(
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Get all registered webhook endpoints."""
+    endpoints = webhook_service.get_multi(session, limit=1000)
+
+    return APIResponse(
+        message="Webhook endpoints retrieved successfully",
+        data=endpoints
+    )
+
+
+@router.delete("/webhooks/endpoints/{endpoint_id}", response_model=APIResponse[dict])
+async def delete_webhook_endpoint(
+    endpoint_id: int,
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Delete a webhook endpoint and its deliveries."""
+    webhook_service.delete(session, endpoint_id)
+    logger.info(f"Webhook endpoint {endpoint_id} deleted by {current_user}")
+
+    return APIResponse(
+        message="Webhook endpoint deleted successfully",
+        data={"deleted_id": endpoint_id}
+    )
+
+
+@router.get("/webhooks/deliveries", response_model=APIResponse[CursorPage[WebhookDelivery]])
+async def get_webhook_deliveries(
+    session: SessionDep,
+    delivery_status: Optional[DeliveryStatusEnum] = Query(None, alias="status", description="Filter by delivery status"),
+    cursor: Optional[int] = Query(None, description="Return deliveries older than this cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    current_user: str = Depends(get_current_user)
+):
+    """Get webhook deliveries, newest first; ``status=dead`` lists the dead letters."""
+    deliveries = webhook_service.get_deliveries(session, delivery_status, before_id=cursor, limit=limit)
+    next_cursor = str(deliveries[-1].id) if len(deliveries) == limit else None
+
+    return APIResponse(
+        message="Webhook deliveries retrieved successfully",
+        data=CursorPage(items=deliveries, next_cursor=next_cursor)
+    )
+
+
+@router.post("/webhooks/deliveries/{delivery_id}/retry", response_model=APIResponse[WebhookDelivery])
+async def retry_webhook_delivery(
+    delivery_id: int,
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Requeue a dead-lettered delivery."""
+    delivery = webhook_service.retry(session, delivery_id)
+    logger.info(f"Webhook delivery {delivery_id} requeued by {current_user}")
+
+    return APIResponse(
+        message="Webhook delivery requeued successfully",
+        data=delivery
+    )
+
+
+@router.get("/webhooks/stats", response_model=APIResponse[dict])
+async def get_webhook_stats(
+    session: SessionDep,
+    current_user: str = Depends(get_current_user)
+):
+    """Get outbox backlog, delivery counts and dispatcher state."""
+    return APIResponse(
+        message="Webhook stats retrieved successfully",
+        data={
+            **webhook_service.get_stats(session),
+            "dispatcher": webhook_dispatcher.get_stats(),
+        }
+    )
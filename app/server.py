@@ -0,0 +1,224 @@
+"""Multi-worker server: one listening socket, forked uvicorn workers.
+
+Usage: python -m app.server [--host 0.0.0.0] [--port 8000] [--workers N]
+
+The parent prepares the database once (table creation, demo data, the
+analytics refresh and the entitlement index, as the startup settings
+allow), builds the app and its OpenAPI schema, maps the shared cache and
+binds the socket, then forks the workers. They inherit all of it, so
+each worker only opens its own database connections. The parent
+restarts workers that die and passes SIGTERM/SIGINT on to them; a
+stopping worker fails ``/ready``, finishes its in-flight requests, then
+drains background work (see ``app.core.readiness``).
+
+Workers are forked rather than spawned (as ``uvicorn --workers`` does)
+so that they share the cache's memory.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging, get_logger
+from app.core.readiness import drain
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Seconds between checks for exited workers
+SUPERVISE_INTERVAL = 0.5
+
+# Workers dying sooner than this after starting are not restarted
+MIN_WORKER_UPTIME_SECONDS = 5.0
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (its affinity mask, not the host's count)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    """``web_concurrency`` if set, else one worker per available CPU."""
+    return settings.web_concurrency or available_cpus()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    # An explicit protocol makes asyncio set TCP_NODELAY on accepted
+    # connections; without it responses wait on delayed ACKs (~40 ms)
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare():
+    """Run the once-per-deployment startup phases and build the workers' app."""
+    from app.db import db as database
+    from app.db.db import create_db_and_tables, seed_demo_data, refresh_analytics, build_entitlement_index
+    from app.db.shared_cache import shared_cache
+    from app.core.startup import load_openapi
+    from app.main import create_app
+
+    if settings.startup_create_tables:
+        create_db_and_tables()
+    if settings.startup_seed_demo_data:
+        seed_demo_data()
+    if settings.startup_refresh_analytics:
+        refresh_analytics()
+    if settings.startup_build_entitlement_index:
+        build_entitlement_index()
+    shared_cache.allocate()
+
+    app = create_app(settings.model_copy(update={
+        "startup_create_tables": False,
+        "startup_seed_demo_data": False,
+        "startup_refresh_analytics": False,
+        "startup_build_entitlement_index": False,
+        "openapi_cache_path": "",
+    }))
+    if not load_openapi(app, settings.openapi_cache_path):
+        app.openapi()
+    # Connections must not be shared across fork
+    database.tenant_engines.dispose_all()
+    database.replica_pool.dispose()
+    database.engine.dispose()
+    return app
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server that fails ``/ready`` as soon as it is told to stop.
+
+    With ``shutdown_drain_delay_seconds`` it keeps accepting requests for
+    that long first, giving load balancers time to notice.
+    """
+
+    def handle_exit(self, sig, frame) -> None:
+        delay = settings.shutdown_drain_delay_seconds
+        if drain.draining or delay <= 0:
+            drain.begin(f"signal {sig}")
+            super().handle_exit(sig, frame)
+            return
+        drain.begin(f"signal {sig}")
+        logger.info(f"Stopping in {delay:g} s")
+
+        def stop() -> None:
+            if not self.should_exit:
+                super(DrainingServer, self).handle_exit(sig, frame)
+
+        timer = threading.Timer(delay, stop)
+        timer.daemon = True
+        timer.start()
+
+
+def run_worker(app, sock: socket.socket, worker: int) -> None:
+    """Serve the app on the inherited socket until told to stop."""
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    logger.info(f"Worker {worker} started (pid {os.getpid()})")
+    config = uvicorn.Config(
+        app,
+        log_config=None,
+        timeout_graceful_shutdown=int(settings.worker_graceful_timeout_seconds),
+    )
+    DrainingServer(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Forks the workers and keeps ``workers`` of them running."""
+
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, tuple] = {}  # pid: (worker number, start time)
+        self.stopping = False
+        self.failed = False
+
+    def spawn(self, worker: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock, worker)
+            except BaseException as e:
+                logger.error(f"Worker {worker} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = (worker, time.monotonic())
+
+    def stop(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info(f"Received signal {signum}, stopping {len(self.children)} workers")
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for worker in range(self.workers):
+            self.spawn(worker)
+        logger.info(f"Serving on {self.sock.getsockname()} with {self.workers} workers")
+
+        deadline = None
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if self.stopping:
+                    deadline = deadline or time.monotonic() + settings.shutdown_drain_delay_seconds + \
+                        settings.worker_graceful_timeout_seconds + settings.shutdown_drain_timeout_seconds + 5
+                    if time.monotonic() > deadline:
+                        for child in list(self.children):
+                            os.kill(child, signal.SIGKILL)
+                time.sleep(SUPERVISE_INTERVAL)
+                continue
+            worker, started = self.children.pop(pid)
+            if self.stopping:
+                continue
+            logger.warning(f"Worker {worker} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                logger.error(f"Worker {worker} failed on startup, shutting down")
+                self.failed = True
+                self.stop(signal.SIGTERM, None)
+                continue
+            self.spawn(worker)
+        logger.info("All workers stopped")
+        return 1 if self.failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="worker processes (default: WEB_CONCURRENCY, else one per available CPU)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    setup_logging()
+    app = prepare()
+    sock = bind_socket(args.host, args.port)
+    return Supervisor(app, sock, args.workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""Analytics service backed by materialized rollups."""
+
+from datetime import date, datetime, time, timezone
+from typing import Optional, List
+
+from sqlmodel import Session, select, delete, update, func
+
+from app.models import (
+    Transaction, TransactionArchive, CustomerPlan, Customer, Plan, StatusEnum,
+    PlanRollup, CustomerSpendRollup, TransactionDailyBucket, Checkpoint,
+    UNATTRIBUTED_PLAN_ID,
+)
+from app.db.utils import (
+    upsert_increment, get_checkpoint, set_checkpoint, bucket_expression, dialect_insert,
+)
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Checkpoint names
+TRANSACTIONS_CHECKPOINT = "analytics.transactions"
+CUSTOMERS_CHECKPOINT = "analytics.customer_count"
+DAILY_BUCKETS_CHECKPOINT = "analytics.daily_buckets_until"
+
+# Tables holding transactions: hot rows and archived (read-only) rows
+TRANSACTION_SOURCES = (Transaction, TransactionArchive)
+
+
+class AnalyticsService:
+    """Maintains and reads the analytics rollup tables.
+
+    Rollups are refreshed incrementally: every transaction with an id above
+    the ``analytics.transactions`` checkpoint is folded in, chunk by chunk,
+    and the checkpoint moves forward in the same commit as the rollup rows.
+    Updates and deletes of already folded transactions are applied as
+    deltas by ``TransactionService``. Transactions are only archived once
+    folded in, so the archive only matters for ``rebuild`` and
+    ``close_days``.
+
+    Transactions created since the last refresh are not in the rollups
+    yet: the figures are as of ``as_of_transaction_id`` in the summary.
+
+    Ids are handed out at insert but become visible at commit, so on
+    databases with concurrent writers a lower id can commit after a higher
+    one. Inserts therefore hold a shared lock on the checkpoint row (see
+    ``before_insert``) and each refresh chunk takes it exclusively: a
+    refresh waits for the inserts in flight, and inserts started during a
+    refresh get ids above anything it folds.
+    """
+
+    def __init__(self, chunk_size: int = settings.analytics_refresh_chunk_size):
+        self.chunk_size = chunk_size
+
+    def refresh(self, db: Session, max_chunks: Optional[int] = None) -> int:
+        """Fold new transactions into the rollups. Returns rows processed."""
+        high_water_mark = get_checkpoint(db, TRANSACTIONS_CHECKPOINT)
+        max_id = db.exec(select(func.max(Transaction.id))).one() or 0
+        processed = 0
+        chunks = 0
+
+        while high_water_mark < max_id:
+            if max_chunks is not None and chunks >= max_chunks:
+                break
+            self.wait_for_inserts(db)
+            upper = min(high_water_mark + self.chunk_size, max_id)
+            processed += self._fold_range(db, high_water_mark, upper)
+            set_checkpoint(db, TRANSACTIONS_CHECKPOINT, upper)
+            db.commit()
+            high_water_mark = upper
+            chunks += 1
+
+        self._refresh_memberships(db)
+        db.commit()
+
+        if processed:
+            logger.info(f"Analytics refreshed: {processed} transactions up to id {high_water_mark}")
+        return processed
+
+    def before_insert(self, db: Session) -> None:
+        """Call before inserting transactions, in the same database transaction.
+
+        Keeps a refresh from moving the checkpoint past ids that are taken
+        but not committed yet. SQLite runs one writer at a time, so there
+        it does nothing.
+        """
+        self._lock_checkpoint(db, shared=True)
+
+    def wait_for_inserts(self, db: Session) -> None:
+        """Wait for transaction inserts in flight and hold off new ones until commit.
+
+        Transactions with ids up to the highest one visible afterwards are
+        all committed.
+        """
+        self._lock_checkpoint(db)
+
+    def _lock_checkpoint(self, db: Session, shared: bool = False) -> None:
+        """Lock the refresh checkpoint row until the session's transaction ends."""
+        if db.get_bind().dialect.name == "sqlite":
+            return
+        db.exec(
+            dialect_insert(db, Checkpoint)
+            .values(name=TRANSACTIONS_CHECKPOINT, value=0, updated_at=datetime.now(timezone.utc))
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        db.exec(
+            select(Checkpoint.value)
+            .where(Checkpoint.name == TRANSACTIONS_CHECKPOINT)
+            .with_for_update(read=shared)
+        ).one()
+
+    def rebuild(self, db: Session) -> int:
+        """Drop all rollups and rebuild them from the raw tables."""
+        logger.info("Rebuilding analytics rollups...")
+        db.exec(delete(PlanRollup))
+        db.exec(delete(CustomerSpendRollup))
+        db.exec(delete(TransactionDailyBucket))
+        set_checkpoint(db, TRANSACTIONS_CHECKPOINT, 0)
+        set_checkpoint(db, DAILY_BUCKETS_CHECKPOINT, 0)
+        db.commit()
+        processed = self._fold_archive(db)
+        processed += self.refresh(db)
+        if settings.timeseries_daily_buckets:
+            self.close_days(db)
+        return processed
+
+    def close_days(self, db: Session, until: Optional[date] = None) -> int:
+        """Precompute daily transaction buckets for every day before ``until``.
+
+        ``until`` defaults to the current UTC day, so only closed days are
+        bucketed. Returns the number of day buckets written.
+        """
+        until = until or datetime.now(timezone.utc).date()
+        closed_until = get_checkpoint(db, DAILY_BUCKETS_CHECKPOINT)
+        if closed_until:
+            start = date.fromordinal(closed_until)
+        else:
+            firsts = [
+                first for source in TRANSACTION_SOURCES
+                if (first := db.exec(select(func.min(source.created_at))).one()) is not None
+            ]
+            start = min(firsts).date() if firsts else until
+        if start >= until:
+            return 0
+
+        days = set()
+        for source in TRANSACTION_SOURCES:
+            day = bucket_expression(db, source.created_at, "day")
+            rows = db.exec(
+                select(day, func.sum(source.amount), func.count())
+                .where(
+                    source.created_at >= datetime.combine(start, time.min, timezone.utc),
+                    source.created_at < datetime.combine(until, time.min, timezone.utc),
+                )
+                .group_by(day)
+            ).all()
+            upsert_increment(db, TransactionDailyBucket, "day", [
+                {"day": date.fromisoformat(key), "amount": total, "transaction_count": count}
+                for key, total, count in rows
+            ])
+            days.update(key for key, _, _ in rows)
+        set_checkpoint(db, DAILY_BUCKETS_CHECKPOINT, until.toordinal())
+        db.commit()
+
+        logger.info(f"Closed daily buckets from {start} until {until}: {len(days)} days with data")
+        return len(days)
+
+    def _fold_archive(self, db: Session) -> int:
+        """Add every archived transaction to the rollups, chunk by chunk."""
+        max_id = db.exec(select(func.max(TransactionArchive.id))).one() or 0
+        processed = 0
+        lower = 0
+        while lower < max_id:
+            upper = min(lower + self.chunk_size, max_id)
+            processed += self._fold_range(db, lower, upper, TransactionArchive)
+            db.commit()
+            lower = upper
+        return processed
+
+    def _fold_range(self, db: Session, lower: int, upper: int, source=Transaction) -> int:
+        """Add transactions with lower < id <= upper to the rollups."""
+        in_range = (source.id > lower, source.id <= upper)
+
+        customer_rows = db.exec(
+            select(
+                source.customer_id,
+                func.sum(source.amount),
+                func.count(),
+            ).where(*in_range).group_by(source.customer_id)
+        ).all()
+        upsert_increment(db, CustomerSpendRollup, "customer_id", [
+            {"customer_id": customer_id, "total_amount": total, "transaction_count": count}
+            for customer_id, total, count in customer_rows
+        ])
+
+        plan_key = func.coalesce(source.plan_id, UNATTRIBUTED_PLAN_ID)
+        plan_rows = db.exec(
+            select(plan_key, func.sum(source.amount), func.count())
+            .where(*in_range)
+            .group_by(plan_key)
+        ).all()
+        upsert_increment(db, PlanRollup, "plan_id", [
+            {"plan_id": plan_id, "revenue": total, "transaction_count": count}
+            for plan_id, total, count in plan_rows
+        ])
+
+        return sum(count for _, _, count in customer_rows)
+
+    def _refresh_memberships(self, db: Session) -> None:
+        """Recompute member counts per plan from ``CustomerPlan.status``."""
+        counts: dict[int, dict[str, int]] = {}
+        rows = db.exec(
+            select(CustomerPlan.plan_id, CustomerPlan.status, func.count())
+            .group_by(CustomerPlan.plan_id, CustomerPlan.status)
+        ).all()
+        for plan_id, status, count in rows:
+            counts.setdefault(plan_id, {})[status] = count
+
+        db.exec(update(PlanRollup).values(active_members=0, inactive_members=0))
+        upsert_increment(db, PlanRollup, "plan_id", [
+            {
+                "plan_id": plan_id,
+                "active_members": by_status.get(StatusEnum.active, 0),
+                "inactive_members": by_status.get(StatusEnum.inactive, 0),
+            }
+            for plan_id, by_status in counts.items()
+        ])
+
+        customer_count = db.exec(
+            select(func.count()).select_from(Customer).where(Customer.deleted_at.is_(None))
+        ).one()
+        set_checkpoint(db, CUSTOMERS_CHECKPOINT, customer_count)
+
+    def apply(self, db: Session, transaction: Transaction, sign: int = 1) -> None:
+        """Apply a transaction's contribution as a delta if already folded in.
+
+        Call with ``sign=-1`` to retract a transaction. The delta is written
+        in the caller's transaction so it commits together with the change.
+        """
+        amount = sign * transaction.amount
+        closed_until = get_checkpoint(db, DAILY_BUCKETS_CHECKPOINT)
+        if transaction.created_at and transaction.created_at.date().toordinal() < closed_until:
+            upsert_increment(db, TransactionDailyBucket, "day", [{
+                "day": transaction.created_at.date(),
+                "amount": amount,
+                "transaction_count": sign,
+            }])
+
+        if transaction.id is None or transaction.id > get_checkpoint(db, TRANSACTIONS_CHECKPOINT):
+            return
+        upsert_increment(db, CustomerSpendRollup, "customer_id", [{
+            "customer_id": transaction.customer_id,
+            "total_amount": amount,
+            "transaction_count": sign,
+        }])
+        upsert_increment(db, PlanRollup, "plan_id", [{
+            "plan_id": transaction.plan_id or UNATTRIBUTED_PLAN_ID,
+            "revenue": amount,
+            "transaction_count": sign,
+        }])
+
+    def retract_where(self, db: Session, *conditions, source=Transaction) -> None:
+        """Retract all transactions matching ``conditions`` in bulk.
+
+        Call before deleting the transactions; like ``apply``, the deltas are
+        written in the caller's transaction. ``source`` is ``Transaction`` or
+        ``TransactionArchive``.
+        """
+        folded = (*conditions, source.id <= get_checkpoint(db, TRANSACTIONS_CHECKPOINT))
+        customer_rows = db.exec(
+            select(source.customer_id, func.sum(source.amount), func.count())
+            .where(*folded)
+            .group_by(source.customer_id)
+        ).all()
+        upsert_increment(db, CustomerSpendRollup, "customer_id", [
+            {"customer_id": customer_id, "total_amount": -total, "transaction_count": -count}
+            for customer_id, total, count in customer_rows
+        ])
+
+        plan_key = func.coalesce(source.plan_id, UNATTRIBUTED_PLAN_ID)
+        plan_rows = db.exec(
+            select(plan_key, func.sum(source.amount), func.count())
+            .where(*folded)
+            .group_by(plan_key)
+        ).all()
+        upsert_increment(db, PlanRollup, "plan_id", [
+            {"plan_id": plan_id, "revenue": -total, "transaction_count": -count}
+            for plan_id, total, count in plan_rows
+        ])
+
+        closed_until = get_checkpoint(db, DAILY_BUCKETS_CHECKPOINT)
+        if closed_until:
+            cutoff = datetime.combine(date.fromordinal(closed_until), time.min, timezone.utc)
+            day = bucket_expression(db, source.created_at, "day")
+            day_rows = db.exec(
+                select(day, func.sum(source.amount), func.count())
+                .where(*conditions, source.created_at < cutoff)
+                .group_by(day)
+            ).all()
+            upsert_increment(db, TransactionDailyBucket, "day", [
+                {"day": date.fromisoformat(day_key), "amount": -total, "transaction_count": -count}
+                for day_key, total, count in day_rows
+            ])
+
+    def get_plans(self, db: Session) -> List[dict]:
+        """Get revenue and member counts per plan."""
+        rows = db.exec(
+            select(PlanRollup, Plan.name)
+            .join(Plan, Plan.id == PlanRollup.plan_id, isouter=True)
+            .order_by(PlanRollup.revenue.desc())
+        ).all()
+        return [
+            {
+                "plan_id": rollup.plan_id if rollup.plan_id != UNATTRIBUTED_PLAN_ID else None,
+                "plan_name": name,
+                "revenue": rollup.revenue,
+                "transaction_count": rollup.transaction_count,
+                "active_members": rollup.active_members,
+                "inactive_members": rollup.inactive_members,
+            }
+            for rollup, name in rows
+        ]
+
+    def get_top_customers(self, db: Session, n: int = 10) -> List[dict]:
+        """Get the customers with the highest total spend."""
+        rows = db.exec(
+            select(CustomerSpendRollup, Customer.name, Customer.email)
+            .join(Customer, Customer.id == CustomerSpendRollup.customer_id, isouter=True)
+            .where(Customer.deleted_at.is_(None))
+            .order_by(CustomerSpendRollup.total_amount.desc())
+            .limit(n)
+        ).all()
+        return [
+            {
+                "customer_id": rollup.customer_id,
+                "name": name,
+                "email": email,
+                "total_amount": rollup.total_amount,
+                "transaction_count": rollup.transaction_count,
+            }
+            for rollup, name, email in rows
+        ]
+
+    def get_summary(self, db: Session) -> dict:
+        """Get overall revenue and membership totals."""
+        revenue, transaction_count, active_members, inactive_members = db.exec(
+            select(
+                func.coalesce(func.sum(PlanRollup.revenue), 0),
+                func.coalesce(func.sum(PlanRollup.transaction_count), 0),
+                func.coalesce(func.sum(PlanRollup.active_members), 0),
+                func.coalesce(func.sum(PlanRollup.inactive_members), 0),
+            )
+        ).one()
+        checkpoint = db.get(Checkpoint, TRANSACTIONS_CHECKPOINT)
+        return {
+            "total_revenue": revenue,
+            "transaction_count": transaction_count,
+            "active_memberships": active_members,
+            "inactive_memberships": inactive_members,
+            "customer_count": get_checkpoint(db, CUSTOMERS_CHECKPOINT),
+            "as_of_transaction_id": checkpoint.value if checkpoint else 0,
+            "refreshed_at": checkpoint.updated_at.isoformat() if checkpoint else None,
+            "currency": "cents",
+        }
+
+
+# Service instance
+analytics_service = AnalyticsService()
@@ -0,0 +1,98 @@
+"""Transaction archive service."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlmodel import Session, select, insert, delete, func
+
+from app.models import Transaction, TransactionArchive, InvoiceRun, JobStatusEnum
+from app.services.analytics import analytics_service, TRANSACTIONS_CHECKPOINT
+from app.db.utils import get_checkpoint, set_checkpoint
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Checkpoint holding the archive boundary as a UTC epoch timestamp
+ARCHIVE_CHECKPOINT = "archive.created_before"
+
+ARCHIVED_COLUMNS = ["id", "amount", "description", "customer_id", "plan_id", "created_at"]
+
+
+def archive_boundary(db: Session) -> Optional[datetime]:
+    """Transactions created before this may be archived; ``None`` if never run."""
+    value = get_checkpoint(db, ARCHIVE_CHECKPOINT)
+    return datetime.fromtimestamp(value, timezone.utc) if value else None
+
+
+class ArchiveService:
+    """Moves transactions older than the horizon into ``transaction_archive``.
+
+    Rows are copied with ``INSERT ... SELECT`` and deleted from the hot table
+    in the same commit, one chunk at a time. The boundary checkpoint is
+    raised before any row moves, so readers always know which ranges may
+    need the archive. Only transactions already folded into the analytics
+    rollups and covered by a completed invoice run are moved (both only
+    read the hot table for new transactions), and the newest transaction
+    always stays hot so ids are never reused.
+    """
+
+    def __init__(self, chunk_size: int = settings.archive_chunk_size):
+        self.chunk_size = chunk_size
+
+    def archive(
+        self,
+        db: Session,
+        horizon_days: Optional[int] = None,
+        max_chunks: Optional[int] = None
+    ) -> int:
+        """Archive transactions older than ``horizon_days``. Returns rows moved."""
+        horizon_days = settings.archive_horizon_days if horizon_days is None else horizon_days
+        cutoff = datetime.now(timezone.utc) - timedelta(days=horizon_days)
+
+        analytics_service.refresh(db)
+        set_checkpoint(db, ARCHIVE_CHECKPOINT, max(get_checkpoint(db, ARCHIVE_CHECKPOINT), int(cutoff.timestamp())))
+        db.commit()
+
+        max_id = db.exec(select(func.max(Transaction.id))).one() or 0
+        invoiced_id = db.exec(
+            select(func.max(InvoiceRun.to_transaction_id)).where(InvoiceRun.status == JobStatusEnum.completed)
+        ).one() or 0
+        upper_id = min(get_checkpoint(db, TRANSACTIONS_CHECKPOINT), invoiced_id, max_id - 1)
+        moved = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            ids = db.exec(
+                select(Transaction.id)
+                .where(Transaction.created_at < cutoff, Transaction.id <= upper_id)
+                .order_by(Transaction.id)
+                .limit(self.chunk_size)
+            ).all()
+            if not ids:
+                break
+            db.exec(insert(TransactionArchive).from_select(
+                ARCHIVED_COLUMNS,
+                select(*(getattr(Transaction, column) for column in ARCHIVED_COLUMNS))
+                .where(Transaction.id.in_(ids))
+            ))
+            db.exec(delete(Transaction).where(Transaction.id.in_(ids)))
+            db.commit()
+            moved += len(ids)
+            chunks += 1
+
+        logger.info(f"Archived {moved} transactions created before {cutoff.isoformat()}")
+        return moved
+
+    def get_stats(self, db: Session) -> dict:
+        """Row counts of both tables and the current boundary."""
+        boundary = archive_boundary(db)
+        return {
+            "hot_transactions": db.exec(select(func.count()).select_from(Transaction)).one(),
+            "archived_transactions": db.exec(select(func.count()).select_from(TransactionArchive)).one(),
+            "archived_before": boundary.isoformat() if boundary else None,
+        }
+
+
+# Service instance
+archive_service = ArchiveService()
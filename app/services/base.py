@@ -1,10 +1,11 @@
 """Base service class."""
 
 from typing import Generic, TypeVar, Type, Optional, List
-from sqlmodel import Session, SQLModel, select
+from sqlmodel import Session, SQLModel, select, func
 from sqlalchemy.exc import IntegrityError
 
 from app.api.exceptions import NotFoundError, ConflictError
+from app.services.changes import change_service
 from app.core.logging import get_logger
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
@@ -17,6 +18,9 @@ logger = get_logger(__name__)
 class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Base service with CRUD operations."""
     
+    # Entity name recorded in the change feed; None disables tracking
+    change_entity: Optional[str] = None
+    
     def __init__(self, model: Type[ModelType]):
         self.model = model
     
@@ -43,8 +47,8 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     
     def count(self, db: Session) -> int:
         """Count total records."""
-        statement = select(self.model)
-        return len(db.exec(statement).all())
+        statement = select(func.count()).select_from(self.model)
+        return db.exec(statement).one()
     
     def create(self, db: Session, obj_in: CreateSchemaType) -> ModelType:
         """Create a new record."""
@@ -52,6 +56,8 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             obj_data = obj_in.model_dump()
             db_obj = self.model(**obj_data)
             db.add(db_obj)
+            db.flush()
+            self._before_commit(db, "create", db_obj.id, db_obj)
             db.commit()
             db.refresh(db_obj)
             logger.info(f"Created {self.model.__name__} with id {db_obj.id}")
@@ -74,6 +80,8 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, value)
             
             db.add(db_obj)
+            db.flush()
+            self._before_commit(db, "update", db_obj.id, db_obj)
             db.commit()
             db.refresh(db_obj)
             logger.info(f"Updated {self.model.__name__} with id {db_obj.id}")
@@ -87,6 +95,21 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Delete a record by ID."""
         obj = self.get_or_404(db, id)
         db.delete(obj)
+        self._before_commit(db, "delete", id)
         db.commit()
         logger.info(f"Deleted {self.model.__name__} with id {id}")
-        return True
\ No newline at end of file
+        return True
+    
+    def _before_commit(
+        self, 
+        db: Session, 
+        op: str, 
+        id: int, 
+        obj: Optional[ModelType] = None
+    ) -> None:
+        """Hook for side effects committed together with a write.
+        
+        Logs the change to the change feed if this service tracks changes.
+        """
+        if self.change_entity:
+            change_service.record(db, self.change_entity, id, op, obj)
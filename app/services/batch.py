@@ -0,0 +1,123 @@
+"""Batch service."""
+
+import re
+from typing import Any, Callable, Dict, List
+
+from pydantic import ValidationError as PydanticValidationError
+from sqlmodel import SQLModel
+
+from app.models import (
+    BatchOperation, BatchOperationEnum, BatchPlanLink,
+    CustomerCreate, CustomerUpdate, PlanCreate, PlanUpdate, TransactionCreate, TransactionUpdate,
+)
+from app.db.hooks import SingleCommitSession
+from app.services.customer import customer_service
+from app.services.plan import plan_service
+from app.services.transaction import transaction_service
+from app.api.fast_body import validate
+from app.api.exceptions import APIException, ValidationError
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+REFERENCE_PATTERN = re.compile(r"^\$([A-Za-z_][A-Za-z0-9_]*)(?:\.([A-Za-z_][A-Za-z0-9_]*))?$")
+
+
+def _update(service, update_model):
+    """Operation updating the record ``args["id"]`` with the other arguments."""
+    def run(db: SingleCommitSession, args: dict) -> SQLModel:
+        args = dict(args)
+        if "id" not in args:
+            raise ValidationError("'id' is required")
+        obj = service.get_or_404(db, args.pop("id"))
+        return service.update(db, obj, validate(update_model, args))
+    return run
+
+
+def _plan_link(method):
+    """Operation calling ``method(db, customer_id, plan_id)`` with validated ids."""
+    def run(db: SingleCommitSession, args: dict) -> SQLModel:
+        link = validate(BatchPlanLink, args)
+        return method(db, link.customer_id, link.plan_id)
+    return run
+
+
+class BatchService:
+    """Runs a list of service calls as one database transaction.
+
+    Operations run in order through the usual services on a
+    ``SingleCommitSession``, so their individual commits become flushes
+    and the batch is committed (and fsynced) once at the end. If any
+    operation fails, nothing is written.
+    """
+
+    def __init__(self):
+        self.operations: Dict[BatchOperationEnum, Callable[[SingleCommitSession, dict], SQLModel]] = {
+            BatchOperationEnum.customer_create:
+                lambda db, args: customer_service.create(db, validate(CustomerCreate, args)),
+            BatchOperationEnum.customer_update: _update(customer_service, CustomerUpdate),
+            BatchOperationEnum.customer_add_plan: _plan_link(customer_service.add_plan),
+            BatchOperationEnum.customer_remove_plan: _plan_link(customer_service.remove_plan),
+            BatchOperationEnum.plan_create:
+                lambda db, args: plan_service.create(db, validate(PlanCreate, args)),
+            BatchOperationEnum.plan_update: _update(plan_service, PlanUpdate),
+            BatchOperationEnum.transaction_create:
+                lambda db, args: transaction_service.create(db, validate(TransactionCreate, args)),
+            BatchOperationEnum.transaction_update: _update(transaction_service, TransactionUpdate),
+        }
+
+    def execute(self, db: SingleCommitSession, operations: List[BatchOperation]) -> List[dict]:
+        """Run the operations and commit once. Returns one result per operation."""
+        refs = [operation.ref for operation in operations if operation.ref is not None]
+        if len(refs) != len(set(refs)):
+            raise ValidationError("Each ref may only name one operation")
+
+        results = []
+        named: Dict[str, dict] = {}
+        for position, operation in enumerate(operations):
+            try:
+                args = self._resolve(operation.args, named)
+                obj = self.operations[operation.op](db, args)
+            except APIException as e:
+                db.rollback()
+                raise APIException(
+                    status_code=e.status_code,
+                    message=f"Operation {position} ({operation.op.value}) failed: {e.detail}",
+                    error_code=e.error_code,
+                ) from e
+            except PydanticValidationError as e:
+                db.rollback()
+                errors = "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                )
+                raise ValidationError(f"Operation {position} ({operation.op.value}) failed: {errors}") from e
+
+            data = obj.model_dump(mode="json")
+            if operation.ref is not None:
+                named[operation.ref] = data
+            results.append({"index": position, "op": operation.op.value, "ref": operation.ref, "data": data})
+
+        db.commit_all()
+        logger.info(f"Committed batch of {len(operations)} operations")
+        return results
+
+    def _resolve(self, value: Any, named: Dict[str, dict]) -> Any:
+        """Replace ``"$ref"``/``"$ref.field"`` strings with earlier results."""
+        if isinstance(value, dict):
+            return {key: self._resolve(item, named) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(item, named) for item in value]
+        if isinstance(value, str):
+            match = REFERENCE_PATTERN.match(value)
+            if match:
+                ref, field = match.group(1), match.group(2) or "id"
+                if ref not in named:
+                    raise ValidationError(f"Unknown ref '{ref}'")
+                if field not in named[ref]:
+                    raise ValidationError(f"Result of '{ref}' has no field '{field}'")
+                return named[ref][field]
+        return value
+
+
+# Service instance
+batch_service = BatchService()
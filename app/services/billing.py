@@ -0,0 +1,258 @@
+"""Billing run service."""
+
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update, func
+
+from app.models import (
+    BillingRun, BillingRunChunk, CustomerPlan, JobStatusEnum, StatusEnum,
+)
+from app.services.transaction import transaction_service
+from app.db.tenancy import current_tenant
+from app.api.exceptions import NotFoundError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class BillingService:
+    """Generates one transaction per active membership for a billing period.
+
+    The ``BillingRun`` row for a period is the ledger: a period is billed at
+    most once. Each run is split into customer-id chunks; a chunk's
+    transactions and its ``completed`` status are written in one commit, so
+    re-running a failed or interrupted run only bills the missing chunks.
+    """
+
+    def get_run(self, db: Session, run_id: int) -> BillingRun:
+        """Get a billing run or raise 404."""
+        run = db.get(BillingRun, run_id)
+        if not run:
+            raise NotFoundError("BillingRun", run_id)
+        return run
+
+    def get_or_create_run(
+        self,
+        db: Session,
+        period: str,
+        chunk_size: Optional[int] = None
+    ) -> BillingRun:
+        """Get the run for a period, planning its chunks on first use."""
+        existing = select(BillingRun).where(BillingRun.period == period)
+        run = db.exec(existing).first()
+        if run:
+            return run
+
+        run = BillingRun(period=period, chunk_size=chunk_size or settings.billing_chunk_size)
+        db.add(run)
+        try:
+            db.flush()
+        except IntegrityError:
+            # A concurrent request planned the period first
+            db.rollback()
+            return db.exec(existing).one()
+
+        first_id, last_id = db.exec(
+            select(func.min(CustomerPlan.customer_id), func.max(CustomerPlan.customer_id))
+            .where(CustomerPlan.status == StatusEnum.active)
+        ).one()
+        if first_id is not None:
+            for lower in range(first_id, last_id + 1, run.chunk_size):
+                db.add(BillingRunChunk(
+                    run_id=run.id,
+                    first_customer_id=lower,
+                    last_customer_id=min(lower + run.chunk_size - 1, last_id),
+                ))
+        db.commit()
+        db.refresh(run)
+
+        logger.info(f"Planned billing run {run.id} for period {period}")
+        return run
+
+    def execute(self, db: Session, run_id: int, workers: int = 1, processes: bool = False) -> BillingRun:
+        """Bill all pending chunks of a run, optionally in parallel.
+
+        With ``workers > 1`` the chunks run in a thread pool, or with
+        ``processes`` in worker processes. Only use processes from a
+        standalone command: forking a server process would copy its event
+        loop, background threads and open connections.
+        """
+        run = self.get_run(db, run_id)
+        if run.status == JobStatusEnum.completed:
+            logger.info(f"Billing run {run.id} for {run.period} already completed")
+            return run
+
+        run.status = JobStatusEnum.running
+        run.started_at = run.started_at or datetime.now(timezone.utc)
+        run.error = None
+        db.add(run)
+        db.commit()
+
+        chunk_ids = db.exec(
+            select(BillingRunChunk.id)
+            .where(
+                BillingRunChunk.run_id == run.id,
+                BillingRunChunk.status != JobStatusEnum.completed,
+            )
+            .order_by(BillingRunChunk.first_customer_id)
+        ).all()
+
+        try:
+            if workers > 1 and len(chunk_ids) > 1:
+                from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+                tenant = current_tenant.get()
+                if processes:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tenant,))
+                else:
+                    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="billing")
+                with pool:
+                    futures = [pool.submit(_run_chunk_in_worker, chunk_id, tenant) for chunk_id in chunk_ids]
+                    for future in as_completed(futures):
+                        future.result()
+            else:
+                for chunk_id in chunk_ids:
+                    self.run_chunk(db, chunk_id)
+        except Exception as e:
+            db.rollback()
+            run.status = JobStatusEnum.failed
+            run.error = str(e)[:255]
+            db.add(run)
+            db.commit()
+            logger.error(f"Billing run {run.id} for {run.period} failed: {e}")
+            raise
+
+        return self._finish(db, run)
+
+    def run(
+        self,
+        db: Session,
+        period: str,
+        workers: int = 1,
+        chunk_size: Optional[int] = None,
+        processes: bool = False
+    ) -> BillingRun:
+        """Plan (if needed) and execute the billing run for a period."""
+        run = self.get_or_create_run(db, period, chunk_size)
+        return self.execute(db, run.id, workers, processes)
+
+    def run_chunk(self, db: Session, chunk_id: int) -> int:
+        """Claim and bill a single chunk. Returns transactions created."""
+        chunk = db.get(BillingRunChunk, chunk_id)
+        period = db.get(BillingRun, chunk.run_id).period
+        first_customer_id, last_customer_id = chunk.first_customer_id, chunk.last_customer_id
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=settings.billing_chunk_lease_seconds)
+        token = uuid.uuid4().hex
+
+        claimed = db.exec(
+            update(BillingRunChunk)
+            .where(
+                BillingRunChunk.id == chunk_id,
+                (BillingRunChunk.status == JobStatusEnum.pending)
+                | ((BillingRunChunk.status == JobStatusEnum.running) & (BillingRunChunk.claimed_at < stale_before)),
+            )
+            .values(status=JobStatusEnum.running, claim_token=token, claimed_at=now)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return 0
+
+        started = time.perf_counter()
+        created = transaction_service.create_for_active_memberships(
+            db,
+            f"Membership billing {period}",
+            first_customer_id,
+            last_customer_id,
+        )
+        completed = db.exec(
+            update(BillingRunChunk)
+            .where(
+                BillingRunChunk.id == chunk_id,
+                BillingRunChunk.claim_token == token,
+                BillingRunChunk.status == JobStatusEnum.running,
+            )
+            .values(
+                status=JobStatusEnum.completed,
+                transactions_created=created,
+                duration_ms=(time.perf_counter() - started) * 1000,
+                completed_at=datetime.now(timezone.utc),
+            )
+        ).rowcount
+        if not completed:
+            # Lease expired and another worker took the chunk over
+            db.rollback()
+            return 0
+
+        db.commit()
+        return created
+
+    def _finish(self, db: Session, run: BillingRun) -> BillingRun:
+        """Mark a run completed once all of its chunks are."""
+        db.refresh(run)
+        pending, created = db.exec(
+            select(
+                func.count().filter(BillingRunChunk.status != JobStatusEnum.completed),
+                func.coalesce(func.sum(BillingRunChunk.transactions_created), 0),
+            ).where(BillingRunChunk.run_id == run.id)
+        ).one()
+        run.transactions_created = created
+        if not pending:
+            run.status = JobStatusEnum.completed
+            run.finished_at = datetime.now(timezone.utc)
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+
+        logger.info(f"Billing run {run.id} for {run.period}: {run.status.value}, {created} transactions")
+        return run
+
+    def get_report(self, db: Session, run_id: int) -> dict:
+        """Get a run with per-chunk timing."""
+        run = self.get_run(db, run_id)
+        chunks: List[BillingRunChunk] = db.exec(
+            select(BillingRunChunk)
+            .where(BillingRunChunk.run_id == run.id)
+            .order_by(BillingRunChunk.first_customer_id)
+        ).all()
+        durations = [chunk.duration_ms for chunk in chunks if chunk.duration_ms is not None]
+
+        return {
+            **run.model_dump(),
+            "chunks_total": len(chunks),
+            "chunks_completed": sum(chunk.status == JobStatusEnum.completed for chunk in chunks),
+            "chunk_ms_total": round(sum(durations), 3),
+            "chunk_ms_max": round(max(durations), 3) if durations else None,
+            "chunk_ms_avg": round(sum(durations) / len(durations), 3) if durations else None,
+            "chunks": [
+                chunk.model_dump(exclude={"run_id", "claim_token"})
+                for chunk in chunks
+            ],
+        }
+
+
+def _init_worker(tenant: Optional[str]) -> None:
+    """Adopt the parent's tenant and drop connections inherited from it."""
+    from app.db.db import get_engine
+
+    current_tenant.set(tenant)
+    get_engine().dispose(close=False)
+
+
+def _run_chunk_in_worker(chunk_id: int, tenant: Optional[str]) -> int:
+    """Bill one chunk in a worker thread or process with its own session."""
+    from app.db.db import get_engine
+
+    current_tenant.set(tenant)
+    with Session(get_engine()) as session:
+        return billing_service.run_chunk(session, chunk_id)
+
+
+# Service instance
+billing_service = BillingService()
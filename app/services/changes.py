@@ -0,0 +1,245 @@
+"""Change feed service."""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlmodel import Session, SQLModel, select, delete, update, func
+
+from app.models import ChangeLogEntry, Checkpoint
+from app.db.hooks import on_commit
+from app.db.shared_cache import shared_cache
+from app.db.tenancy import current_tenant
+from app.db.utils import dialect_insert, get_checkpoint, set_checkpoint
+from app.api.exceptions import GoneError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Checkpoint holding the highest sequence number of a purged tombstone
+PURGED_CHECKPOINT = "changes.purged_through"
+
+# Rows deleted per statement during compaction
+COMPACTION_CHUNK = 10_000
+
+# Checkpoint row whose lock orders sequence numbers by commit (not SQLite)
+SEQUENCE_LOCK = "changes.sequence"
+
+
+class ChangeSubscriber:
+    """A live listener fed by the broadcaster on its own event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, tenant: Optional[str] = None, maxsize: int = 1_000):
+        self.loop = loop
+        self.tenant = tenant
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, change: dict) -> None:
+        """Queue a change; on overflow the subscriber must catch up from the DB."""
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeBroadcaster:
+    """In-process fan-out of committed changes to live subscribers.
+
+    Changes are published from whichever thread committed them and handed
+    to each subscriber's event loop thread-safely.
+    """
+
+    def __init__(self):
+        self._subscribers: set[ChangeSubscriber] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> ChangeSubscriber:
+        """Register a subscriber on the running event loop."""
+        subscriber = ChangeSubscriber(asyncio.get_running_loop(), current_tenant.get())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: ChangeSubscriber) -> None:
+        """Remove a subscriber."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, changes: List[dict]) -> None:
+        """Deliver committed changes to the subscribers of the current tenant."""
+        tenant = current_tenant.get()
+        with self._lock:
+            subscribers = [subscriber for subscriber in self._subscribers if subscriber.tenant == tenant]
+        for subscriber in subscribers:
+            for change in changes:
+                try:
+                    subscriber.loop.call_soon_threadsafe(subscriber.offer, change)
+                except RuntimeError:
+                    # Subscriber's loop is closed
+                    self.unsubscribe(subscriber)
+                    break
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of live subscribers."""
+        return len(self._subscribers)
+
+
+class ChangeService:
+    """Writes and reads the change log.
+
+    Entries are added to the caller's session, so a change is logged in the
+    same database transaction as the write it describes, and published to
+    live subscribers only once that transaction commits. The commit also
+    bumps the shared ``changes`` generation, which tells streams in other
+    worker processes to read the log.
+
+    Readers rely on sequence numbers becoming visible in order: a change
+    committed after a reader has passed its number would never be read.
+    SQLite has one writer at a time, so that holds there; on other
+    databases the first change of a transaction locks the
+    ``changes.sequence`` checkpoint row until the commit, so transactions
+    logging changes take their numbers and commit one at a time.
+    """
+
+    def __init__(self, broadcaster: ChangeBroadcaster):
+        self.broadcaster = broadcaster
+
+    def record(
+        self,
+        db: Session,
+        entity: str,
+        entity_id,
+        op: str,
+        obj: Optional[SQLModel] = None,
+        data: Optional[dict] = None
+    ) -> ChangeLogEntry:
+        """Log a change to an entity; does not commit.
+
+        The payload is ``obj`` serialized, or ``data`` as given.
+        """
+        if obj is not None:
+            data = obj.model_dump(mode="json")
+        if db.get_bind().dialect.name != "sqlite":
+            self._lock_sequence(db)
+        entry = ChangeLogEntry(
+            entity=entity,
+            entity_id=str(entity_id),
+            op=op,
+            payload=json.dumps(data) if data is not None else None,
+            created_at=datetime.now(timezone.utc),
+        )
+        db.add(entry)
+        db.flush()
+
+        change = self.to_dict(entry)
+        on_commit(db, lambda: self.broadcaster.publish([change]))
+        on_commit(db, lambda: shared_cache.invalidate("changes"))
+        return entry
+
+    def _lock_sequence(self, db: Session) -> None:
+        """Lock the sequence row until the session's transaction ends."""
+        locked = db.exec(
+            update(Checkpoint).where(Checkpoint.name == SEQUENCE_LOCK).values(value=Checkpoint.value + 1)
+        ).rowcount
+        if not locked:
+            db.exec(dialect_insert(db, Checkpoint).values(name=SEQUENCE_LOCK, value=1).on_conflict_do_nothing(index_elements=["name"]))
+            db.exec(update(Checkpoint).where(Checkpoint.name == SEQUENCE_LOCK).values(value=Checkpoint.value + 1))
+
+    def to_dict(self, entry: ChangeLogEntry) -> dict:
+        """Serialize a change log entry for the API."""
+        return {
+            "seq": entry.seq,
+            "entity": entry.entity,
+            "entity_id": entry.entity_id,
+            "op": entry.op,
+            "data": json.loads(entry.payload) if entry.payload else None,
+            "created_at": entry.created_at.isoformat() if entry.created_at else None,
+        }
+
+    def list_since(
+        self,
+        db: Session,
+        since: int = 0,
+        limit: int = 100,
+        entities: Optional[List[str]] = None
+    ) -> dict:
+        """Get changes with a sequence number greater than ``since``.
+
+        Raises ``GoneError`` when deletions after ``since`` may have been
+        compacted away; the client must then re-list from scratch.
+        """
+        purged_through = get_checkpoint(db, PURGED_CHECKPOINT)
+        if since < purged_through:
+            raise GoneError(
+                f"Changes up to seq {purged_through} were compacted; resync from a full listing",
+                error_code="CHANGES_COMPACTED",
+            )
+
+        statement = select(ChangeLogEntry).where(ChangeLogEntry.seq > since)
+        if entities:
+            statement = statement.where(ChangeLogEntry.entity.in_(entities))
+        entries = db.exec(statement.order_by(ChangeLogEntry.seq).limit(limit + 1)).all()
+
+        changes = [self.to_dict(entry) for entry in entries[:limit]]
+        return {
+            "changes": changes,
+            "next_since": changes[-1]["seq"] if changes else since,
+            "has_more": len(entries) > limit,
+        }
+
+    def latest_seq(self, db: Session) -> int:
+        """Highest sequence number in the log."""
+        return db.exec(select(func.max(ChangeLogEntry.seq))).one() or 0
+
+    def compact(self, db: Session, tombstone_retention: Optional[timedelta] = None) -> dict:
+        """Bound the log's size.
+
+        Entries superseded by a later change to the same entity are always
+        removed; a client replaying from any point still ends up with the
+        latest state. Deletion tombstones older than the retention window
+        are removed too, and ``since`` values before them are rejected.
+        """
+        if tombstone_retention is None:
+            tombstone_retention = timedelta(hours=settings.change_log_tombstone_retention_hours)
+        latest = self.latest_seq(db)
+
+        superseded = 0
+        newer = ChangeLogEntry.__table__.alias("newer")
+        for lower in range(0, latest, COMPACTION_CHUNK):
+            superseded += db.exec(
+                delete(ChangeLogEntry).where(
+                    ChangeLogEntry.seq > lower,
+                    ChangeLogEntry.seq <= lower + COMPACTION_CHUNK,
+                    select(newer.c.seq).where(
+                        newer.c.entity == ChangeLogEntry.entity,
+                        newer.c.entity_id == ChangeLogEntry.entity_id,
+                        newer.c.seq > ChangeLogEntry.seq,
+                    ).exists(),
+                )
+            ).rowcount
+            db.commit()
+
+        cutoff = datetime.now(timezone.utc) - tombstone_retention
+        # The latest entry is kept: SQLite tables created before autoincrement
+        # was set would hand its sequence number out again
+        expired = ChangeLogEntry.op == "delete", ChangeLogEntry.created_at < cutoff, ChangeLogEntry.seq < latest
+        purged_through = db.exec(select(func.max(ChangeLogEntry.seq)).where(*expired)).one()
+        tombstones = 0
+        if purged_through is not None:
+            tombstones = db.exec(delete(ChangeLogEntry).where(*expired)).rowcount
+            set_checkpoint(db, PURGED_CHECKPOINT, max(purged_through, get_checkpoint(db, PURGED_CHECKPOINT)))
+            db.commit()
+
+        logger.info(f"Change log compacted: {superseded} superseded entries, {tombstones} tombstones removed")
+        return {"superseded_removed": superseded, "tombstones_removed": tombstones}
+
+
+# Service instances
+change_broadcaster = ChangeBroadcaster()
+change_service = ChangeService(change_broadcaster)
@@ -1,28 +1,160 @@
 """Customer service."""
 
-from typing import Optional, List
-from sqlmodel import Session, select
+from datetime import datetime, timezone
+from typing import Optional, List, Tuple
+from sqlmodel import Session, select, update, func, or_, text
+from sqlalchemy import String, cast, literal
 from sqlalchemy.exc import IntegrityError
 
-from app.models import Customer, CustomerCreate, CustomerUpdate, Plan, CustomerPlan
+from app.models import (
+    Customer, CustomerCreate, CustomerUpdate, Plan, CustomerPlan, CustomerPurge,
+    Transaction, TransactionArchive, StatusEnum,
+)
 from app.services.base import BaseService
-from app.api.exceptions import ConflictError, NotFoundError
+from app.services.changes import change_service
+from app.services.webhooks import webhook_service
+from app.services.entitlements import entitlement_service
+from app.services.plan import plan_service
+from app.db.search import search_backend, POSTGRES_SEARCH_EXPRESSION
+from app.api.exceptions import ConflictError, NotFoundError, ValidationError
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Shortest term the trigram index can match
+MIN_SEARCH_TERM_LENGTH = 3
+
+_FTS_QUERY = """
+SELECT id, score FROM (
+    SELECT rowid AS id, bm25(customer_fts, 10.0, 5.0, 1.0) AS score
+    FROM customer_fts WHERE customer_fts MATCH :query
+)
+WHERE :after_id IS NULL OR score > :after_score OR (score = :after_score AND id > :after_id)
+ORDER BY score, id
+LIMIT :limit
+"""
+
+_TRGM_QUERY = f"""
+SELECT id, score FROM (
+    SELECT id, -similarity({POSTGRES_SEARCH_EXPRESSION}, :term) AS score
+    FROM customer WHERE {POSTGRES_SEARCH_EXPRESSION} ILIKE :pattern
+) AS matches
+WHERE CAST(:after_id AS INTEGER) IS NULL OR score > :after_score OR (score = :after_score AND id > :after_id)
+ORDER BY score, id
+LIMIT :limit
+"""
+
 
 class CustomerService(BaseService[Customer, CustomerCreate, CustomerUpdate]):
     """Customer service with business logic."""
     
+    change_entity = "customer"
+    
     def __init__(self):
         super().__init__(Customer)
     
+    def get(self, db: Session, id: int) -> Optional[Customer]:
+        """Get a customer by ID; soft-deleted customers are hidden."""
+        customer = db.get(Customer, id)
+        if customer is None or customer.deleted_at is not None:
+            return None
+        return customer
+    
+    def get_multi(
+        self, 
+        db: Session, 
+        skip: int = 0, 
+        limit: int = 100
+    ) -> List[Customer]:
+        """Get customers that are not soft-deleted, with pagination."""
+        statement = select(Customer).where(Customer.deleted_at.is_(None)).offset(skip).limit(limit)
+        return db.exec(statement).all()
+    
+    def count(self, db: Session) -> int:
+        """Count customers that are not soft-deleted."""
+        statement = select(func.count()).select_from(Customer).where(Customer.deleted_at.is_(None))
+        return db.exec(statement).one()
+    
     def get_by_email(self, db: Session, email: str) -> Optional[Customer]:
-        """Get customer by email."""
-        statement = select(Customer).where(Customer.email == email)
+        """Get a customer by email; soft-deleted customers are hidden."""
+        statement = select(Customer).where(Customer.email == email, Customer.deleted_at.is_(None))
         return db.exec(statement).first()
     
+    def _release_email(self, db: Session, email: str) -> None:
+        """Free an email still held by a soft-deleted customer awaiting purge; does not commit."""
+        db.exec(
+            update(Customer)
+            .where(Customer.email == email, Customer.deleted_at.is_not(None))
+            .values(email=literal("deleted-") + cast(Customer.id, String) + literal("@purge.invalid"))
+        )
+    
+    def search(
+        self,
+        db: Session,
+        q: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Customer], Optional[str]]:
+        """Search customers by name, email or description.
+        
+        Results are ranked (best match first) and keyset-paginated: pass the
+        returned cursor to get the next page.
+        """
+        terms = q.split()
+        if not terms:
+            raise ValidationError("Search query must not be empty")
+        
+        after_score, after_id = None, None
+        if cursor:
+            try:
+                score, _, id_ = cursor.rpartition(":")
+                after_score, after_id = float(score), int(id_)
+            except ValueError:
+                raise ValidationError("Invalid search cursor") from None
+        
+        backend = search_backend(db.get_bind())
+        if backend == "like" or any(len(term) < MIN_SEARCH_TERM_LENGTH for term in terms):
+            matches = self._search_like(db, terms, limit, after_id)
+        elif backend == "sqlite_fts5":
+            query = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            matches = db.exec(text(_FTS_QUERY), params={
+                "query": query, "after_score": after_score, "after_id": after_id, "limit": limit,
+            }).all()
+        else:
+            matches = db.exec(text(_TRGM_QUERY), params={
+                "term": q, "pattern": f"%{q}%", "after_score": after_score, "after_id": after_id, "limit": limit,
+            }).all()
+        
+        customers = {
+            customer.id: customer
+            for customer in db.exec(
+                select(Customer).where(
+                    Customer.id.in_([id_ for id_, _ in matches]),
+                    Customer.deleted_at.is_(None)
+                )
+            )
+        }
+        results = [customers[id_] for id_, _ in matches if id_ in customers]
+        next_cursor = f"{matches[-1][1]!r}:{matches[-1][0]}" if len(matches) == limit else None
+        return results, next_cursor
+    
+    def _search_like(
+        self,
+        db: Session,
+        terms: List[str],
+        limit: int,
+        after_id: Optional[int]
+    ) -> List[Tuple[int, float]]:
+        """Unranked prefix match for short terms or when no index exists."""
+        statement = select(Customer.id).where(Customer.deleted_at.is_(None))
+        for term in terms:
+            pattern = term.replace("%", "").replace("_", "") + "%"
+            statement = statement.where(or_(Customer.name.like(pattern), Customer.email.like(pattern)))
+        if after_id is not None:
+            statement = statement.where(Customer.id > after_id)
+        ids = db.exec(statement.order_by(Customer.id).limit(limit)).all()
+        return [(id_, 0.0) for id_ in ids]
+    
     def create(self, db: Session, obj_in: CustomerCreate) -> Customer:
         """Create customer with email validation."""
         # Check if email already exists
@@ -30,8 +162,16 @@ class CustomerService(BaseService[Customer, CustomerCreate, CustomerUpdate]):
         if existing:
             raise ConflictError(f"Customer with email '{obj_in.email}' already exists")
         
+        self._release_email(db, obj_in.email)
         return super().create(db, obj_in)
     
+    def update(self, db: Session, db_obj: Customer, obj_in: CustomerUpdate) -> Customer:
+        """Update a customer; an email held by a soft-deleted customer is freed first."""
+        email = obj_in.model_dump(exclude_unset=True).get("email")
+        if email is not None and email != db_obj.email:
+            self._release_email(db, email)
+        return super().update(db, db_obj, obj_in)
+    
     def add_plan(self, db: Session, customer_id: int, plan_id: int) -> Customer:
         """Add a plan to a customer."""
         customer = self.get_or_404(db, customer_id)
@@ -55,6 +195,10 @@ class CustomerService(BaseService[Customer, CustomerCreate, CustomerUpdate]):
         # Create the relationship
         customer_plan = CustomerPlan(customer_id=customer_id, plan_id=plan_id)
         db.add(customer_plan)
+        plan_service.adjust_member_count(db, [plan_id], 1)
+        change_service.record(db, "customer_plan", f"{customer_id}:{plan_id}", "create", customer_plan)
+        entitlement_service.after_commit(db, "grant", customer_id, plan_id)
+        webhook_service.enqueue(db, "customer.plan_added", {"customer_id": customer_id, "plan_id": plan_id})
         db.commit()
         db.refresh(customer)
         
@@ -76,13 +220,54 @@ class CustomerService(BaseService[Customer, CustomerCreate, CustomerUpdate]):
         if not relation:
             raise NotFoundError("Customer-Plan relationship", f"{customer_id}-{plan_id}")
         
+        if relation.status == StatusEnum.active:
+            plan_service.adjust_member_count(db, [plan_id], -1)
         db.delete(relation)
+        change_service.record(db, "customer_plan", f"{customer_id}:{plan_id}", "delete")
+        entitlement_service.after_commit(db, "revoke", customer_id, plan_id)
+        webhook_service.enqueue(db, "customer.plan_removed", {"customer_id": customer_id, "plan_id": plan_id})
         db.commit()
         db.refresh(customer)
         
         logger.info(f"Removed plan {plan_id} from customer {customer_id}")
         return customer
+    
+    def delete(self, db: Session, id: int) -> CustomerPurge:
+        """Soft-delete a customer and queue the purge of its data.
+        
+        The customer is hidden from reads and its memberships deactivated in
+        one short commit; transactions, invoices, plan links and the row
+        itself are removed later by ``PurgeService.run``.
+        """
+        customer = self.get_or_404(db, id)
+        customer.deleted_at = datetime.now(timezone.utc)
+        db.add(customer)
+        plan_service.adjust_member_count(db, db.exec(
+            select(CustomerPlan.plan_id)
+            .where(CustomerPlan.customer_id == id, CustomerPlan.status == StatusEnum.active)
+        ).all(), -1)
+        db.exec(
+            update(CustomerPlan)
+            .where(CustomerPlan.customer_id == id)
+            .values(status=StatusEnum.inactive)
+        )
+        job = CustomerPurge(
+            customer_id=id,
+            transactions_total=sum(
+                db.exec(select(func.count()).select_from(model).where(model.customer_id == id)).one()
+                for model in (Transaction, TransactionArchive)
+            ),
+            created_at=customer.deleted_at,
+        )
+        db.add(job)
+        self._before_commit(db, "delete", id)
+        entitlement_service.after_commit(db, "revoke_all", id)
+        db.commit()
+        db.refresh(job)
+        
+        logger.info(f"Soft-deleted customer {id}; purge job {job.id} queued")
+        return job
 
 
 # Service instance
-customer_service = CustomerService()
\ No newline at end of file
+customer_service = CustomerService()
@@ -0,0 +1,295 @@
+"""Entitlement checks from an in-memory membership index."""
+
+import asyncio
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from app.models import CustomerPlan, StatusEnum
+from app.services.changes import change_service
+from app.db.hooks import on_commit
+from app.db.tenancy import current_tenant
+from app.api.exceptions import GoneError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Change log entries applied per sync query
+SYNC_BATCH = 1_000
+
+
+class EntitlementIndex:
+    """Active memberships as one sorted array of customer ids per plan.
+
+    Each membership costs four bytes. Lookups are a binary search, and
+    updates insert into or remove from the plan's array under a lock.
+    """
+
+    def __init__(self):
+        self._plans: Dict[int, array] = {}
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.built_at: Optional[float] = None
+        self.synced_at = 0.0
+
+    def build(self, db: Session) -> None:
+        """Load every active membership, replacing the current contents."""
+        started = time.perf_counter()
+        # Read the log position first: changes committed during the load
+        # are applied again by the next sync, which is harmless
+        seq = change_service.latest_seq(db)
+        plans: Dict[int, array] = {}
+        rows = db.exec(
+            select(CustomerPlan.plan_id, CustomerPlan.customer_id)
+            .where(CustomerPlan.status == StatusEnum.active)
+            .order_by(CustomerPlan.plan_id, CustomerPlan.customer_id)
+        )
+        for plan_id, customer_id in rows:
+            plans.setdefault(plan_id, array("I")).append(customer_id)
+        with self._lock:
+            self._plans = plans
+            self.seq = seq
+            self.built_at = self.synced_at = time.monotonic()
+        logger.info(
+            f"Built entitlement index: {self.size()} memberships in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def grant(self, customer_id: int, plan_id: int) -> None:
+        """Mark a membership active."""
+        with self._lock:
+            customers = self._plans.setdefault(plan_id, array("I"))
+            position = bisect_left(customers, customer_id)
+            if position == len(customers) or customers[position] != customer_id:
+                customers.insert(position, customer_id)
+
+    def revoke(self, customer_id: int, plan_id: int) -> None:
+        """Mark a membership inactive."""
+        with self._lock:
+            customers = self._plans.get(plan_id)
+            if customers is None:
+                return
+            position = bisect_left(customers, customer_id)
+            if position < len(customers) and customers[position] == customer_id:
+                del customers[position]
+
+    def replace_range(self, plan_id: int, first_customer_id: int, last_customer_id: int, customers: array) -> None:
+        """Replace a plan's members between two customer ids (inclusive)."""
+        with self._lock:
+            members = self._plans.setdefault(plan_id, array("I"))
+            start = bisect_left(members, first_customer_id)
+            members[start:bisect_right(members, last_customer_id)] = customers
+
+    def revoke_all(self, customer_id: int) -> None:
+        """Remove a customer from every plan."""
+        for plan_id in list(self._plans):
+            self.revoke(customer_id, plan_id)
+
+    def has(self, customer_id: int, plan_id: int) -> bool:
+        """Whether the customer has the plan, active."""
+        customers = self._plans.get(plan_id)
+        if not customers:
+            return False
+        position = bisect_left(customers, customer_id)
+        return position < len(customers) and customers[position] == customer_id
+
+    def plans_of(self, customer_id: int) -> List[int]:
+        """Active plan ids of a customer."""
+        return sorted(plan_id for plan_id in list(self._plans) if self.has(customer_id, plan_id))
+
+    def size(self) -> int:
+        """Number of active memberships."""
+        return sum(len(customers) for customers in list(self._plans.values()))
+
+    def plan_count(self) -> int:
+        """Number of plans with an array."""
+        return len(self._plans)
+
+    def memory_bytes(self) -> int:
+        """Bytes allocated for the membership arrays."""
+        return sum(sys.getsizeof(customers) for customers in list(self._plans.values()))
+
+
+class EntitlementService:
+    """Answers entitlement checks without touching the database.
+
+    There is one index per tenant database: the default database's is
+    built at startup, a tenant's on its first check. Changes made in this
+    process are applied when their transaction commits; changes made by
+    other processes are picked up from the change feed by a background
+    task every ``entitlement_sync_interval_seconds``, never on the request
+    path. Bulk plan operations log one ``plan_members`` change per chunk,
+    after which the chunk's customer id range is reloaded. If the feed was
+    compacted past the index's position, the index is rebuilt.
+    """
+
+    def __init__(self, sync_interval: float = settings.entitlement_sync_interval_seconds):
+        self.sync_interval = sync_interval
+        self._indexes: Dict[Optional[str], EntitlementIndex] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def index(self, db: Session) -> EntitlementIndex:
+        """The current tenant's index, built on first use."""
+        tenant = current_tenant.get()
+        index = self._indexes.get(tenant)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(tenant)
+                if index is None:
+                    index = self.build(db)
+        return index
+
+    def build(self, db: Session) -> EntitlementIndex:
+        """Build the current tenant's index from the database, replacing any previous one."""
+        index = EntitlementIndex()
+        index.build(db)
+        self._indexes[current_tenant.get()] = index
+        return index
+
+    @property
+    def running(self) -> bool:
+        """Whether the sync task is running."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, sync_interval: Optional[float] = None) -> None:
+        """Start syncing the indexes from the change feed on the running event loop."""
+        if sync_interval is not None:
+            self.sync_interval = sync_interval
+        if self.sync_interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Entitlement sync started every {self.sync_interval:g} s")
+
+    async def stop(self) -> None:
+        """Stop syncing; a sync already running finishes in its thread."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Entitlement sync stopped")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await asyncio.to_thread(self.sync_all)
+
+    def sync_all(self) -> int:
+        """Sync every built index from its own database; the number of changes applied."""
+        from app.db.db import get_engine
+
+        applied = 0
+        for tenant, index in list(self._indexes.items()):
+            token = current_tenant.set(tenant)
+            try:
+                with Session(get_engine(tenant)) as db:
+                    applied += self.sync(db, index)
+            except Exception as e:
+                logger.error(f"Entitlement sync{f' for tenant {tenant}' if tenant else ''} failed: {e}")
+            finally:
+                current_tenant.reset(token)
+        return applied
+
+    def sync(self, db: Session, index: EntitlementIndex) -> int:
+        """Apply membership changes logged since the index's position."""
+        index.synced_at = time.monotonic()
+        applied = 0
+        while True:
+            try:
+                page = change_service.list_since(db, index.seq, SYNC_BATCH, ["customer_plan", "customer", "plan_members"])
+            except GoneError:
+                index.build(db)
+                return applied
+            for change in page["changes"]:
+                self._apply(db, index, change)
+            index.seq = page["next_since"]
+            applied += len(page["changes"])
+            if not page["has_more"]:
+                return applied
+
+    def _apply(self, db: Session, index: EntitlementIndex, change: dict) -> None:
+        if change["entity"] == "plan_members":
+            data = change["data"]
+            first, last = data["first_customer_id"], data["last_customer_id"]
+            for plan_id in data["plan_ids"]:
+                index.replace_range(plan_id, first, last, self._active_between(db, plan_id, first, last))
+            return
+        if change["entity"] == "customer":
+            if change["op"] == "delete":
+                index.revoke_all(int(change["entity_id"]))
+            return
+        customer_id, plan_id = (int(part) for part in change["entity_id"].split(":"))
+        data = change["data"] or {}
+        if change["op"] != "delete" and data.get("status", StatusEnum.active) == StatusEnum.active:
+            index.grant(customer_id, plan_id)
+        else:
+            index.revoke(customer_id, plan_id)
+
+    def after_commit(self, db: Session, method: str, customer_id: int, *args: int) -> None:
+        """Update this process's index once the caller's transaction commits."""
+        index = self._indexes.get(current_tenant.get())
+        if index is not None:
+            on_commit(db, lambda: getattr(index, method)(customer_id, *args))
+
+    def after_commit_range(self, db: Session, plan_ids: List[int], first_customer_id: int, last_customer_id: int) -> None:
+        """Reload plans' members in a customer id range once the caller's transaction commits.
+
+        The members are read now, inside the caller's transaction, so they
+        include its uncommitted changes.
+        """
+        index = self._indexes.get(current_tenant.get())
+        if index is None:
+            return
+        for plan_id in plan_ids:
+            customers = self._active_between(db, plan_id, first_customer_id, last_customer_id)
+            on_commit(db, lambda plan_id=plan_id, customers=customers: index.replace_range(
+                plan_id, first_customer_id, last_customer_id, customers
+            ))
+
+    def _active_between(self, db: Session, plan_id: int, first_customer_id: int, last_customer_id: int) -> array:
+        return array("I", db.exec(
+            select(CustomerPlan.customer_id)
+            .where(
+                CustomerPlan.plan_id == plan_id,
+                CustomerPlan.status == StatusEnum.active,
+                CustomerPlan.customer_id.between(first_customer_id, last_customer_id),
+            )
+            .order_by(CustomerPlan.customer_id)
+        ).all())
+
+    def get_for_customer(self, db: Session, customer_id: int) -> dict:
+        """Active plan ids of a customer."""
+        return {"customer_id": customer_id, "plan_ids": self.index(db).plans_of(customer_id)}
+
+    def check(self, db: Session, checks: List[dict]) -> List[dict]:
+        """Answer a batch of ``{"customer_id", "plan_id"}`` checks."""
+        index = self.index(db)
+        return [
+            {**check, "entitled": index.has(check["customer_id"], check["plan_id"])}
+            for check in checks
+        ]
+
+    def get_stats(self, db: Session) -> dict:
+        """Size and memory footprint of the current tenant's index."""
+        index = self.index(db)
+        memberships = index.size()
+        memory = index.memory_bytes()
+        return {
+            "memberships": memberships,
+            "plans": index.plan_count(),
+            "memory_bytes": memory,
+            "bytes_per_million_memberships": round(memory / memberships * 1_000_000) if memberships else None,
+            "seq": index.seq,
+            "synced_seconds_ago": round(time.monotonic() - index.synced_at, 3),
+        }
+
+
+# Service instance
+entitlement_service = EntitlementService()
@@ -0,0 +1,184 @@
+"""Idempotency key response store."""
+
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlmodel import Session, select, delete, update
+
+from app.models import IdempotencyRecord
+from app.db.utils import as_utc, dialect_insert
+from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Rows deleted per statement when purging expired records
+PURGE_CHUNK = 10_000
+
+
+class IdempotencyService:
+    """Stores the first response to each idempotency key.
+
+    A key is claimed by inserting its row before the request runs, so only
+    one request per key executes even across processes; the response is
+    written to the row when it finishes. A claim is a lease, renewed
+    while the request runs: if its process dies before storing a
+    response, a retry takes the key over once ``claimed_until`` has
+    passed. Completed records are kept in an
+    in-memory LRU in front of the table so hot replays skip the database.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = settings.idempotency_cache_size,
+        claim_lease_seconds: int = settings.idempotency_claim_lease_seconds,
+        ttl_hours: int = settings.idempotency_ttl_hours
+    ):
+        self.cache_size = cache_size
+        self.claim_lease_seconds = claim_lease_seconds
+        self.ttl_hours = ttl_hours
+        self._cache: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, config: Settings) -> None:
+        """Use the idempotency settings of ``config``."""
+        self.cache_size = config.idempotency_cache_size
+        self.claim_lease_seconds = config.idempotency_claim_lease_seconds
+        self.ttl_hours = config.idempotency_ttl_hours
+
+    def cached(self, key_hash: str) -> Optional[dict]:
+        """Get a completed, unexpired record from the LRU."""
+        with self._lock:
+            record = self._cache.get(key_hash)
+            if record is None:
+                return None
+            if record["expires_at"] <= datetime.now(timezone.utc):
+                del self._cache[key_hash]
+                return None
+            self._cache.move_to_end(key_hash)
+            return record
+
+    def _remember(self, key_hash: str, record: dict) -> None:
+        with self._lock:
+            self._cache[key_hash] = record
+            self._cache.move_to_end(key_hash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def claim(self, db: Session, key_hash: str, request_hash: str) -> Tuple[bool, Optional[dict]]:
+        """Claim a key for execution.
+
+        Returns ``(True, None)`` if the caller must run the request, or
+        ``(False, record)`` with the existing record (``status_code`` is
+        ``None`` while another request still runs). Expired records and
+        claims whose lease has run out are replaced.
+        """
+        now = datetime.now(timezone.utc)
+        abandoned = IdempotencyRecord.status_code.is_(None) & (
+            IdempotencyRecord.claimed_until.is_(None) | (IdempotencyRecord.claimed_until < now)
+        )
+        db.exec(delete(IdempotencyRecord).where(
+            IdempotencyRecord.key_hash == key_hash,
+            (IdempotencyRecord.expires_at <= now) | abandoned,
+        ))
+        claimed = db.exec(
+            dialect_insert(db, IdempotencyRecord)
+            .values(
+                key_hash=key_hash,
+                request_hash=request_hash,
+                created_at=now,
+                claimed_until=now + timedelta(seconds=self.claim_lease_seconds),
+                expires_at=now + timedelta(hours=self.ttl_hours),
+            )
+            .on_conflict_do_nothing(index_elements=["key_hash"])
+        ).rowcount
+        db.commit()
+        if claimed:
+            return True, None
+        return False, self.get(db, key_hash)
+
+    def renew(self, db: Session, key_hash: str) -> bool:
+        """Extend the lease of a claim whose request still runs; returns whether it was extended."""
+        renewed = db.exec(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.key_hash == key_hash, IdempotencyRecord.status_code.is_(None))
+            .values(claimed_until=datetime.now(timezone.utc) + timedelta(seconds=self.claim_lease_seconds))
+        ).rowcount
+        db.commit()
+        return bool(renewed)
+
+    def get(self, db: Session, key_hash: str) -> Optional[dict]:
+        """Get a record, caching it if completed."""
+        cached = self.cached(key_hash)
+        if cached is not None:
+            return cached
+        row = db.get(IdempotencyRecord, key_hash, populate_existing=True)
+        if row is None:
+            return None
+        record = self._to_dict(row)
+        if record["status_code"] is not None:
+            self._remember(key_hash, record)
+        return record
+
+    def complete(
+        self,
+        db: Session,
+        key_hash: str,
+        status_code: int,
+        content_type: Optional[str],
+        body: bytes
+    ) -> None:
+        """Store the response of a claimed key, unless a retry that took it over stored one first."""
+        stored = db.exec(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.key_hash == key_hash, IdempotencyRecord.status_code.is_(None))
+            .values(status_code=status_code, content_type=content_type, body=zlib.compress(body), claimed_until=None)
+        ).rowcount
+        db.commit()
+        if stored:
+            self.get(db, key_hash)
+
+    def release(self, db: Session, key_hash: str) -> None:
+        """Give up a claim so the request can be retried."""
+        db.exec(delete(IdempotencyRecord).where(
+            IdempotencyRecord.key_hash == key_hash,
+            IdempotencyRecord.status_code.is_(None),
+        ))
+        db.commit()
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete expired records in chunks. Returns the number deleted."""
+        now = datetime.now(timezone.utc)
+        purged = 0
+        while True:
+            expired = (
+                select(IdempotencyRecord.key_hash)
+                .where(IdempotencyRecord.expires_at <= now)
+                .limit(PURGE_CHUNK)
+            )
+            deleted = db.exec(
+                delete(IdempotencyRecord).where(IdempotencyRecord.key_hash.in_(expired.scalar_subquery()))
+            ).rowcount
+            db.commit()
+            purged += deleted
+            if deleted < PURGE_CHUNK:
+                break
+        logger.info(f"Purged {purged} expired idempotency records")
+        return purged
+
+    def _to_dict(self, row: IdempotencyRecord) -> dict:
+        return {
+            "request_hash": row.request_hash,
+            "status_code": row.status_code,
+            "content_type": row.content_type,
+            "body": zlib.decompress(row.body) if row.body is not None else b"",
+            "expires_at": as_utc(row.expires_at),
+        }
+
+
+# Service instance
+idempotency_service = IdempotencyService()
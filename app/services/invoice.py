@@ -0,0 +1,256 @@
+"""Invoice generation service."""
+
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlmodel import Session, select, func, tuple_
+
+from app.models import Transaction, InvoiceRun, CustomerInvoice, JobStatusEnum
+from app.db.utils import dialect_insert
+from app.db.tenancy import current_tenant
+from app.services.analytics import analytics_service
+from app.api.exceptions import NotFoundError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class InvoiceService:
+    """Generates one invoice per customer for each run of new transactions.
+
+    A run covers the transaction ids written since the previous run. Its
+    transactions are read in a single keyset scan ordered by
+    ``(customer_id, id)``, grouped on the fly and written in bulk, so memory
+    stays bounded by the batch size regardless of the number of customers.
+    An interrupted run resumes after the last customer it invoiced.
+    """
+
+    def __init__(self, batch_size: int = settings.invoice_batch_size):
+        self.batch_size = batch_size
+
+    def get_run(self, db: Session, run_id: int) -> InvoiceRun:
+        """Get an invoice run or raise 404."""
+        run = db.get(InvoiceRun, run_id)
+        if not run:
+            raise NotFoundError("InvoiceRun", run_id)
+        return run
+
+    def get_or_create_run(self, db: Session, partitions: int = 1) -> InvoiceRun:
+        """Get the unfinished run, or start one for transactions since the last run.
+
+        The customer id span and partition count are fixed when the run is
+        created so an interrupted run resumes over the same partitions.
+        """
+        run = db.exec(
+            select(InvoiceRun)
+            .where(InvoiceRun.status != JobStatusEnum.completed)
+            .order_by(InvoiceRun.id)
+        ).first()
+        if run:
+            return run
+
+        last_upper = db.exec(select(func.max(InvoiceRun.to_transaction_id))).one() or 0
+        # No transaction at or below max_id may commit after the run is planned
+        analytics_service.wait_for_inserts(db)
+        max_id = db.exec(select(func.max(Transaction.id))).one() or 0
+        first_customer_id, last_customer_id = db.exec(
+            select(func.min(Transaction.customer_id), func.max(Transaction.customer_id))
+            .where(Transaction.id > last_upper, Transaction.id <= max_id)
+        ).one()
+        run = InvoiceRun(
+            from_transaction_id=last_upper,
+            to_transaction_id=max(max_id, last_upper),
+            first_customer_id=first_customer_id,
+            last_customer_id=last_customer_id,
+            partitions=partitions,
+        )
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+
+        logger.info(f"Planned invoice run {run.id} for transactions {run.from_transaction_id + 1}-{run.to_transaction_id}")
+        return run
+
+    def generate(self, db: Session, workers: int = 1, processes: bool = False) -> InvoiceRun:
+        """Generate invoices for all transactions not yet invoiced.
+
+        With ``workers > 1`` the run is split into customer id partitions
+        that are invoiced in a thread pool, or with ``processes`` in a
+        process pool. Only use processes from a standalone command: forking
+        a server process would copy its event loop, background threads and
+        open connections.
+        """
+        run = self.get_or_create_run(db, partitions=workers * 4 if workers > 1 else 1)
+        run.status = JobStatusEnum.running
+        run.started_at = run.started_at or datetime.now(timezone.utc)
+        run.error = None
+        db.add(run)
+        db.commit()
+
+        try:
+            partitions = self._partitions(run)
+            if workers > 1 and len(partitions) > 1:
+                from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+                tenant = current_tenant.get()
+                if processes:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tenant,))
+                else:
+                    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invoices")
+                with pool:
+                    futures = [
+                        pool.submit(_generate_in_worker, run.id, lower, upper, tenant)
+                        for lower, upper in partitions
+                    ]
+                    for future in as_completed(futures):
+                        future.result()
+            else:
+                for lower, upper in partitions:
+                    self.generate_partition(db, run.id, lower, upper)
+        except Exception as e:
+            db.rollback()
+            run.status = JobStatusEnum.failed
+            run.error = str(e)[:255]
+            db.add(run)
+            db.commit()
+            logger.error(f"Invoice run {run.id} failed: {e}")
+            raise
+
+        run.invoices_created = db.exec(
+            select(func.count()).select_from(CustomerInvoice).where(CustomerInvoice.run_id == run.id)
+        ).one()
+        run.status = JobStatusEnum.completed
+        run.finished_at = datetime.now(timezone.utc)
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+
+        logger.info(f"Invoice run {run.id} completed: {run.invoices_created} invoices")
+        return run
+
+    def _partitions(self, run: InvoiceRun) -> List[Tuple[int, int]]:
+        """Split the run's customer id span into contiguous ranges."""
+        if run.first_customer_id is None:
+            return []
+        span = run.last_customer_id - run.first_customer_id + 1
+        width = max(1, -(-span // run.partitions))
+        return [
+            (lower, min(lower + width - 1, run.last_customer_id))
+            for lower in range(run.first_customer_id, run.last_customer_id + 1, width)
+        ]
+
+    def generate_partition(
+        self,
+        db: Session,
+        run_id: int,
+        first_customer_id: Optional[int] = None,
+        last_customer_id: Optional[int] = None
+    ) -> int:
+        """Invoice the customers of one run in a customer id range.
+
+        Returns the number of invoices written.
+        """
+        run = self.get_run(db, run_id)
+        conditions = [
+            Transaction.id > run.from_transaction_id,
+            Transaction.id <= run.to_transaction_id,
+        ]
+        invoiced = [CustomerInvoice.run_id == run_id]
+        if first_customer_id is not None:
+            conditions.append(Transaction.customer_id >= first_customer_id)
+            invoiced.append(CustomerInvoice.customer_id >= first_customer_id)
+        if last_customer_id is not None:
+            conditions.append(Transaction.customer_id <= last_customer_id)
+            invoiced.append(CustomerInvoice.customer_id <= last_customer_id)
+
+        # Resume after the last customer already invoiced in this range
+        resume_after = db.exec(select(func.max(CustomerInvoice.customer_id)).where(*invoiced)).one()
+        position = (resume_after, 2**63 - 1) if resume_after is not None else None
+
+        written = 0
+        current: Optional[dict] = None
+        pending: List[dict] = []
+        while True:
+            statement = select(Transaction.customer_id, Transaction.id, Transaction.amount).where(*conditions)
+            if position is not None:
+                statement = statement.where(tuple_(Transaction.customer_id, Transaction.id) > tuple_(*position))
+            rows = db.exec(
+                statement.order_by(Transaction.customer_id, Transaction.id).limit(self.batch_size)
+            ).all()
+
+            for customer_id, transaction_id, amount in rows:
+                if current is None or current["customer_id"] != customer_id:
+                    if current is not None:
+                        pending.append(current)
+                    current = {
+                        "run_id": run_id,
+                        "customer_id": customer_id,
+                        "total": 0,
+                        "transaction_count": 0,
+                        "first_transaction_id": transaction_id,
+                    }
+                current["total"] += amount
+                current["transaction_count"] += 1
+                current["last_transaction_id"] = transaction_id
+
+            if len(rows) < self.batch_size:
+                if current is not None:
+                    pending.append(current)
+                written += self._write(db, pending)
+                break
+
+            # Only customers whose transactions are all seen are written
+            written += self._write(db, pending)
+            pending = []
+            position = rows[-1][:2]
+
+        logger.info(f"Invoice run {run_id}: wrote {written} invoices for customers {first_customer_id}-{last_customer_id}")
+        return written
+
+    def _write(self, db: Session, invoices: List[dict]) -> int:
+        """Bulk insert invoices and commit; duplicates from a resumed run are skipped."""
+        if not invoices:
+            return 0
+        statement = dialect_insert(db, CustomerInvoice).on_conflict_do_nothing(
+            index_elements=["run_id", "customer_id"]
+        )
+        db.exec(statement, params=invoices)
+        db.commit()
+        return len(invoices)
+
+    def get_by_customer(
+        self,
+        db: Session,
+        customer_id: int,
+        before_id: Optional[int] = None,
+        limit: int = 100
+    ) -> List[CustomerInvoice]:
+        """Get a customer's invoices, newest first, before an invoice id."""
+        statement = select(CustomerInvoice).where(CustomerInvoice.customer_id == customer_id)
+        if before_id is not None:
+            statement = statement.where(CustomerInvoice.id < before_id)
+        statement = statement.order_by(CustomerInvoice.id.desc()).limit(limit)
+        return db.exec(statement).all()
+
+
+def _init_worker(tenant: Optional[str]) -> None:
+    """Adopt the parent's tenant and drop connections inherited from it."""
+    from app.db.db import get_engine
+
+    current_tenant.set(tenant)
+    get_engine().dispose(close=False)
+
+
+def _generate_in_worker(run_id: int, first_customer_id: int, last_customer_id: int, tenant: Optional[str]) -> int:
+    """Invoice one customer range in a worker thread or process."""
+    from app.db.db import get_engine
+
+    current_tenant.set(tenant)
+    with Session(get_engine()) as session:
+        return invoice_service.generate_partition(session, run_id, first_customer_id, last_customer_id)
+
+
+# Service instance
+invoice_service = InvoiceService()
@@ -0,0 +1,325 @@
+"""Periodic maintenance jobs and the in-process scheduler running them.
+
+Every worker runs a scheduler task, but each job runs on only one of
+them per interval: before running, a worker takes the job's lease in the
+``ScheduledJob`` table with a conditional update that only succeeds once
+the interval since the last start has passed and no other worker holds
+the lease. Attempts are spread with random jitter, so the first worker
+to wake runs the job and the others find it already started.
+
+Jobs run in a worker thread with a deadline they stop at where they can
+(``incremental_vacuum`` frees pages in steps until then); a run taking
+longer than its budget is recorded as failed. Each job runs on the
+default database and on every tenant database.
+"""
+
+import asyncio
+import os
+import random
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select
+
+from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+from app.db.tenancy import current_tenant
+from app.db.utils import as_utc, dialect_insert
+from app.models import JobStatusEnum, ScheduledJob
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Pages freed per incremental_vacuum step, checked against the deadline in between
+VACUUM_STEP_PAGES = 256
+
+# Rows examined per index by ANALYZE on SQLite (approximate statistics, bounded time)
+SQLITE_ANALYSIS_LIMIT = 1_000
+
+
+def _pragma(conn: Connection, statement: str):
+    return conn.exec_driver_sql(f"PRAGMA {statement}").fetchall()
+
+
+def analyze(engine: Engine, deadline: float) -> str:
+    """Refresh the query planner's statistics."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            _pragma(conn, f"analysis_limit={SQLITE_ANALYSIS_LIMIT}")
+            # 0x10002: analyze every table that would benefit, not only those this connection used
+            _pragma(conn, "optimize=0x10002")
+            conn.commit()
+            return "PRAGMA optimize"
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    return "ANALYZE"
+
+
+def wal_checkpoint(engine: Engine, deadline: float) -> str:
+    """Copy the SQLite write-ahead log into the database and truncate it."""
+    if engine.dialect.name != "sqlite":
+        return "skipped: not SQLite"
+    with engine.connect() as conn:
+        journal_mode = _pragma(conn, "journal_mode")[0][0]
+        if journal_mode != "wal":
+            return f"skipped: journal_mode is {journal_mode}"
+        # TRUNCATE reports the emptied log, so take the counts from a PASSIVE pass first
+        _, log_pages, checkpointed = _pragma(conn, "wal_checkpoint(PASSIVE)")[0]
+        busy = _pragma(conn, "wal_checkpoint(TRUNCATE)")[0][0]
+    return f"checkpointed {checkpointed} of {log_pages} pages, " + ("log in use" if busy else "log truncated")
+
+
+def incremental_vacuum(engine: Engine, deadline: float) -> str:
+    """Return free SQLite pages to the file system, in steps until the deadline."""
+    if engine.dialect.name != "sqlite":
+        return "skipped: not SQLite"
+    with engine.connect() as conn:
+        if _pragma(conn, "auto_vacuum")[0][0] != 2:
+            return "skipped: auto_vacuum is not incremental"
+        free_pages = remaining = _pragma(conn, "freelist_count")[0][0]
+        while remaining and time.monotonic() < deadline:
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})")
+            conn.commit()
+            remaining = _pragma(conn, "freelist_count")[0][0]
+    return f"freed {free_pages - remaining} pages, {remaining} free pages left"
+
+
+def analytics_refresh(engine: Engine, deadline: float) -> str:
+    """Fold new transactions into the analytics rollups."""
+    from app.db.db import refresh_analytics
+
+    return f"{refresh_analytics(engine)} transactions processed"
+
+
+def idempotency_purge(engine: Engine, deadline: float) -> str:
+    """Delete expired idempotency records."""
+    from app.services.idempotency import idempotency_service
+
+    with Session(engine) as session:
+        purged = idempotency_service.purge_expired(session)
+    return f"{purged} records purged"
+
+
+def plans_cache_warmup(engine: Engine, deadline: float) -> str:
+    """Reload the first page of plans into the shared cache before it expires."""
+    from app.services.plan import plan_service
+
+    loaded = plan_service.warm_cache(engine)
+    return f"{loaded} plans loaded" if loaded else "skipped: shared cache disabled"
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[Engine, float], str]
+    interval_seconds: float
+
+
+JOBS: List[Job] = [
+    Job("analyze", analyze, 3_600.0),
+    Job("wal_checkpoint", wal_checkpoint, 300.0),
+    Job("incremental_vacuum", incremental_vacuum, 3_600.0),
+    Job("analytics_refresh", analytics_refresh, 300.0),
+    Job("idempotency_purge", idempotency_purge, 3_600.0),
+    Job("plans_cache_warmup", plans_cache_warmup, 30.0),
+]
+
+
+class MaintenanceScheduler:
+    """Runs the maintenance jobs from a background task on the event loop."""
+
+    def __init__(
+        self,
+        jobs: List[Job] = JOBS,
+        time_budget_seconds: float = settings.scheduler_time_budget_seconds,
+        jitter_ratio: float = settings.scheduler_jitter_ratio,
+        intervals: Dict[str, float] = settings.scheduler_interval_seconds,
+        tenants: List[str] = settings.tenants
+    ):
+        self.jobs = jobs
+        self.time_budget_seconds = time_budget_seconds
+        self.jitter_ratio = jitter_ratio
+        self.intervals = dict(intervals)
+        self.tenants = list(tenants)
+        self.worker_id = ""
+        self._task: Optional[asyncio.Task] = None
+        self._current: Optional[asyncio.Future] = None
+        # (job name, tenant): monotonic time of the next attempt
+        self._due: Dict[Tuple[str, Optional[str]], float] = {}
+
+    def configure(self, config: Settings) -> None:
+        """Use the scheduler settings and tenants of ``config``."""
+        self.time_budget_seconds = config.scheduler_time_budget_seconds
+        self.jitter_ratio = config.scheduler_jitter_ratio
+        self.intervals = dict(config.scheduler_interval_seconds)
+        self.tenants = list(config.tenants)
+
+    @property
+    def running(self) -> bool:
+        """Whether the scheduler task is running."""
+        return self._task is not None and not self._task.done()
+
+    def interval(self, job: Job) -> float:
+        """The job's interval, as overridden by ``scheduler_interval_seconds``; 0 disables it."""
+        return self.intervals.get(job.name, job.interval_seconds)
+
+    def _jitter(self, job: Job) -> float:
+        return random.uniform(0, self.interval(job) * self.jitter_ratio)
+
+    async def start(
+        self,
+        initial_delay: float = settings.scheduler_initial_delay_seconds,
+        tenants: Optional[List[str]] = None
+    ) -> None:
+        """Start scheduling on the running event loop, for the default database and ``tenants``."""
+        # Taken here: workers are forked after the module is imported
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        now = time.monotonic()
+        self._due = {
+            (job.name, tenant): now + initial_delay + self._jitter(job)
+            for job in self.jobs if self.interval(job) > 0
+            for tenant in [None, *(self.tenants if tenants is None else tenants)]
+        }
+        if not self._due:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Maintenance scheduler started with {len(self._due)} jobs")
+
+    async def stop(self, timeout: float = 0.0) -> None:
+        """Stop scheduling, giving a job already running up to ``timeout`` seconds to finish."""
+        if self._task is not None:
+            if self._current is not None and not self._current.done() and timeout > 0:
+                await asyncio.wait({self._current}, timeout=timeout)
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Maintenance scheduler stopped")
+
+    async def _run(self) -> None:
+        jobs = {job.name: job for job in self.jobs}
+        while True:
+            (name, tenant), due = min(self._due.items(), key=lambda item: item[1])
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            job = jobs[name]
+            self._current = asyncio.ensure_future(asyncio.to_thread(self.run_job, job, tenant))
+            try:
+                delay = await self._current
+            except Exception as e:
+                logger.error(f"Maintenance job {name} could not be scheduled: {e}")
+                delay = self.interval(job)
+            self._due[(name, tenant)] = time.monotonic() + delay
+
+    def _claim(self, db: Session, job: Job) -> Optional[datetime]:
+        """Take the job's lease if it is due; the start time if taken."""
+        now = datetime.now(timezone.utc)
+        if db.get(ScheduledJob, job.name) is None:
+            db.exec(dialect_insert(db, ScheduledJob).values(name=job.name).on_conflict_do_nothing(index_elements=["name"]))
+        claimed = db.exec(
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.name == job.name,
+                ScheduledJob.lease_expires_at.is_(None) | (ScheduledJob.lease_expires_at < now),
+                ScheduledJob.last_started_at.is_(None)
+                | (ScheduledJob.last_started_at <= now - timedelta(seconds=self.interval(job))),
+            )
+            .values(
+                leader=self.worker_id,
+                # Outlives the budget: an overrunning job is not started twice
+                lease_expires_at=now + timedelta(seconds=2 * self.time_budget_seconds),
+                last_started_at=now,
+                last_status=JobStatusEnum.running,
+            )
+        ).rowcount
+        db.commit()
+        return now if claimed else None
+
+    def run_job(self, job: Job, tenant: Optional[str] = None) -> float:
+        """Run the job if it is due and no other worker has it; seconds until the next attempt."""
+        from app.db.db import get_engine
+
+        token = current_tenant.set(tenant)
+        try:
+            engine = get_engine(tenant)
+            with Session(engine) as db:
+                if self._claim(db, job) is not None:
+                    self._execute(db, job, engine, tenant)
+                last_started_at = db.exec(select(ScheduledJob.last_started_at).where(ScheduledJob.name == job.name)).one()
+        finally:
+            current_tenant.reset(token)
+        wait = self.interval(job)
+        if last_started_at is not None:
+            wait = (as_utc(last_started_at) + timedelta(seconds=self.interval(job)) - datetime.now(timezone.utc)).total_seconds()
+        return max(wait, 1.0) + self._jitter(job)
+
+    def _execute(self, db: Session, job: Job, engine: Engine, tenant: Optional[str]) -> None:
+        started = time.perf_counter()
+        status = JobStatusEnum.completed
+        try:
+            result = job.func(engine, time.monotonic() + self.time_budget_seconds)
+        except Exception as e:
+            status, result = JobStatusEnum.failed, f"error: {e}"
+        duration = time.perf_counter() - started
+        if status == JobStatusEnum.completed and duration > self.time_budget_seconds:
+            status = JobStatusEnum.failed
+            result = f"{result} (over the {self.time_budget_seconds:g} s budget)"
+
+        db.exec(
+            update(ScheduledJob)
+            .where(ScheduledJob.name == job.name, ScheduledJob.leader == self.worker_id)
+            .values(
+                lease_expires_at=None,
+                last_finished_at=datetime.now(timezone.utc),
+                last_status=status,
+                last_duration_ms=round(duration * 1000, 2),
+                last_result=result[:255],
+                runs=ScheduledJob.runs + 1,
+                failures=ScheduledJob.failures + int(status == JobStatusEnum.failed),
+            )
+        )
+        db.commit()
+        where = f" for tenant {tenant}" if tenant else ""
+        if status == JobStatusEnum.failed:
+            logger.warning(f"Maintenance job {job.name}{where} failed in {duration * 1000:.1f} ms: {result}")
+        else:
+            logger.debug(f"Maintenance job {job.name}{where} done in {duration * 1000:.1f} ms: {result}")
+
+    def get_status(self, db: Session) -> dict:
+        """Every job's interval and last run on the session's database, and this worker's schedule."""
+        rows = {row.name: row for row in db.exec(select(ScheduledJob)).all()}
+        tenant = current_tenant.get()
+        now = time.monotonic()
+        jobs = []
+        for job in self.jobs:
+            row = rows.get(job.name)
+            due = self._due.get((job.name, tenant))
+            jobs.append({
+                "name": job.name,
+                "interval_seconds": self.interval(job),
+                "enabled": self.interval(job) > 0,
+                "next_attempt_in_seconds": round(max(due - now, 0), 1) if due is not None and self.running else None,
+                "leader": row.leader if row else None,
+                "last_started_at": row.last_started_at if row else None,
+                "last_finished_at": row.last_finished_at if row else None,
+                "last_status": row.last_status if row else None,
+                "last_duration_ms": row.last_duration_ms if row else None,
+                "last_result": row.last_result if row else None,
+                "runs": row.runs if row else 0,
+                "failures": row.failures if row else 0,
+            })
+        return {
+            "worker": self.worker_id or None,
+            "running": self.running,
+            "time_budget_seconds": self.time_budget_seconds,
+            "jobs": jobs,
+        }
+
+
+# Process-wide instance, started by the application lifespan
+maintenance_scheduler = MaintenanceScheduler()
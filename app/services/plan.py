@@ -1,15 +1,160 @@
 """Plan service."""
 
-from app.models import Plan, PlanCreate, PlanUpdate
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, update, func
+
+from app.models import Plan, PlanCreate, PlanUpdate, Customer, CustomerPlan, StatusEnum
 from app.services.base import BaseService
+from app.db.hooks import on_commit
+from app.db.shared_cache import shared_cache
+from app.api.exceptions import NotFoundError, ValidationError
 
 
 class PlanService(BaseService[Plan, PlanCreate, PlanUpdate]):
-    """Plan service with business logic."""
+    """Plan service with business logic.
+    
+    Plans and plan pages are read through the shared cache when it is
+    allocated, loaded from the primary database; otherwise they are read
+    with the request's session. Writes invalidate the plan (and every
+    page) in all workers when they commit.
+    """
+    
+    change_entity = "plan"
     
     def __init__(self):
         super().__init__(Plan)
+    
+    def _on_primary(self, load, *args, engine: Optional[Engine] = None):
+        """Run ``load`` in a session of its own on ``engine``, by default the primary database.
+        
+        Values shared with every worker must not come from a lagging
+        replica the request's session may be reading from.
+        """
+        from app.db.db import get_engine
+        with Session(engine or get_engine()) as primary:
+            return load(primary, *args)
+    
+    def _load_plan(self, db: Session, plan_id: int) -> Optional[dict]:
+        plan = self.get(db, plan_id)
+        return plan.model_dump(mode="json") if plan else None
+    
+    def _load_page(self, db: Session, skip: int, limit: int) -> dict:
+        return {
+            "items": [plan.model_dump(mode="json") for plan in self.get_multi(db, skip, limit)],
+            "total": self.count(db),
+        }
+    
+    def get_cached(self, db: Session, plan_id: int) -> Plan:
+        """Get a plan by ID through the shared cache, or raise 404."""
+        if not shared_cache.enabled:
+            return self.get_or_404(db, plan_id)
+        data = shared_cache.get_or_load("plans", plan_id, lambda: self._on_primary(self._load_plan, plan_id))
+        if data is None:
+            raise NotFoundError("Plan", plan_id)
+        return Plan.model_validate(data)
+    
+    def get_page_cached(self, db: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Plan], int]:
+        """A page of plans and the total count, through the shared cache."""
+        if not shared_cache.enabled:
+            return self.get_multi(db, skip, limit), self.count(db)
+        data = shared_cache.get_or_load(
+            "plan_pages", f"{skip}:{limit}", lambda: self._on_primary(self._load_page, skip, limit)
+        )
+        return [Plan.model_validate(item) for item in data["items"]], data["total"]
+    
+    def warm_cache(self, engine: Optional[Engine] = None, limit: int = 100) -> int:
+        """Reload the first page of plans and its plans into the shared cache; returns plans loaded.
+        
+        Reads from ``engine`` (by default the current tenant's primary);
+        entries are stored under the current tenant.
+        """
+        if not shared_cache.enabled:
+            return 0
+        page = shared_cache.load(
+            "plan_pages", f"0:{limit}", lambda: self._on_primary(self._load_page, 0, limit, engine=engine)
+        )
+        for item in page["items"]:
+            shared_cache.load(
+                "plans", item["id"],
+                lambda plan_id=item["id"]: self._on_primary(self._load_plan, plan_id, engine=engine)
+            )
+        return len(page["items"])
+    
+    def _invalidate_after_commit(self, db: Session, plan_ids: Optional[Iterable[int]] = None) -> None:
+        """Drop cached plans (all of them if ``plan_ids`` is None) once the transaction commits."""
+        def invalidate() -> None:
+            shared_cache.invalidate("plan_pages")
+            if plan_ids is None:
+                shared_cache.invalidate("plans")
+            else:
+                for plan_id in plan_ids:
+                    shared_cache.invalidate("plans", plan_id)
+        
+        on_commit(db, invalidate)
+    
+    def _before_commit(self, db: Session, op: str, id: int, obj: Optional[Plan] = None) -> None:
+        """Log the change and invalidate the cached plan."""
+        super()._before_commit(db, op, id, obj)
+        self._invalidate_after_commit(db, [id])
+    
+    def get_members(
+        self,
+        db: Session,
+        plan_id: int,
+        status: Optional[StatusEnum] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Customer], Optional[str]]:
+        """Get the customers of a plan in customer id order.
+        
+        Keyset-paginated over the ``(plan_id, status, customer_id)`` index:
+        pass the returned cursor to get the next page.
+        """
+        self.get_or_404(db, plan_id)
+        
+        after_id = None
+        if cursor:
+            if not cursor.isdigit():
+                raise ValidationError("Invalid cursor")
+            after_id = int(cursor)
+        
+        statement = (
+            select(Customer)
+            .join(CustomerPlan, CustomerPlan.customer_id == Customer.id)
+            .where(CustomerPlan.plan_id == plan_id, Customer.deleted_at.is_(None))
+        )
+        if status is not None:
+            statement = statement.where(CustomerPlan.status == status)
+        if after_id is not None:
+            statement = statement.where(CustomerPlan.customer_id > after_id)
+        customers = db.exec(statement.order_by(CustomerPlan.customer_id).limit(limit + 1)).all()
+        
+        next_cursor = str(customers[limit - 1].id) if len(customers) > limit else None
+        return customers[:limit], next_cursor
+    
+    def adjust_member_count(self, db: Session, plan_ids: Iterable[int], delta: int) -> None:
+        """Add ``delta`` to the active member count of plans; does not commit."""
+        plan_ids = list(plan_ids)
+        if plan_ids:
+            db.exec(
+                update(Plan)
+                .where(Plan.id.in_(plan_ids))
+                .values(active_member_count=Plan.active_member_count + delta)
+            )
+            self._invalidate_after_commit(db, plan_ids)
+    
+    def recount_members(self, db: Session) -> None:
+        """Recompute every plan's active member count from ``CustomerPlan``."""
+        active = (
+            select(func.count())
+            .where(CustomerPlan.plan_id == Plan.id, CustomerPlan.status == StatusEnum.active)
+            .scalar_subquery()
+        )
+        db.exec(update(Plan).values(active_member_count=active))
+        self._invalidate_after_commit(db)
+        db.commit()
 
 
 # Service instance
-plan_service = PlanService()
\ No newline at end of file
+plan_service = PlanService()
@@ -0,0 +1,316 @@
+"""Bulk plan operation service."""
+
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import literal
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select, insert, update, delete, func
+
+from app.models import (
+    Customer, CustomerPlan, PlanOperation, PlanOperationCreate, PlanOperationKindEnum,
+    StatusEnum, JobStatusEnum,
+)
+from app.services.plan import plan_service
+from app.services.changes import change_service
+from app.services.entitlements import entitlement_service
+from app.services.webhooks import webhook_service
+from app.api.exceptions import NotFoundError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+MEMBERSHIP_COLUMNS = ["customer_id", "plan_id", "status"]
+
+
+def _has_plan(plan_id: int, customer_id_column):
+    """Whether the customer in ``customer_id_column`` has the plan, any status."""
+    member = aliased(CustomerPlan)
+    return select(member.customer_id).where(
+        member.plan_id == plan_id, member.customer_id == customer_id_column
+    ).exists()
+
+
+class PlanOperationService:
+    """Changes plan memberships set-wise, one chunk of customers per commit.
+
+    A chunk is a few ``INSERT ... SELECT``, ``UPDATE`` and ``DELETE``
+    statements over at most ``chunk_size`` customers. The same commit
+    adjusts the plans' active member counts, logs one ``plan_members``
+    change for the chunk's customer id range and advances the operation's
+    cursor, so an interrupted operation resumes where it stopped. This
+    process's entitlement index is updated when the chunk commits; other
+    processes reload the range from the change feed.
+
+    A runner holds a lease on the operation, renewed with every chunk;
+    another runner only takes the operation over once the lease has
+    expired, and a chunk only commits while its runner still holds the
+    lease at the cursor it started from.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = settings.plan_operation_chunk_size,
+        throttle_seconds: float = settings.plan_operation_throttle_seconds,
+        lease_seconds: int = settings.plan_operation_lease_seconds
+    ):
+        self.chunk_size = chunk_size
+        self.throttle_seconds = throttle_seconds
+        self.lease_seconds = lease_seconds
+
+    def create(self, db: Session, data: PlanOperationCreate) -> PlanOperation:
+        """Queue a bulk operation after checking its plans exist."""
+        for plan_id in (data.plan_id, data.target_plan_id, data.has_plan_id):
+            if plan_id is not None:
+                plan_service.get_or_404(db, plan_id)
+
+        operation = PlanOperation(
+            **data.model_dump(exclude={"chunk_size"}),
+            chunk_size=data.chunk_size or self.chunk_size,
+            created_at=datetime.now(timezone.utc),
+        )
+        operation.customers_total = db.exec(
+            select(func.count()).select_from(self._customer_ids(operation).subquery())
+        ).one()
+        db.add(operation)
+        db.commit()
+        db.refresh(operation)
+
+        logger.info(
+            f"Queued plan operation {operation.id} ({operation.kind.value} plan {operation.plan_id}) "
+            f"for {operation.customers_total} customers"
+        )
+        return operation
+
+    def get_operation(self, db: Session, operation_id: int) -> PlanOperation:
+        """Get a plan operation or raise 404."""
+        operation = db.get(PlanOperation, operation_id)
+        if not operation:
+            raise NotFoundError("PlanOperation", operation_id)
+        return operation
+
+    def get_progress(self, db: Session, operation: PlanOperation) -> dict:
+        """Operation status with the share of customers processed."""
+        total = operation.customers_total
+        return {
+            **operation.model_dump(),
+            "progress": round(min(operation.customers_processed / total, 1.0), 4) if total else
+                        (1.0 if operation.status == JobStatusEnum.completed else 0.0),
+        }
+
+    def _claim(self, db: Session, operation_id: int) -> Optional[str]:
+        """Take the operation's lease unless another runner holds it; the claim token if taken."""
+        now = datetime.now(timezone.utc)
+        token = uuid.uuid4().hex
+        claimed = db.exec(
+            update(PlanOperation)
+            .where(
+                PlanOperation.id == operation_id,
+                PlanOperation.status != JobStatusEnum.completed,
+                PlanOperation.lease_expires_at.is_(None) | (PlanOperation.lease_expires_at < now),
+            )
+            .values(
+                status=JobStatusEnum.running,
+                started_at=func.coalesce(PlanOperation.started_at, now),
+                error=None,
+                claim_token=token,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+            )
+        ).rowcount
+        db.commit()
+        return token if claimed else None
+
+    def _release(self, db: Session, operation: PlanOperation, token: str, **values) -> bool:
+        """Set ``values`` and drop the lease if this runner still holds it."""
+        released = db.exec(
+            update(PlanOperation)
+            .where(PlanOperation.id == operation.id, PlanOperation.claim_token == token)
+            .values(claim_token=None, lease_expires_at=None, **values)
+        ).rowcount
+        return bool(released)
+
+    def run(self, db: Session, operation_id: int) -> PlanOperation:
+        """Run (or resume) a plan operation to completion.
+
+        Returns at once, without running it, when another runner holds
+        the operation's lease.
+        """
+        operation = self.get_operation(db, operation_id)
+        if operation.status == JobStatusEnum.completed:
+            return operation
+
+        token = self._claim(db, operation_id)
+        db.refresh(operation)
+        if token is None:
+            logger.info(f"Plan operation {operation.id} is being run by another runner")
+            return operation
+
+        try:
+            while True:
+                customer_ids = db.exec(
+                    self._customer_ids(operation, after=operation.cursor).limit(operation.chunk_size)
+                ).all()
+                if not customer_ids:
+                    break
+                if not self._apply_chunk(db, operation, customer_ids, token):
+                    db.refresh(operation)
+                    logger.warning(f"Plan operation {operation.id} lost its lease; stopped at customer {operation.cursor}")
+                    return operation
+                if self.throttle_seconds:
+                    time.sleep(self.throttle_seconds)
+
+            finished_at = datetime.now(timezone.utc)
+            if not self._release(db, operation, token, status=JobStatusEnum.completed, finished_at=finished_at):
+                db.rollback()
+                db.refresh(operation)
+                return operation
+            db.refresh(operation)
+            webhook_service.enqueue(db, "plan.operation_completed", self.get_progress(db, operation))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self._release(db, operation, token, status=JobStatusEnum.failed, error=str(e)[:255])
+            db.commit()
+            logger.error(f"Plan operation {operation.id} failed: {e}")
+            raise
+
+        db.refresh(operation)
+        logger.info(
+            f"Plan operation {operation.id} ({operation.kind.value}) processed "
+            f"{operation.customers_processed} customers, changed {operation.memberships_changed} memberships"
+        )
+        return operation
+
+    def _customer_ids(self, operation: PlanOperation, after: int = 0):
+        """Ids of the customers the operation still applies to, in order."""
+        if operation.kind == PlanOperationKindEnum.attach:
+            column = Customer.id
+            statement = select(column).where(
+                Customer.deleted_at.is_(None), ~_has_plan(operation.plan_id, column)
+            )
+            if operation.has_plan_id is not None:
+                statement = statement.where(_has_plan(operation.has_plan_id, column))
+        else:
+            column = CustomerPlan.customer_id
+            statement = select(column).where(CustomerPlan.plan_id == operation.plan_id)
+            if operation.member_status is not None:
+                statement = statement.where(CustomerPlan.status == operation.member_status)
+            if operation.kind == PlanOperationKindEnum.set_status:
+                statement = statement.where(CustomerPlan.status != operation.new_status)
+
+        if operation.first_customer_id is not None:
+            statement = statement.where(column >= operation.first_customer_id)
+        if operation.last_customer_id is not None:
+            statement = statement.where(column <= operation.last_customer_id)
+        return statement.where(column > after).order_by(column)
+
+    def _apply_chunk(self, db: Session, operation: PlanOperation, customer_ids: List[int], token: str) -> bool:
+        """Apply the operation to one chunk of customers and commit; ``False`` if the lease was lost."""
+        first_id, last_id = customer_ids[0], customer_ids[-1]
+        # Advance the cursor first: its row lock (the write lock on SQLite)
+        # keeps any other runner out until this chunk commits
+        held = db.exec(
+            update(PlanOperation)
+            .where(
+                PlanOperation.id == operation.id,
+                PlanOperation.claim_token == token,
+                PlanOperation.cursor == operation.cursor,
+            )
+            .values(
+                cursor=last_id,
+                customers_processed=PlanOperation.customers_processed + len(customer_ids),
+                lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds),
+            )
+        ).rowcount
+        if not held:
+            db.rollback()
+            return False
+
+        plan_id = operation.plan_id
+        if operation.kind == PlanOperationKindEnum.migrate:
+            target_id = operation.target_plan_id
+            moving = (CustomerPlan.plan_id == plan_id, CustomerPlan.customer_id.in_(customer_ids))
+            new_member = ~_has_plan(target_id, CustomerPlan.customer_id)
+            active = CustomerPlan.status == StatusEnum.active
+            # Active memberships separately, so the rowcounts are the member count deltas
+            joined_active = self._move(db, target_id, *moving, new_member, active)
+            self._move(db, target_id, *moving, new_member, ~active)
+            left_active = db.exec(delete(CustomerPlan).where(*moving, active)).rowcount
+            changed = left_active + db.exec(delete(CustomerPlan).where(*moving)).rowcount
+            plan_service.adjust_member_count(db, [plan_id], -left_active)
+            plan_service.adjust_member_count(db, [target_id], joined_active)
+            plan_ids = [plan_id, target_id]
+
+        elif operation.kind == PlanOperationKindEnum.attach:
+            member_status = operation.member_status or StatusEnum.active
+            changed = db.exec(insert(CustomerPlan).from_select(
+                MEMBERSHIP_COLUMNS,
+                select(
+                    Customer.id,
+                    literal(plan_id),
+                    literal(member_status, CustomerPlan.__table__.c.status.type),
+                )
+                .where(Customer.id.in_(customer_ids), ~_has_plan(plan_id, Customer.id))
+            )).rowcount
+            if member_status == StatusEnum.active:
+                plan_service.adjust_member_count(db, [plan_id], changed)
+            plan_ids = [plan_id]
+
+        else:
+            changed = db.exec(
+                update(CustomerPlan)
+                .where(
+                    CustomerPlan.plan_id == plan_id,
+                    CustomerPlan.customer_id.in_(customer_ids),
+                    CustomerPlan.status != operation.new_status,
+                )
+                .values(status=operation.new_status)
+            ).rowcount
+            plan_service.adjust_member_count(
+                db, [plan_id], changed if operation.new_status == StatusEnum.active else -changed
+            )
+            plan_ids = [plan_id]
+
+        change_service.record(db, "plan_members", operation.id, "update", data={
+            "plan_ids": plan_ids,
+            "first_customer_id": first_id,
+            "last_customer_id": last_id,
+        })
+        entitlement_service.after_commit_range(db, plan_ids, first_id, last_id)
+
+        db.exec(
+            update(PlanOperation)
+            .where(PlanOperation.id == operation.id)
+            .values(memberships_changed=PlanOperation.memberships_changed + changed)
+        )
+        db.commit()
+        db.refresh(operation)
+        return True
+
+    def _move(self, db: Session, target_id: int, *conditions) -> int:
+        """Copy the memberships matching ``conditions`` to the target plan; rows inserted."""
+        return db.exec(insert(CustomerPlan).from_select(
+            MEMBERSHIP_COLUMNS,
+            select(CustomerPlan.customer_id, literal(target_id), CustomerPlan.status).where(*conditions)
+        )).rowcount
+
+    def run_pending(self, db: Session) -> List[PlanOperation]:
+        """Run every operation that is not completed, oldest first.
+
+        Operations another runner holds a live lease on are skipped
+        (returned as they are).
+        """
+        operation_ids = db.exec(
+            select(PlanOperation.id)
+            .where(PlanOperation.status != JobStatusEnum.completed)
+            .order_by(PlanOperation.id)
+        ).all()
+        return [self.run(db, operation_id) for operation_id in operation_ids]
+
+
+# Service instance
+plan_operation_service = PlanOperationService()
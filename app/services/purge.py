@@ -0,0 +1,145 @@
+"""Customer purge service."""
+
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from sqlmodel import Session, select, delete
+
+from app.models import (
+    Customer, CustomerPlan, CustomerPurge, CustomerInvoice, CustomerSpendRollup,
+    Transaction, TransactionArchive, JobStatusEnum,
+)
+from app.services.analytics import analytics_service
+from app.api.exceptions import NotFoundError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class PurgeService:
+    """Removes soft-deleted customers and their history in small commits.
+
+    Each chunk of rows is deleted in its own short transaction, followed by
+    a pause, so other writers are never blocked for long. Deleted
+    transactions are retracted from the analytics rollups in the same
+    commit. A failed or interrupted job can simply be run again.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = settings.purge_chunk_size,
+        throttle_seconds: float = settings.purge_throttle_seconds
+    ):
+        self.chunk_size = chunk_size
+        self.throttle_seconds = throttle_seconds
+
+    def get_job(self, db: Session, job_id: int) -> CustomerPurge:
+        """Get a purge job or raise 404."""
+        job = db.get(CustomerPurge, job_id)
+        if not job:
+            raise NotFoundError("CustomerPurge", job_id)
+        return job
+
+    def get_for_customer(self, db: Session, customer_id: int) -> CustomerPurge:
+        """Get the latest purge job of a customer or raise 404."""
+        job = db.exec(
+            select(CustomerPurge)
+            .where(CustomerPurge.customer_id == customer_id)
+            .order_by(CustomerPurge.id.desc())
+        ).first()
+        if not job:
+            raise NotFoundError("CustomerPurge for customer", customer_id)
+        return job
+
+    def get_progress(self, db: Session, job: CustomerPurge) -> dict:
+        """Job status with the share of transactions removed."""
+        total = job.transactions_total
+        return {
+            **job.model_dump(),
+            "progress": round(job.transactions_deleted / total, 4) if total else
+                        (1.0 if job.status == JobStatusEnum.completed else 0.0),
+        }
+
+    def run(self, db: Session, job_id: int) -> CustomerPurge:
+        """Run (or resume) a purge job to completion."""
+        job = self.get_job(db, job_id)
+        if job.status == JobStatusEnum.completed:
+            return job
+
+        job.status = JobStatusEnum.running
+        job.started_at = job.started_at or datetime.now(timezone.utc)
+        job.error = None
+        db.add(job)
+        db.commit()
+
+        customer_id = job.customer_id
+        try:
+            self._delete_in_chunks(
+                db, job, "transactions_deleted", Transaction, Transaction.customer_id == customer_id,
+                before_delete=lambda ids: analytics_service.retract_where(db, Transaction.id.in_(ids)),
+            )
+            self._delete_in_chunks(
+                db, job, "transactions_deleted", TransactionArchive, TransactionArchive.customer_id == customer_id,
+                before_delete=lambda ids: analytics_service.retract_where(
+                    db, TransactionArchive.id.in_(ids), source=TransactionArchive
+                ),
+            )
+            self._delete_in_chunks(
+                db, job, "invoices_deleted", CustomerInvoice, CustomerInvoice.customer_id == customer_id,
+            )
+
+            job.plan_links_deleted += db.exec(
+                delete(CustomerPlan).where(CustomerPlan.customer_id == customer_id)
+            ).rowcount
+            db.exec(delete(CustomerSpendRollup).where(CustomerSpendRollup.customer_id == customer_id))
+            db.exec(delete(Customer).where(Customer.id == customer_id, Customer.deleted_at.is_not(None)))
+            job.status = JobStatusEnum.completed
+            job.finished_at = datetime.now(timezone.utc)
+            db.add(job)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            job.status = JobStatusEnum.failed
+            job.error = str(e)[:255]
+            db.add(job)
+            db.commit()
+            logger.error(f"Purge job {job.id} for customer {customer_id} failed: {e}")
+            raise
+
+        db.refresh(job)
+        logger.info(
+            f"Purged customer {customer_id}: {job.transactions_deleted} transactions, "
+            f"{job.invoices_deleted} invoices, {job.plan_links_deleted} plan links"
+        )
+        return job
+
+    def _delete_in_chunks(self, db: Session, job: CustomerPurge, counter: str, model, condition, before_delete=None) -> None:
+        """Delete matching rows chunk by chunk, committing progress with each."""
+        while True:
+            ids = db.exec(select(model.id).where(condition).order_by(model.id).limit(self.chunk_size)).all()
+            if not ids:
+                return
+            if before_delete is not None:
+                before_delete(ids)
+            db.exec(delete(model).where(model.id.in_(ids)))
+            setattr(job, counter, getattr(job, counter) + len(ids))
+            db.add(job)
+            db.commit()
+            if self.throttle_seconds:
+                time.sleep(self.throttle_seconds)
+
+    def run_pending(self, db: Session) -> List[CustomerPurge]:
+        """Run every job that is not completed, oldest first."""
+        job_ids = db.exec(
+            select(CustomerPurge.id)
+            .where(CustomerPurge.status != JobStatusEnum.completed)
+            .order_by(CustomerPurge.id)
+        ).all()
+        return [self.run(db, job_id) for job_id in job_ids]
+
+
+# Service instance
+purge_service = PurgeService()
@@ -0,0 +1,110 @@
+"""Request coalescing (single-flight) for hot identical reads."""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session
+
+from app.db.tenancy import current_tenant
+from app.db.replicas import replica_reads_allowed
+from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class SingleFlight:
+    """Shares one in-flight service call between concurrent identical reads.
+
+    Calls are keyed on tenant, service class, method name and arguments.
+    The first caller runs the call in a worker thread on its own request
+    session (so on the same bind, and without a second connection) and
+    serializes the result once; callers arriving while it runs await the
+    same task and get the same serialized result, or the same exception.
+    The shared task is shielded, so a disconnecting client does not cancel
+    it for the others; the first caller's session stays open until it ends.
+
+    Coalescing is opt-in per endpoint through ``single_flight_endpoints``;
+    for other endpoints ``run`` calls the service directly.
+    """
+
+    def __init__(self, endpoints: list[str]):
+        self.endpoints = set(endpoints)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "executions": 0})
+
+    def configure(self, config: Settings) -> None:
+        """Coalesce the endpoints listed in ``config``."""
+        self.endpoints = set(config.single_flight_endpoints)
+
+    def enabled(self, endpoint: str) -> bool:
+        """Whether coalescing is turned on for an endpoint."""
+        return endpoint in self.endpoints
+
+    async def run(self, endpoint: str, method: Callable, db: Session, *args: Any) -> Any:
+        """Call ``method(db, *args)``, coalesced if the endpoint opted in.
+
+        Coalesced results are JSON-compatible data rather than ORM objects.
+        """
+        if not self.enabled(endpoint):
+            return method(db, *args)
+
+        name = f"{type(method.__self__).__name__}.{method.__name__}"
+        # Callers pinned to the primary never share a replica read
+        key: Tuple = (current_tenant.get(), replica_reads_allowed.get(), name, args)
+        stats = self._stats[name]
+        stats["calls"] += 1
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            return await asyncio.shield(task)
+
+        stats["executions"] += 1
+        task = asyncio.ensure_future(run_in_threadpool(self._execute, method, db, args))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The call uses this request's session: keep it open until the call ends
+            await asyncio.wait({task})
+            raise
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def _execute(self, method: Callable, db: Session, args: tuple) -> Any:
+        return jsonable_encoder(method(db, *args))
+
+    def get_stats(self) -> dict:
+        """Calls, executions and coalescing ratio per service method."""
+        methods = {}
+        for name, stats in sorted(self._stats.items()):
+            calls, executions = stats["calls"], stats["executions"]
+            methods[name] = {
+                "calls": calls,
+                "executions": executions,
+                "coalesced": calls - executions,
+                "coalescing_ratio": round((calls - executions) / calls, 4) if calls else 0.0,
+            }
+        calls = sum(stats["calls"] for stats in self._stats.values())
+        executions = sum(stats["executions"] for stats in self._stats.values())
+        return {
+            "endpoints": sorted(self.endpoints),
+            "in_flight": len(self._in_flight),
+            "calls": calls,
+            "executions": executions,
+            "coalescing_ratio": round((calls - executions) / calls, 4) if calls else 0.0,
+            "methods": methods,
+        }
+
+
+# Service instance
+single_flight = SingleFlight(settings.single_flight_endpoints)
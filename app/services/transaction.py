@@ -1,14 +1,48 @@
 """Transaction service."""
 
-from typing import List
-from sqlmodel import Session, select
+from datetime import date, datetime, time, timezone
+from typing import List, Optional
+from sqlmodel import Session, select, insert, func, or_, and_, literal, union_all
 
-from app.models import Transaction, TransactionCreate, TransactionUpdate, Customer
+from app.models import (
+    Transaction, TransactionCreate, TransactionUpdate, Customer, Plan,
+    CustomerPlan, StatusEnum, TransactionDailyBucket, TransactionArchive,
+)
 from app.services.base import BaseService
-from app.api.exceptions import NotFoundError
+from app.services.analytics import analytics_service, DAILY_BUCKETS_CHECKPOINT
+from app.services.archive import archive_boundary, ARCHIVED_COLUMNS
+from app.services.webhooks import webhook_service
+from app.db.utils import as_utc, bucket_expression, bucket_key, get_checkpoint
+from app.api.exceptions import NotFoundError, ConflictError
+from app.core.config import get_settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
+settings = get_settings()
+
+# Supported time-series bucket sizes
+TIMESERIES_BUCKETS = ("day", "week", "month")
+
+
+def _created_between(
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    source=Transaction
+) -> list:
+    """Build filters for a half-open ``[created_from, created_to)`` range."""
+    conditions = []
+    if created_from is not None:
+        conditions.append(source.created_at >= as_utc(created_from))
+    if created_to is not None:
+        conditions.append(source.created_at < as_utc(created_to))
+    return conditions
+
+
+def _of_live_customer(source=Transaction):
+    """Filter out transactions of soft-deleted customers awaiting purge."""
+    return ~select(Customer.id).where(
+        Customer.id == source.customer_id, Customer.deleted_at.is_not(None)
+    ).exists()
 
 
 class TransactionService(BaseService[Transaction, TransactionCreate, TransactionUpdate]):
@@ -17,40 +51,298 @@ class TransactionService(BaseService[Transaction, TransactionCreate, Transaction
     def __init__(self):
         super().__init__(Transaction)
     
+    def _sources(self, db: Session, created_from: Optional[datetime] = None) -> tuple:
+        """Tables a query starting at ``created_from`` has to read.
+        
+        The archive is only read when the range reaches back before the
+        archive boundary.
+        """
+        boundary = archive_boundary(db)
+        if boundary is None or (created_from is not None and as_utc(created_from) >= boundary):
+            return (Transaction,)
+        return (Transaction, TransactionArchive)
+    
+    def _hides_deleted(self, db: Session) -> bool:
+        """Whether listings must skip soft-deleted customers (usually none are awaiting purge)."""
+        return db.exec(select(Customer.id).where(Customer.deleted_at.is_not(None)).limit(1)).first() is not None
+    
+    def _union(
+        self,
+        sources: tuple,
+        created_from: Optional[datetime],
+        created_to: Optional[datetime],
+        customer_id: Optional[int] = None,
+        live_only: bool = False
+    ):
+        """Subquery over the matching rows of every source table."""
+        selects = []
+        for source in sources:
+            statement = select(*(getattr(source, column) for column in ARCHIVED_COLUMNS)).where(
+                *_created_between(created_from, created_to, source)
+            )
+            if customer_id is not None:
+                statement = statement.where(source.customer_id == customer_id)
+            if live_only:
+                statement = statement.where(_of_live_customer(source))
+            selects.append(statement)
+        return union_all(*selects).subquery()
+    
+    def _select_union(self, db: Session, union, order_by: tuple, skip: int, limit: int) -> List[Transaction]:
+        rows = db.exec(
+            select(*union.c).order_by(*(union.c[column] for column in order_by)).offset(skip).limit(limit)
+        ).all()
+        return [Transaction(**row._mapping) for row in rows]
+    
+    def get_with_archive(self, db: Session, id: int) -> Transaction:
+        """Get a transaction by ID, falling back to the archive, or raise 404."""
+        transaction = self.get(db, id)
+        if transaction is None:
+            archived = db.get(TransactionArchive, id)
+            if archived is None:
+                raise NotFoundError("Transaction", id)
+            transaction = Transaction(**archived.model_dump())
+        return transaction
+    
+    def get_or_404(self, db: Session, id: int) -> Transaction:
+        """Get a hot transaction by ID; archived transactions cannot be changed."""
+        transaction = self.get(db, id)
+        if transaction is None:
+            if db.get(TransactionArchive, id) is not None:
+                raise ConflictError(f"Transaction {id} is archived and read-only")
+            raise NotFoundError("Transaction", id)
+        return transaction
+    
     def create(self, db: Session, obj_in: TransactionCreate) -> Transaction:
         """Create transaction with customer validation."""
         # Verify customer exists
         customer = db.get(Customer, obj_in.customer_id)
-        if not customer:
+        if not customer or customer.deleted_at is not None:
             raise NotFoundError("Customer", obj_in.customer_id)
         
+        # Verify plan exists when the transaction is attributed to one
+        if obj_in.plan_id is not None and not db.get(Plan, obj_in.plan_id):
+            raise NotFoundError("Plan", obj_in.plan_id)
+        
+        analytics_service.before_insert(db)
         return super().create(db, obj_in)
     
+    def _before_commit(
+        self, 
+        db: Session, 
+        op: str, 
+        id: int, 
+        obj: Optional[Transaction] = None
+    ) -> None:
+        """Announce created transactions to webhook subscribers."""
+        super()._before_commit(db, op, id, obj)
+        if op == "create":
+            webhook_service.enqueue(db, "transaction.created", obj.model_dump(mode="json"))
+    
+    def update(
+        self, 
+        db: Session, 
+        db_obj: Transaction, 
+        obj_in: TransactionUpdate
+    ) -> Transaction:
+        """Update transaction and keep analytics rollups in step."""
+        updated = Transaction.model_validate(
+            {**db_obj.model_dump(), **obj_in.model_dump(exclude_unset=True)}
+        )
+        analytics_service.apply(db, db_obj, sign=-1)
+        analytics_service.apply(db, updated)
+        return super().update(db, db_obj, obj_in)
+    
+    def delete(self, db: Session, id: int) -> bool:
+        """Delete transaction and retract it from analytics rollups."""
+        transaction = self.get_or_404(db, id)
+        analytics_service.apply(db, transaction, sign=-1)
+        return super().delete(db, id)
+    
+    def create_for_active_memberships(
+        self,
+        db: Session,
+        description: str,
+        first_customer_id: int,
+        last_customer_id: int
+    ) -> int:
+        """Insert one transaction per active membership at the plan's price.
+        
+        Runs as a single ``INSERT ... SELECT`` over the given customer id
+        range and does not commit. A ``transaction.created`` event is queued
+        for each inserted row, as for single creates; like those, they are
+        not recorded in the change feed. Returns the number of rows inserted.
+        """
+        analytics_service.before_insert(db)
+        statement = insert(Transaction).from_select(
+            ["amount", "description", "customer_id", "plan_id", "created_at"],
+            select(
+                Plan.price,
+                literal(f"{description}: ") + Plan.name,
+                CustomerPlan.customer_id,
+                CustomerPlan.plan_id,
+                literal(datetime.now(timezone.utc), Transaction.__table__.c.created_at.type),
+            )
+            .join(Plan, Plan.id == CustomerPlan.plan_id)
+            .where(
+                CustomerPlan.status == StatusEnum.active,
+                CustomerPlan.customer_id >= first_customer_id,
+                CustomerPlan.customer_id <= last_customer_id,
+                Plan.price.is_not(None),
+            )
+        ).returning(*Transaction.__table__.c)
+        created = [Transaction(**row._mapping).model_dump(mode="json") for row in db.exec(statement)]
+        webhook_service.enqueue_many(db, "transaction.created", created)
+        return len(created)
+    
+    def get_multi(
+        self, 
+        db: Session, 
+        skip: int = 0, 
+        limit: int = 100,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> List[Transaction]:
+        """Get transactions with pagination, optionally within a time range.
+        
+        Transactions of soft-deleted customers are left out.
+        """
+        sources = self._sources(db, created_from)
+        conditions = _created_between(created_from, created_to)
+        live_only = self._hides_deleted(db)
+        if len(sources) > 1:
+            order_by = ("created_at", "id") if conditions else ("id",)
+            union = self._union(sources, created_from, created_to, live_only=live_only)
+            return self._select_union(db, union, order_by, skip, limit)
+        if not conditions and not live_only:
+            return super().get_multi(db, skip=skip, limit=limit)
+        
+        statement = select(Transaction).where(*conditions)
+        if live_only:
+            statement = statement.where(_of_live_customer())
+        if conditions:
+            statement = statement.order_by(Transaction.created_at, Transaction.id)
+        return db.exec(statement.offset(skip).limit(limit)).all()
+    
+    def count(
+        self, 
+        db: Session,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> int:
+        """Count transactions, optionally within a time range, leaving out soft-deleted customers."""
+        live_only = self._hides_deleted(db)
+        total = 0
+        for source in self._sources(db, created_from):
+            statement = select(func.count()).select_from(source).where(*_created_between(created_from, created_to, source))
+            if live_only:
+                statement = statement.where(_of_live_customer(source))
+            total += db.exec(statement).one()
+        return total
+    
     def get_by_customer(
         self, 
         db: Session, 
         customer_id: int, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
     ) -> List[Transaction]:
         """Get transactions for a specific customer."""
         # Verify customer exists
         customer = db.get(Customer, customer_id)
-        if not customer:
+        if not customer or customer.deleted_at is not None:
             raise NotFoundError("Customer", customer_id)
         
-        statement = (
-            select(Transaction)
-            .where(Transaction.customer_id == customer_id)
-            .offset(skip)
-            .limit(limit)
+        sources = self._sources(db, created_from)
+        if len(sources) > 1:
+            ranged = created_from is not None or created_to is not None
+            union = self._union(sources, created_from, created_to, customer_id)
+            return self._select_union(db, union, ("created_at", "id") if ranged else ("id",), skip, limit)
+        
+        statement = select(Transaction).where(
+            Transaction.customer_id == customer_id,
+            *_created_between(created_from, created_to)
         )
-        return db.exec(statement).all()
+        if created_from is not None or created_to is not None:
+            # Served by the (customer_id, created_at) index
+            statement = statement.order_by(Transaction.created_at, Transaction.id)
+        
+        return db.exec(statement.offset(skip).limit(limit)).all()
     
     def get_customer_total(self, db: Session, customer_id: int) -> int:
         """Get total transaction amount for a customer."""
-        transactions = self.get_by_customer(db, customer_id, skip=0, limit=1000)
-        return sum(t.amount for t in transactions)
+        customer = db.get(Customer, customer_id)
+        if not customer or customer.deleted_at is not None:
+            raise NotFoundError("Customer", customer_id)
+        
+        return sum(
+            db.exec(
+                select(func.coalesce(func.sum(source.amount), 0)).where(source.customer_id == customer_id)
+            ).one()
+            for source in self._sources(db)
+        )
+    
+    def get_timeseries(
+        self,
+        db: Session,
+        bucket: str = "day",
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> List[dict]:
+        """Aggregate transaction amounts into day, week or month buckets.
+        
+        Whole days that have already been closed into daily buckets are read
+        from ``TransactionDailyBucket``; the rest of the range is grouped
+        directly on the ``transaction`` table.
+        """
+        created_from, created_to = as_utc(created_from), as_utc(created_to)
+        totals: dict[str, list[int]] = {}
+        raw_ranges = [(created_from, created_to)]
+        
+        closed_until = get_checkpoint(db, DAILY_BUCKETS_CHECKPOINT)
+        if settings.timeseries_daily_buckets and closed_until:
+            first_day = None
+            if created_from is not None:
+                first_day = created_from.date()
+                if created_from.time() != time.min:
+                    first_day = date.fromordinal(first_day.toordinal() + 1)
+            last_day = date.fromordinal(closed_until)
+            if created_to is not None:
+                last_day = min(last_day, created_to.date())
+            
+            if first_day is None or first_day < last_day:
+                statement = select(TransactionDailyBucket).where(TransactionDailyBucket.day < last_day)
+                if first_day is not None:
+                    statement = statement.where(TransactionDailyBucket.day >= first_day)
+                for day_bucket in db.exec(statement):
+                    entry = totals.setdefault(bucket_key(day_bucket.day, bucket), [0, 0])
+                    entry[0] += day_bucket.amount
+                    entry[1] += day_bucket.transaction_count
+                
+                raw_ranges = [(datetime.combine(last_day, time.min, timezone.utc), created_to)]
+                if first_day is not None:
+                    lower = datetime.combine(first_day, time.min, timezone.utc)
+                    if created_from < lower:
+                        raw_ranges.append((created_from, lower))
+        
+        earliest = None if any(lo is None for lo, _ in raw_ranges) else min(lo for lo, _ in raw_ranges)
+        for source in self._sources(db, earliest):
+            key = bucket_expression(db, source.created_at, bucket)
+            rows = db.exec(
+                select(key, func.sum(source.amount), func.count())
+                .where(or_(*(and_(True, *_created_between(lo, hi, source)) for lo, hi in raw_ranges)))
+                .group_by(key)
+            ).all()
+            for bucket_start, amount, count in rows:
+                entry = totals.setdefault(bucket_start, [0, 0])
+                entry[0] += amount
+                entry[1] += count
+        
+        return [
+            {"bucket": bucket_start, "amount": amount, "transaction_count": count}
+            for bucket_start, (amount, count) in sorted(totals.items())
+        ]
 
 
 # Service instance
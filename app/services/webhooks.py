@@ -0,0 +1,447 @@
+"""Webhook outbox and delivery service."""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from sqlmodel import Session, select, update, delete, func
+
+from app.models import (
+    WebhookEndpoint, WebhookEndpointCreate, OutboxEvent, WebhookDelivery, DeliveryStatusEnum,
+)
+from app.services.base import BaseService
+from app.db.hooks import on_commit
+from app.db.utils import dialect_insert
+from app.api.exceptions import NotFoundError, ConflictError
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class WebhookService(BaseService[WebhookEndpoint, WebhookEndpointCreate, WebhookEndpointCreate]):
+    """Manages webhook endpoints and the transactional outbox.
+
+    Events are written to the outbox in the caller's transaction, so they
+    exist exactly when the change they announce is committed. Delivery
+    happens later in the ``WebhookDispatcher``; each event is fanned out
+    to one ``WebhookDelivery`` row per subscribed endpoint, which tracks
+    attempts, backoff and dead-lettering.
+    """
+
+    def __init__(self):
+        super().__init__(WebhookEndpoint)
+        # Called after a commit that wrote outbox events
+        self.listeners: List[Callable[[], None]] = []
+
+    def delete(self, db: Session, id: int) -> bool:
+        """Delete an endpoint together with its delivery history."""
+        self.get_or_404(db, id)
+        db.exec(delete(WebhookDelivery).where(WebhookDelivery.endpoint_id == id))
+        return super().delete(db, id)
+
+    def enqueue(self, db: Session, event_type: str, data: dict) -> OutboxEvent:
+        """Add an event to the outbox; does not commit."""
+        event = OutboxEvent(
+            event_type=event_type,
+            payload=json.dumps(data, default=str),
+            created_at=datetime.now(timezone.utc),
+        )
+        db.add(event)
+        on_commit(db, self._notify)
+        return event
+
+    def enqueue_many(self, db: Session, event_type: str, items: List[dict]) -> None:
+        """Add one event per item to the outbox; does not commit."""
+        if not items:
+            return
+        now = datetime.now(timezone.utc)
+        db.add_all([
+            OutboxEvent(event_type=event_type, payload=json.dumps(data, default=str), created_at=now)
+            for data in items
+        ])
+        on_commit(db, self._notify)
+
+    def _notify(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+    def fan_out(self, db: Session, limit: int = settings.webhook_claim_limit) -> int:
+        """Create deliveries for outbox events not yet fanned out.
+
+        Returns the number of events processed.
+        """
+        events = db.exec(
+            select(OutboxEvent.id, OutboxEvent.event_type)
+            .where(OutboxEvent.fanned_out_at.is_(None))
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+        ).all()
+        if not events:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        endpoints = db.exec(select(WebhookEndpoint).where(WebhookEndpoint.is_active)).all()
+        deliveries = [
+            {"event_id": event_id, "endpoint_id": endpoint.id, "next_attempt_at": now}
+            for event_id, event_type in events
+            for endpoint in endpoints
+            if endpoint.accepts(event_type)
+        ]
+        if deliveries:
+            statement = dialect_insert(db, WebhookDelivery).on_conflict_do_nothing(
+                index_elements=["event_id", "endpoint_id"]
+            )
+            db.exec(statement, params=deliveries)
+        db.exec(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_([event_id for event_id, _ in events]))
+            .values(fanned_out_at=now)
+        )
+        db.commit()
+        return len(events)
+
+    def claim_due(self, db: Session, limit: int = settings.webhook_claim_limit) -> List[dict]:
+        """Lease due deliveries and load what is needed to send them.
+
+        A claimed delivery is not due again until its lease expires, so a
+        dispatcher that dies mid-send has its deliveries retried. Outcomes
+        are recorded with the returned ``claim_token``; once another
+        dispatcher has taken a delivery over, they are ignored.
+        """
+        now = datetime.now(timezone.utc)
+        token = uuid.uuid4().hex
+        due = (
+            select(WebhookDelivery.id)
+            .where(
+                WebhookDelivery.status == DeliveryStatusEnum.pending,
+                WebhookDelivery.next_attempt_at <= now,
+            )
+            .order_by(WebhookDelivery.next_attempt_at)
+            .limit(limit)
+        )
+        claimed = db.exec(
+            update(WebhookDelivery)
+            .where(
+                WebhookDelivery.id.in_(due.scalar_subquery()),
+                WebhookDelivery.next_attempt_at <= now,
+            )
+            .values(
+                claim_token=token,
+                next_attempt_at=now + timedelta(seconds=settings.webhook_claim_lease_seconds),
+            )
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return []
+
+        rows = db.exec(
+            select(WebhookDelivery, OutboxEvent, WebhookEndpoint)
+            .join(OutboxEvent, OutboxEvent.id == WebhookDelivery.event_id)
+            .join(WebhookEndpoint, WebhookEndpoint.id == WebhookDelivery.endpoint_id)
+            .where(WebhookDelivery.claim_token == token)
+            .order_by(WebhookDelivery.endpoint_id, WebhookDelivery.event_id)
+        ).all()
+        return [
+            {
+                "delivery_id": delivery.id,
+                "claim_token": token,
+                "attempts": delivery.attempts,
+                "endpoint": {"id": endpoint.id, "url": endpoint.url, "secret": endpoint.secret},
+                "event": {
+                    "id": event.id,
+                    "type": event.event_type,
+                    "created_at": event.created_at.isoformat() if event.created_at else None,
+                    "data": json.loads(event.payload),
+                },
+            }
+            for delivery, event, endpoint in rows
+        ]
+
+    def record_delivered(self, db: Session, delivery_ids: List[int], token: str) -> int:
+        """Mark deliveries still claimed with ``token`` as delivered; returns how many."""
+        updated = db.exec(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(delivery_ids), WebhookDelivery.claim_token == token)
+            .values(
+                status=DeliveryStatusEnum.delivered,
+                attempts=WebhookDelivery.attempts + 1,
+                delivered_at=datetime.now(timezone.utc),
+                claim_token=None,
+                last_error=None,
+            )
+        ).rowcount
+        db.commit()
+        return updated
+
+    def record_failed(self, db: Session, delivery_ids: List[int], token: str, error: str) -> int:
+        """Schedule a retry with exponential backoff, or dead-letter.
+
+        Only deliveries still claimed with ``token`` are changed. Returns
+        the number of deliveries dead-lettered.
+        """
+        now = datetime.now(timezone.utc)
+        dead = 0
+        claimed = db.exec(
+            select(WebhookDelivery.id, WebhookDelivery.attempts)
+            .where(WebhookDelivery.id.in_(delivery_ids), WebhookDelivery.claim_token == token)
+        ).all()
+        for delivery_id, attempts in claimed:
+            attempts += 1
+            values = {"attempts": attempts, "claim_token": None, "last_error": error[:255]}
+            if attempts >= settings.webhook_max_attempts:
+                values["status"] = DeliveryStatusEnum.dead
+            else:
+                values["next_attempt_at"] = now + timedelta(seconds=backoff_seconds(attempts))
+            updated = db.exec(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id == delivery_id, WebhookDelivery.claim_token == token)
+                .values(**values)
+            ).rowcount
+            if updated and "status" in values:
+                dead += 1
+        db.commit()
+        return dead
+
+    def get_deliveries(
+        self,
+        db: Session,
+        status: Optional[DeliveryStatusEnum] = None,
+        before_id: Optional[int] = None,
+        limit: int = 100
+    ) -> List[WebhookDelivery]:
+        """Get deliveries, newest first, optionally by status."""
+        statement = select(WebhookDelivery)
+        if status is not None:
+            statement = statement.where(WebhookDelivery.status == status)
+        if before_id is not None:
+            statement = statement.where(WebhookDelivery.id < before_id)
+        return db.exec(statement.order_by(WebhookDelivery.id.desc()).limit(limit)).all()
+
+    def retry(self, db: Session, delivery_id: int) -> WebhookDelivery:
+        """Requeue a dead-lettered delivery."""
+        delivery = db.get(WebhookDelivery, delivery_id)
+        if not delivery:
+            raise NotFoundError("WebhookDelivery", delivery_id)
+        if delivery.status != DeliveryStatusEnum.dead:
+            raise ConflictError("Only dead-lettered deliveries can be retried")
+
+        delivery.status = DeliveryStatusEnum.pending
+        delivery.attempts = 0
+        delivery.next_attempt_at = datetime.now(timezone.utc)
+        db.add(delivery)
+        on_commit(db, self._notify)
+        db.commit()
+        db.refresh(delivery)
+        return delivery
+
+    def get_stats(self, db: Session) -> dict:
+        """Count deliveries by status and events awaiting fan-out."""
+        counts = dict(db.exec(
+            select(WebhookDelivery.status, func.count()).group_by(WebhookDelivery.status)
+        ).all())
+        return {
+            "outbox_pending": db.exec(
+                select(func.count()).select_from(OutboxEvent).where(OutboxEvent.fanned_out_at.is_(None))
+            ).one(),
+            **{status.value: counts.get(status, 0) for status in DeliveryStatusEnum},
+        }
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before the next attempt: capped exponential backoff with jitter."""
+    delay = min(
+        settings.webhook_backoff_max_seconds,
+        settings.webhook_backoff_base_seconds * 2 ** (attempts - 1),
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def sign(secret: str, body: bytes) -> str:
+    """HMAC-SHA256 signature of a request body."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class WebhookDispatcher:
+    """Delivers outbox events from a background task on the event loop.
+
+    Database work runs in worker threads; HTTP requests share one pooled
+    ``httpx.AsyncClient``. Deliveries for the same endpoint are sent in
+    batches, with at most ``webhook_max_concurrency_per_endpoint`` requests
+    in flight per endpoint so one slow receiver cannot hold up the others.
+    One dispatcher runs per database; ``tenant`` selects a tenant's.
+    """
+
+    def __init__(self, service: WebhookService, engine=None, tenant: Optional[str] = None):
+        self.service = service
+        self.engine = engine
+        self.tenant = tenant
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._in_flight: set[asyncio.Task] = set()
+        self.delivered = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the dispatcher task is running."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, client: Optional["httpx.AsyncClient"] = None) -> None:
+        """Start dispatching on the running event loop."""
+        # Imported here: httpx is only needed once a dispatcher runs
+        import httpx
+
+        self._client = client or httpx.AsyncClient(
+            timeout=settings.webhook_timeout_seconds,
+            limits=httpx.Limits(max_connections=settings.webhook_max_connections),
+        )
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._semaphores = {}
+        self.service.listeners.append(self.notify)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Webhook dispatcher started{f' for tenant {self.tenant}' if self.tenant else ''}")
+
+    async def stop(self, timeout: float = 0.0) -> None:
+        """Stop dispatching; unsent deliveries are retried after their lease.
+
+        Batches already being sent get up to ``timeout`` seconds to finish.
+        """
+        if self.notify in self.service.listeners:
+            self.service.listeners.remove(self.notify)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._in_flight and timeout > 0:
+            await asyncio.wait(self._in_flight, timeout=timeout)
+        tasks = list(self._in_flight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._in_flight.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        logger.info("Webhook dispatcher stopped")
+
+    def notify(self) -> None:
+        """Wake the dispatcher; safe to call from any thread."""
+        if self._loop is None or self._wake is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    def _in_session(self, method: Callable, *args):
+        from app.db.db import get_engine
+
+        # Resolve the tenant's engine each time: idle engines may be replaced
+        with Session(self.engine or get_engine(self.tenant)) as session:
+            return method(session, *args)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook dispatch failed: {e}")
+                claimed = 0
+
+            if claimed < settings.webhook_claim_limit:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.webhook_poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def dispatch_once(self) -> int:
+        """Fan out new events and start sending due deliveries.
+
+        Returns the number of deliveries claimed.
+        """
+        # Bound the deliveries held in memory
+        while len(self._in_flight) >= settings.webhook_claim_limit // settings.webhook_batch_size:
+            await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+        await asyncio.to_thread(self._in_session, self.service.fan_out)
+        claimed = await asyncio.to_thread(self._in_session, self.service.claim_due)
+
+        by_endpoint: Dict[int, List[dict]] = defaultdict(list)
+        for delivery in claimed:
+            by_endpoint[delivery["endpoint"]["id"]].append(delivery)
+        for deliveries in by_endpoint.values():
+            for start in range(0, len(deliveries), settings.webhook_batch_size):
+                task = asyncio.create_task(self._send(deliveries[start:start + settings.webhook_batch_size]))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+        return len(claimed)
+
+    async def drain(self) -> None:
+        """Wait for deliveries currently being sent."""
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def _send(self, deliveries: List[dict]) -> None:
+        """POST one batch of events to an endpoint and record the outcome."""
+        endpoint = deliveries[0]["endpoint"]
+        semaphore = self._semaphores.setdefault(
+            endpoint["id"], asyncio.Semaphore(settings.webhook_max_concurrency_per_endpoint)
+        )
+        body = json.dumps({"events": [delivery["event"] for delivery in deliveries]}).encode()
+        headers = {"Content-Type": "application/json"}
+        if endpoint["secret"]:
+            headers["X-Webhook-Signature"] = sign(endpoint["secret"], body)
+
+        import httpx
+
+        error = None
+        async with semaphore:
+            try:
+                response = await self._client.post(endpoint["url"], content=body, headers=headers)
+                if response.status_code >= 300:
+                    error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+
+        ids = [delivery["delivery_id"] for delivery in deliveries]
+        token = deliveries[0]["claim_token"]
+        if error is None:
+            await asyncio.to_thread(self._in_session, self.service.record_delivered, ids, token)
+            self.delivered += len(ids)
+        else:
+            dead = await asyncio.to_thread(self._in_session, self.service.record_failed, ids, token, error)
+            self.failed += len(ids)
+            logger.warning(f"Webhook delivery to {endpoint['url']} failed ({error}); {dead} dead-lettered")
+
+    def get_stats(self) -> dict:
+        """Dispatcher counters since start."""
+        return {
+            "running": self.running,
+            "batches_in_flight": len(self._in_flight),
+            "delivered": self.delivered,
+            "failed_attempts": self.failed,
+        }
+
+
+# Service instances
+webhook_service = WebhookService()
+webhook_dispatcher = WebhookDispatcher(webhook_service)
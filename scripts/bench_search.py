@@ -0,0 +1,93 @@
+"""Benchmark customer search latency: FTS5 index vs. LIKE '%x%' scan.
+
+Usage: python scripts/bench_search.py [--customers 100000] [--queries 200]
+
+Builds a throwaway SQLite database, so it never touches data.db.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label: str, samples: list[float]) -> None:
+    """Print latency statistics in milliseconds."""
+    print(
+        f"{label:<12} p50={percentile(samples, 50):8.3f}ms  "
+        f"p95={percentile(samples, 95):8.3f}ms  p99={percentile(samples, 99):8.3f}ms  "
+        f"mean={statistics.mean(samples):8.3f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_search_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlmodel import Session, select, or_, insert
+
+    from app.db.db import engine, create_db_and_tables
+    from app.models import Customer
+    from app.services.customer import customer_service
+
+    create_db_and_tables()
+    rng = random.Random(42)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(5_000)]
+
+    started = time.perf_counter()
+    with Session(engine) as session:
+        rows = [
+            {
+                "name": f"{rng.choice(words).title()} {rng.choice(words).title()}",
+                "email": f"user{i}@{rng.choice(words)}.com",
+                "age": rng.randint(18, 90),
+                "description": " ".join(rng.choices(words, k=6)),
+            }
+            for i in range(args.customers)
+        ]
+        session.exec(insert(Customer), params=rows)
+        session.commit()
+    print(f"Loaded {args.customers} customers in {time.perf_counter() - started:.1f}s")
+
+    terms = [rng.choice(words)[1:5] for _ in range(args.queries)]
+    fts, like = [], []
+    with Session(engine) as session:
+        for term in terms:
+            started = time.perf_counter()
+            customer_service.search(session, term, limit=20)
+            fts.append((time.perf_counter() - started) * 1000)
+
+            pattern = f"%{term}%"
+            started = time.perf_counter()
+            session.exec(
+                select(Customer).where(or_(
+                    Customer.name.ilike(pattern),
+                    Customer.email.ilike(pattern),
+                    Customer.description.ilike(pattern),
+                )).limit(20)
+            ).all()
+            like.append((time.perf_counter() - started) * 1000)
+
+    report("fts5", fts)
+    report("like scan", like)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark cold start: time per startup phase, default vs. production settings.
+
+Usage: python scripts/bench_startup.py [--runs 5]
+
+Each run starts a fresh interpreter that imports the app, runs its
+startup and fetches /openapi.json, against a throwaway SQLite database,
+so it never touches data.db. The "production" profile skips table
+creation and demo data and loads a pre-generated OpenAPI schema.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints the startup report as JSON
+CHILD = """
+import json, time
+started = time.perf_counter()
+from app.main import app
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready_ms = (time.perf_counter() - started) * 1000
+    openapi_started = time.perf_counter()
+    client.get("/openapi.json").raise_for_status()
+    openapi_ms = (time.perf_counter() - openapi_started) * 1000
+print(json.dumps({**app.state.startup.to_dict(), "ready_ms": ready_ms, "first_openapi_ms": openapi_ms}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    """Start the app in a fresh interpreter and return its startup report."""
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label: str, runs: list[dict]) -> None:
+    """Print the median time of each phase in milliseconds."""
+    print(f"\n{label} (median of {len(runs)} runs)")
+    for name in [phase["name"] for phase in runs[0]["phases"]]:
+        samples = [phase["ms"] for run in runs for phase in run["phases"] if phase["name"] == name]
+        if any(sample is None for sample in samples):
+            print(f"  {name:<28} skipped")
+        else:
+            print(f"  {name:<28} {statistics.median(samples):9.1f} ms")
+    for key in ("ready_ms", "first_openapi_ms"):
+        print(f"  {key:<28} {statistics.median(run[key] for run in runs):9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "LOG_FILE": "",
+        "LOG_LEVEL": "WARNING",
+        "WEBHOOKS_ENABLED": "false",
+    }
+    default = [run_once(env) for _ in range(args.runs)]
+
+    openapi_path = os.path.join(workdir, "openapi.json")
+    subprocess.run(
+        [sys.executable, "-m", "app.cli", "openapi-export", openapi_path],
+        cwd=ROOT, env=env, capture_output=True, check=True,
+    )
+    production_env = {
+        **env,
+        "STARTUP_CREATE_TABLES": "false",
+        "STARTUP_SEED_DEMO_DATA": "false",
+        "OPENAPI_CACHE_PATH": openapi_path,
+    }
+    production = [run_once(production_env) for _ in range(args.runs)]
+
+    report("default", default)
+    report("production", production)
+
+
+if __name__ == "__main__":
+    main()
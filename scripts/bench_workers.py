@@ -0,0 +1,133 @@
+"""Benchmark read throughput of the multi-worker server at 1, 2, 4 and N workers.
+
+Usage: python scripts/bench_workers.py [--workers 1,2,4,8] [--seconds 10] [--clients 8]
+
+Each configuration starts ``python -m app.server`` on a throwaway SQLite
+database, so it never touches data.db, and waits for /health. Client
+processes then fetch plans and customer entitlements over keep-alive
+connections for the given time; most requests are served from the
+shared cache. N defaults to the number of CPUs available to this process.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = [f"/api/v1/plans/{plan_id}" for plan_id in (1, 2, 3)] + \
+        [f"/api/v1/entitlements/{customer_id}" for customer_id in (1, 2, 3, 4, 5)] + \
+        ["/api/v1/plans"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_healthy(base_url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+
+def client(base_url: str, seconds: float, results) -> None:
+    """Request the paths round-robin on one connection; report latencies."""
+    import httpx
+
+    latencies = []
+    errors = 0
+    with httpx.Client(base_url=base_url, auth=("admin", "secret")) as http:
+        deadline = time.monotonic() + seconds
+        position = os.getpid()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = http.get(PATHS[position % len(PATHS)])
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+            position += 1
+    results.put((latencies, errors))
+
+
+def measure(workers: int, clients: int, seconds: float, env: dict) -> dict:
+    """Start a server with ``workers`` workers and load it with ``clients`` clients."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_healthy(base_url)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client, args=(base_url, seconds, results)) for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        samples = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies = sorted(latency for sample, _ in samples for latency in sample)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in samples),
+        "rps": len(latencies) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main() -> None:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, cpus})),
+                        help="comma-separated worker counts")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=max(8, cpus * 2),
+                        help="client processes, one keep-alive connection each")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_workers_")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "LOG_FILE": "",
+        "LOG_LEVEL": "WARNING",
+        "WEBHOOKS_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+
+    print(f"{cpus} CPUs, {args.clients} clients, {args.seconds:.0f} s per run")
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for workers in (int(n) for n in args.workers.split(",")):
+        result = measure(workers, args.clients, args.seconds, env)
+        print(
+            f"{result['workers']:>8} {result['rps']:>10.0f} {result['p50_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
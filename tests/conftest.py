@@ -0,0 +1,49 @@
+"""Shared fixtures: an app on a fresh SQLite database per test."""
+
+import os
+import tempfile
+
+# Before anything imports app.main, whose module-level app builds engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/default.db"
+os.environ["LOG_FILE"] = ""
+os.environ["LOG_LEVEL"] = "WARNING"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import Settings, get_settings
+from app.db import db as database
+from app.main import create_app
+
+AUTH = ("admin", "secret")
+
+
+@pytest.fixture
+def settings(tmp_path) -> Settings:
+    """Settings for a database in ``tmp_path``, without background work."""
+    return get_settings().model_copy(update={
+        "database_url": f"sqlite:///{tmp_path / 'test.db'}",
+        "basic_auth_username": AUTH[0],
+        "basic_auth_password": AUTH[1],
+        "webhooks_enabled": False,
+        "scheduler_enabled": False,
+        "migration_backfill_in_background": False,
+        "rate_limit_enabled": False,
+        "db_pool_warmup_connections": 0,
+    })
+
+
+@pytest.fixture
+def client(settings):
+    """A started app; the demo data is seeded."""
+    with TestClient(create_app(settings)) as client:
+        client.auth = AUTH
+        yield client
+
+
+@pytest.fixture
+def session(client):
+    """A session on the database of ``client``."""
+    with Session(database.engine) as session:
+        yield session
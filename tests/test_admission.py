@@ -0,0 +1,111 @@
+"""Admission control."""
+
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionControlMiddleware, Overloaded, RequestClass
+
+
+def request_class(**options) -> RequestClass:
+    return RequestClass("read", **{"concurrency": 1, "queue_size": 1, "queue_timeout": 0.2, "latency_slo_ms": 100.0, **options})
+
+
+def test_full_queue_is_rejected_and_slots_pass_to_waiters():
+    async def run():
+        requests = request_class()
+        await requests.acquire()
+        waiting = asyncio.ensure_future(requests.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="queue_full"):
+            await requests.acquire()
+
+        requests.release()
+        await waiting
+        assert requests.active == 1
+        requests.release()
+        return requests.get_stats()
+
+    stats = asyncio.run(run())
+    assert (stats["active"], stats["admitted"], stats["queued"]) == (0, 2, 1)
+    assert stats["rejected"]["queue_full"] == 1
+
+
+def test_waiting_past_the_deadline_is_rejected():
+    async def run():
+        requests = request_class(queue_timeout=0.01)
+        await requests.acquire()
+        with pytest.raises(Overloaded, match="queue_timeout"):
+            await requests.acquire()
+        requests.release()
+        assert requests.active == 0
+
+    asyncio.run(run())
+
+
+def test_latency_above_slo_sheds_instead_of_queueing():
+    async def run():
+        requests = request_class()
+        requests.observe(5_000)
+        assert requests.slo_breached
+        # A free slot is still used
+        await requests.acquire()
+        with pytest.raises(Overloaded, match="latency_slo"):
+            await requests.acquire()
+
+    asyncio.run(run())
+
+
+def test_middleware_answers_503_and_skips_exempt_paths():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AdmissionControlMiddleware(
+        app, read_concurrency=0, read_queue=0, write_concurrency=1, write_queue=0,
+        queue_timeout=0.1, latency_slo_ms=100.0, retry_after=3, exempt_paths=["/health"],
+    )
+
+    async def request(method: str, path: str) -> dict:
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": method, "path": path}, None, send)
+        return sent[0]
+
+    assert asyncio.run(request("GET", "/health"))["status"] == 200
+    rejected = asyncio.run(request("GET", "/api/v1/plans"))
+    assert rejected["status"] == 503
+    assert (b"retry-after", b"3") in rejected["headers"]
+    assert asyncio.run(request("POST", "/api/v1/plans"))["status"] == 200
+    assert calls == ["/health", "/api/v1/plans"]
+
+
+def test_change_stream_is_exempt_under_the_configured_prefix(settings):
+    from app.main import create_app
+
+    app = create_app(settings.model_copy(update={"api_v1_prefix": "/api/v2"}))
+    middleware = app.build_middleware_stack()
+    while not isinstance(middleware, AdmissionControlMiddleware):
+        middleware = middleware.app
+    assert "/api/v2/changes/stream" in middleware.exempt_paths
+
+
+def test_rate_limit_is_per_principal(monkeypatch):
+    from app.core import rate_limit
+
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    limiter = rate_limit.TokenBucketLimiter(rate=2.0, burst=2)
+
+    assert [limiter.acquire("alice") for _ in range(2)] == [0.0, 0.0]
+    assert limiter.acquire("alice") == pytest.approx(0.5)
+    assert limiter.acquire("bob") == 0.0
+    now[0] += 0.5
+    assert limiter.acquire("alice") == 0.0
+    assert limiter.retry_after(0.2) == 1
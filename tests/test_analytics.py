@@ -0,0 +1,63 @@
+"""Analytics rollups."""
+
+from sqlalchemy.dialects import postgresql
+from sqlmodel import func, select
+
+from app.models import Transaction
+from app.services.analytics import analytics_service
+
+
+def summary(client) -> dict:
+    response = client.get("/api/v1/analytics/summary")
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def raw_totals(session) -> tuple:
+    return session.exec(select(func.coalesce(func.sum(Transaction.amount), 0), func.count()).select_from(Transaction)).one()
+
+
+def test_rollups_are_stale_until_refresh(client, session):
+    before = summary(client)
+    assert (before["total_revenue"], before["transaction_count"]) == raw_totals(session)
+
+    response = client.post("/api/v1/transactions", json={"customer_id": 1, "amount": 700, "description": "New payment"})
+    assert response.status_code == 201, response.text
+    assert summary(client)["total_revenue"] == before["total_revenue"]
+
+    assert client.post("/api/v1/analytics/refresh").status_code == 200
+    after = summary(client)
+    assert (after["total_revenue"], after["transaction_count"]) == raw_totals(session)
+    assert after["as_of_transaction_id"] == response.json()["data"]["id"]
+
+
+def test_changes_to_folded_transactions_apply_as_deltas(client, session):
+    transaction = client.post(
+        "/api/v1/transactions", json={"customer_id": 2, "amount": 500, "description": "Folded payment"}
+    ).json()["data"]
+    client.post("/api/v1/analytics/refresh")
+
+    response = client.patch(f"/api/v1/transactions/{transaction['id']}", json={"amount": 900, "description": "Corrected"})
+    assert response.status_code == 200, response.text
+    assert summary(client)["total_revenue"] == raw_totals(session)[0]
+
+    assert client.delete(f"/api/v1/transactions/{transaction['id']}").status_code == 200
+    current = summary(client)
+    assert (current["total_revenue"], current["transaction_count"]) == raw_totals(session)
+
+
+class Result:
+    def one(self):
+        return 0
+
+
+def test_inserts_and_refresh_lock_the_checkpoint_on_postgres(session, monkeypatch):
+    statements = []
+    monkeypatch.setattr(type(session.get_bind().dialect), "name", "postgresql")
+    monkeypatch.setattr(session, "exec", lambda statement: statements.append(statement) or Result())
+    analytics_service.before_insert(session)
+    analytics_service.wait_for_inserts(session)
+
+    locks = [str(statement.compile(dialect=postgresql.dialect())) for statement in statements[1::2]]
+    assert locks[0].endswith("FOR SHARE")
+    assert locks[1].endswith("FOR UPDATE")
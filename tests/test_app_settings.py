@@ -0,0 +1,50 @@
+"""Settings passed to ``create_app`` reach every component."""
+
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from app.core.readiness import readiness_probe
+from app.db.migrations import migration_runner
+from app.main import create_app
+from app.services.idempotency import idempotency_service
+from app.services.maintenance import maintenance_scheduler
+from app.services.single_flight import single_flight
+
+
+def tables(path) -> set:
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_create_app_applies_its_settings(settings, tmp_path):
+    settings = settings.model_copy(update={
+        "basic_auth_username": "ops",
+        "basic_auth_password": "hunter2",
+        "rate_limit_enabled": True,
+        "rate_limit_per_second": 0.001,
+        "rate_limit_burst": 2,
+        "ready_max_loop_lag_ms": 123.0,
+        "idempotency_ttl_hours": 7,
+        "single_flight_endpoints": ["get_plan"],
+        "migration_backfill_batch_size": 42,
+        "scheduler_interval_seconds": {"analyze": 0},
+        "archive_database_path": str(tmp_path / "archive.db"),
+    })
+    with TestClient(create_app(settings)) as client:
+        assert client.get("/", auth=("admin", "secret")).status_code == 401
+        assert [client.get("/", auth=("ops", "hunter2")).status_code for _ in range(3)] == [200, 200, 429]
+
+        assert readiness_probe.max_loop_lag_ms == 123.0
+        assert idempotency_service.ttl_hours == 7
+        assert single_flight.endpoints == {"get_plan"}
+        assert migration_runner.batch_size == 42
+        analyze = next(job for job in maintenance_scheduler.jobs if job.name == "analyze")
+        assert maintenance_scheduler.interval(analyze) == 0
+
+    assert "transaction_archive" in tables(tmp_path / "archive.db")
+    assert "transaction_archive" not in tables(tmp_path / "test.db")
+
+
+def test_archive_stays_in_the_main_database_without_an_archive_file(client, tmp_path):
+    assert "transaction_archive" in tables(tmp_path / "test.db")
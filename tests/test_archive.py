@@ -0,0 +1,57 @@
+"""Transaction archival."""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import func, select
+
+from app.models import CustomerInvoice, Transaction, TransactionArchive
+from app.services.archive import archive_service
+from app.services.invoice import invoice_service
+
+
+def add_old_transactions(session, customer_id: int, amounts: list) -> list:
+    created_at = datetime.now(timezone.utc) - timedelta(days=400)
+    transactions = [Transaction(customer_id=customer_id, amount=amount, description="Old", created_at=created_at) for amount in amounts]
+    session.add_all(transactions)
+    session.commit()
+    return [transaction.id for transaction in transactions]
+
+
+def archived(session) -> int:
+    return session.exec(select(func.count()).select_from(TransactionArchive)).one()
+
+
+def test_only_invoiced_transactions_are_archived(client, session):
+    ids = add_old_transactions(session, 2, [100, 200, 300])
+    # The newest transaction always stays hot
+    client.post("/api/v1/transactions", json={"customer_id": 1, "amount": 5, "description": "Newest"})
+
+    assert archive_service.archive(session, horizon_days=30) == 0
+
+    invoice_service.generate(session)
+    (invoice,) = session.exec(select(CustomerInvoice).where(CustomerInvoice.customer_id == 2)).all()
+    assert invoice.total == session.exec(select(func.sum(Transaction.amount)).where(Transaction.customer_id == 2)).one()
+
+    assert archive_service.archive(session, horizon_days=30) == len(ids)
+    assert archived(session) == len(ids)
+    response = client.get(f"/api/v1/transactions/{ids[0]}")
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["amount"] == 100
+    assert client.patch(f"/api/v1/transactions/{ids[0]}", json={"amount": 1, "description": "Late fix"}).status_code == 409
+
+    # Archived rows stay in range queries and are not invoiced again
+    listed = client.get("/api/v1/transactions", params={"to": (datetime.now(timezone.utc) - timedelta(days=30)).isoformat(), "limit": 1000})
+    assert {item["id"] for item in listed.json()["data"]["items"]} >= set(ids)
+    client.post("/api/v1/transactions", json={"customer_id": 3, "amount": 5, "description": "After archive"})
+    assert invoice_service.generate(session).invoices_created == 1
+
+
+def test_archive_waits_for_the_analytics_refresh_and_invoices_together(client, session):
+    ids = add_old_transactions(session, 2, [100, 200])
+    client.post("/api/v1/transactions", json={"customer_id": 1, "amount": 5, "description": "Newest"})
+    invoice_service.generate(session)
+    before = client.get("/api/v1/analytics/summary").json()["data"]["total_revenue"]
+
+    # Archiving refreshes the rollups first, so moved rows are still counted
+    assert archive_service.archive(session, horizon_days=30) == len(ids)
+    assert client.get("/api/v1/analytics/summary").json()["data"]["total_revenue"] == before + 300 + 5
@@ -0,0 +1,39 @@
+"""Batch endpoint."""
+
+
+def count_customers(client) -> int:
+    response = client.get("/api/v1/customers", params={"limit": 1})
+    assert response.status_code == 200
+    return response.json()["data"]["total"]
+
+
+def test_batch_applies_all_operations(client):
+    response = client.post("/api/v1/batch", json={"operations": [
+        {"op": "customer.create", "ref": "customer",
+         "args": {"name": "Batch Customer", "age": 30, "email": "batch@example.com"}},
+        {"op": "transaction.create",
+         "args": {"customer_id": "$customer", "amount": 100, "description": "First payment"}},
+    ]})
+
+    assert response.status_code == 200, response.text
+    customer, transaction = (result["data"] for result in response.json()["data"])
+    assert transaction["customer_id"] == customer["id"]
+
+
+def test_failing_operation_rolls_back_batch(client):
+    customers = count_customers(client)
+    changes = client.get("/api/v1/changes").json()["data"]
+
+    response = client.post("/api/v1/batch", json={"operations": [
+        {"op": "customer.create", "ref": "customer",
+         "args": {"name": "Rolled Back", "age": 30, "email": "rolled-back@example.com"}},
+        {"op": "plan.create", "args": {"name": "Rolled Back Plan", "price": 10, "description": "Never saved"}},
+        {"op": "customer.add_plan", "args": {"customer_id": "$customer", "plan_id": 999999}},
+    ]})
+
+    assert response.status_code == 404, response.text
+    assert count_customers(client) == customers
+    plans = client.get("/api/v1/plans", params={"limit": 100}).json()["data"]["items"]
+    assert "Rolled Back Plan" not in {plan["name"] for plan in plans}
+    after = client.get("/api/v1/changes", params={"since": changes["next_since"]}).json()["data"]
+    assert after["changes"] == []
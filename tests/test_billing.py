@@ -0,0 +1,40 @@
+"""Billing runs."""
+
+from sqlmodel import func, select
+
+from app.models import CustomerPlan, OutboxEvent, Plan, StatusEnum, Transaction
+
+
+def billable(session) -> int:
+    return session.exec(
+        select(func.count()).select_from(CustomerPlan).join(Plan, Plan.id == CustomerPlan.plan_id)
+        .where(CustomerPlan.status == StatusEnum.active, Plan.price.is_not(None))
+    ).one()
+
+
+def count(session, *conditions) -> int:
+    return session.exec(select(func.count()).where(*conditions)).one()
+
+
+def test_billing_run_bills_each_membership_once(client, session):
+    expected = billable(session)
+    assert expected
+    transactions = count(session, Transaction.id.is_not(None))
+    events = count(session, OutboxEvent.event_type == "transaction.created")
+
+    # The run executes in threads after the response is sent
+    response = client.post("/api/v1/billing/runs", json={"period": "2024-05", "workers": 2, "chunk_size": 2})
+    assert response.status_code == 202, response.text
+    run_id = response.json()["data"]["id"]
+
+    report = client.get(f"/api/v1/billing/runs/{run_id}").json()["data"]
+    assert report["status"] == "completed"
+    assert report["transactions_created"] == expected
+    assert report["chunks_completed"] == report["chunks_total"] > 1
+    assert count(session, Transaction.id.is_not(None)) == transactions + expected
+    assert count(session, OutboxEvent.event_type == "transaction.created") == events + expected
+
+    # The period is billed once
+    response = client.post("/api/v1/billing/runs", json={"period": "2024-05"})
+    assert response.json()["data"]["id"] == run_id
+    assert count(session, Transaction.id.is_not(None)) == transactions + expected
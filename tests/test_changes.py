@@ -0,0 +1,42 @@
+"""Change feed after compaction."""
+
+from datetime import timedelta
+
+from app.db.utils import get_checkpoint
+from app.services.changes import PURGED_CHECKPOINT, change_service
+
+
+def customer(name: str, email: str) -> dict:
+    return {"name": name, "age": 40, "email": email}
+
+
+def test_since_after_compaction(client, session):
+    start = client.get("/api/v1/changes").json()["data"]
+    while start["has_more"]:
+        start = client.get("/api/v1/changes", params={"since": start["next_since"]}).json()["data"]
+
+    kept = client.post("/api/v1/customers", json=customer("Kept", "kept@example.com")).json()["data"]
+    removed = client.post("/api/v1/customers", json=customer("Removed", "removed@example.com")).json()["data"]
+    assert client.delete(f"/api/v1/customers/{removed['id']}").status_code == 200
+    for name in ("Kept Once", "Kept Twice"):
+        response = client.patch(f"/api/v1/customers/{kept['id']}", json=customer(name, "kept@example.com"))
+        assert response.status_code == 200, response.text
+
+    result = change_service.compact(session, tombstone_retention=timedelta(0))
+    assert result["tombstones_removed"] >= 1
+
+    # Replaying from before the removed tombstone would miss the deletion
+    response = client.get("/api/v1/changes", params={"since": start["next_since"]})
+    assert response.status_code == 410
+    assert response.json()["error_code"] == "CHANGES_COMPACTED"
+    response = client.get("/api/v1/changes", params={"since": 0})
+    assert response.status_code == 410
+
+    # From the purge point on, only the latest state of each entity is left
+    purged_through = get_checkpoint(session, PURGED_CHECKPOINT)
+    assert purged_through > start["next_since"]
+    response = client.get("/api/v1/changes", params={"since": purged_through, "entity": ["customer"]})
+    assert response.status_code == 200, response.text
+    changes = response.json()["data"]["changes"]
+    assert [(change["entity_id"], change["op"]) for change in changes] == [(str(kept["id"]), "update")]
+    assert changes[0]["data"]["name"] == "Kept Twice"
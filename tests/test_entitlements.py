@@ -0,0 +1,62 @@
+"""Entitlement checks from the in-memory index."""
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db import db as database
+from app.db.shared_cache import shared_cache
+from app.main import create_app
+from app.services.entitlements import entitlement_service
+from tests.conftest import AUTH
+
+
+def started(settings, **update):
+    client = TestClient(create_app(settings.model_copy(update=update)))
+    client.auth = AUTH
+    return client
+
+
+def plan_ids(client, customer_id: int) -> list:
+    return client.get(f"/api/v1/entitlements/{customer_id}").json()["data"]["plan_ids"]
+
+
+def test_checks_are_answered_without_queries(settings, monkeypatch):
+    # With the shared cache on, a miss must not fall back to the database either
+    monkeypatch.setattr(shared_cache, "_buffer", None)
+    shared_cache.allocate()
+    statements = []
+    with started(settings, entitlement_sync_interval_seconds=0) as client:
+        assert client.post("/api/v1/customers/1/plans/3").status_code == 200
+
+        event.listen(database.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert plan_ids(client, 1) == [2, 3]
+        response = client.post("/api/v1/entitlements:check", json={"checks": [
+            {"customer_id": 1, "plan_id": 3}, {"customer_id": 2, "plan_id": 3}, {"customer_id": 2, "plan_id": 1},
+        ]})
+        assert [check["entitled"] for check in response.json()["data"]] == [True, True, False]
+
+    assert statements == []
+
+
+def test_other_processes_changes_arrive_through_the_background_sync(settings, monkeypatch):
+    # Hold the sync back until the stale answer has been checked
+    release = threading.Event()
+    sync_all = entitlement_service.sync_all
+    monkeypatch.setattr(entitlement_service, "sync_all", lambda: release.wait(5) and sync_all())
+    with started(settings, entitlement_sync_interval_seconds=0.05) as client:
+        # As if another worker made the change: only the change feed records it
+        monkeypatch.setattr(entitlement_service, "after_commit", lambda *args: None)
+        assert client.post("/api/v1/customers/3/plans/3").status_code == 200
+        assert plan_ids(client, 3) == [1]
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while plan_ids(client, 3) != [1, 3] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert plan_ids(client, 3) == [1, 3]
+        assert entitlement_service.running
+
+    assert not entitlement_service.running
@@ -0,0 +1,70 @@
+"""The fast body path accepts only what the models accept, unchanged."""
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.api import fast_body
+from app.models import CustomerCreate, TransactionCreate
+
+CUSTOMERS = [
+    {"name": "Plain Customer", "age": 30, "email": "plain@example.com"},
+    {"name": "Plain Customer", "age": 30, "email": "plain@example.com", "description": "Note"},
+    {"name": "Plain Customer", "age": "30", "email": "plain@example.com"},
+    {"name": "Plain Customer", "age": 30.0, "email": "plain@example.com"},
+    {"name": "Plain Customer", "age": True, "email": "plain@example.com"},
+    {"name": "Plain Customer", "age": 150, "email": "plain@example.com"},
+    {"name": "No", "age": 30, "email": "plain@example.com"},
+    {"name": "Plain Customer", "age": 30, "email": "Plain@EXAMPLE.com"},
+    {"name": "Plain Customer", "age": 30, "email": "plain@example.test"},
+    {"name": "Plain Customer", "age": 30, "email": "not-an-email"},
+    {"name": "Plain Customer", "age": 30},
+    {"name": "Plain Customer", "age": 30, "email": "plain@example.com", "unknown": 1},
+    ["not", "an", "object"],
+]
+
+TRANSACTIONS = [
+    {"amount": 999, "description": "Monthly", "customer_id": 1},
+    {"amount": 999, "description": "Monthly", "customer_id": 1, "plan_id": None},
+    {"amount": 999, "description": "Monthly", "customer_id": 1, "plan_id": 2},
+    {"amount": "999", "description": "Monthly", "customer_id": 1},
+    {"amount": 999, "description": "x" * 256, "customer_id": 1},
+    {"amount": 999, "description": "Monthly"},
+]
+
+
+def outcome(decode, data):
+    try:
+        return decode(data).model_dump()
+    except ValidationError as e:
+        return [(error["loc"], error["type"]) for error in e.errors()]
+
+
+@pytest.mark.parametrize("model, data", [
+    *((CustomerCreate, data) for data in CUSTOMERS),
+    *((TransactionCreate, data) for data in TRANSACTIONS),
+])
+def test_fast_path_matches_full_validation(model, data):
+    assert outcome(lambda value: fast_body.validate(model, value), data) == outcome(model.model_validate, data)
+
+
+def test_plain_bodies_take_the_fast_path():
+    assert fast_body.get_schema(CustomerCreate).decode(CUSTOMERS[0]) is not None
+    assert fast_body.get_schema(TransactionCreate).decode(TRANSACTIONS[2]) is not None
+    # Anything it cannot prove valid is left to the model
+    assert fast_body.get_schema(CustomerCreate).decode(CUSTOMERS[7]) is None
+
+
+@pytest.mark.parametrize("body", [b'{"a": 1}', b'{"big": 123456789012345678901234567890}', b'[NaN, 1.5]', b'"\\ud800"'])
+def test_loads_matches_the_stdlib(body):
+    assert repr(fast_body.loads(body)) == repr(json.loads(body))
+
+
+def test_write_endpoints_keep_their_errors(client):
+    response = client.post("/api/v1/customers", json={"name": "Plain Customer", "age": 30, "email": "not-an-email"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "email"]
+
+    response = client.post("/api/v1/customers", json={"name": "Plain Customer", "age": 30, "email": "plain@example.com"})
+    assert response.status_code == 201, response.text
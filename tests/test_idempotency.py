@@ -0,0 +1,75 @@
+"""Idempotency-Key replay of write requests."""
+
+import uuid
+
+
+def test_retry_replays_stored_response(client):
+    key = str(uuid.uuid4())
+    body = {"customer_id": 1, "amount": 250, "description": "Retried payment"}
+    transactions = client.get("/api/v1/transactions", params={"limit": 1}).json()["data"]["total"]
+
+    first = client.post("/api/v1/transactions", json=body, headers={"Idempotency-Key": key})
+    retry = client.post("/api/v1/transactions", json=body, headers={"Idempotency-Key": key})
+
+    assert first.status_code == 201, first.text
+    assert "idempotent-replayed" not in first.headers
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert client.get("/api/v1/transactions", params={"limit": 1}).json()["data"]["total"] == transactions + 1
+
+
+def test_key_reused_with_different_body_is_rejected(client):
+    key = str(uuid.uuid4())
+    body = {"customer_id": 1, "amount": 250, "description": "Original payment"}
+
+    assert client.post("/api/v1/transactions", json=body, headers={"Idempotency-Key": key}).status_code == 201
+    response = client.post(
+        "/api/v1/transactions", json={**body, "amount": 999}, headers={"Idempotency-Key": key}
+    )
+
+    assert response.status_code == 422
+    assert response.json()["error_code"] == "IDEMPOTENCY_KEY_REUSED"
+
+
+def test_slow_request_keeps_its_claim(session, monkeypatch):
+    import asyncio
+
+    from app.api.idempotency import IdempotencyMiddleware
+    from app.services.idempotency import idempotency_service
+
+    monkeypatch.setattr(idempotency_service, "claim_lease_seconds", 0.3)
+    executions = []
+
+    async def slow_app(scope, receive, send):
+        executions.append(scope["path"])
+        await asyncio.sleep(1.0)
+        await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"id": 1}'})
+
+    async def request(middleware: IdempotencyMiddleware) -> tuple:
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"{}", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/api/v1/slow", "headers": [(b"idempotency-key", key.encode())]}
+        await middleware(scope, receive, send)
+        return sent[0]["status"], dict(sent[0]["headers"]).get(b"idempotent-replayed"), sent[1]["body"]
+
+    async def first_and_retry() -> list:
+        # Separate middleware instances stand in for two server processes
+        first = asyncio.ensure_future(request(IdempotencyMiddleware(slow_app)))
+        await asyncio.sleep(0.6)
+        retry = await request(IdempotencyMiddleware(slow_app))
+        return [await first, retry]
+
+    key = str(uuid.uuid4())
+    first, retry = asyncio.run(first_and_retry())
+
+    assert executions == ["/api/v1/slow"]
+    assert first == (201, None, b'{"id": 1}')
+    assert retry == (201, b"true", b'{"id": 1}')
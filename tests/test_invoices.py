@@ -0,0 +1,39 @@
+"""Invoice generation."""
+
+from sqlmodel import func, select
+
+from app.models import Transaction
+
+
+def generate(client, workers: int = 1) -> dict:
+    response = client.post("/api/v1/invoices/generate", params={"workers": workers})
+    assert response.status_code == 202, response.text
+    run = client.get(f"/api/v1/invoices/runs/{response.json()['data']['id']}").json()["data"]
+    assert run["status"] == "completed"
+    return run
+
+
+def invoices(client, customer_id: int, **params) -> dict:
+    response = client.get(f"/api/v1/customers/{customer_id}/invoices", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_each_run_invoices_new_transactions_per_customer(client, session):
+    totals = dict(session.exec(select(Transaction.customer_id, func.sum(Transaction.amount)).group_by(Transaction.customer_id)).all())
+
+    first = generate(client, workers=2)
+    assert first["invoices_created"] == len(totals)
+    for customer_id, total in totals.items():
+        (invoice,) = invoices(client, customer_id)["items"]
+        assert invoice["total"] == total
+
+    client.post("/api/v1/transactions", json={"customer_id": 1, "amount": 900, "description": "Later payment"})
+    second = generate(client)
+    assert second["from_transaction_id"] == first["to_transaction_id"]
+    assert second["invoices_created"] == 1
+
+    page = invoices(client, 1, limit=1)
+    assert [invoice["total"] for invoice in page["items"]] == [900]
+    older = invoices(client, 1, limit=1, cursor=page["next_cursor"])
+    assert [invoice["total"] for invoice in older["items"]] == [totals[1]]
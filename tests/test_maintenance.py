@@ -0,0 +1,47 @@
+"""Maintenance jobs and the scheduler running them."""
+
+import time
+
+from sqlmodel import Session, select
+
+from app.db.db import build_engine, create_db_and_tables
+from app.db.shared_cache import shared_cache
+from app.db.tenancy import current_tenant
+from app.models import JobStatusEnum, Plan, ScheduledJob
+from app.services.maintenance import Job, MaintenanceScheduler, plans_cache_warmup
+
+
+def test_scheduler_runs_a_due_job_once_per_interval(client, session, monkeypatch):
+    monkeypatch.setattr(shared_cache, "_buffer", None)
+    shared_cache.allocate()
+    job = Job("plans_cache_warmup", plans_cache_warmup, 30.0)
+    scheduler = MaintenanceScheduler(jobs=[job], jitter_ratio=0)
+    scheduler.worker_id = "test-worker"
+
+    assert 29 <= scheduler.run_job(job) <= 30
+    assert 29 <= scheduler.run_job(job) <= 30
+
+    row = session.exec(select(ScheduledJob).where(ScheduledJob.name == job.name)).one()
+    assert (row.runs, row.last_status, row.last_result) == (1, JobStatusEnum.completed, "3 plans loaded")
+    assert (row.leader, row.lease_expires_at) == ("test-worker", None)
+    assert shared_cache.get("plans", 1)["name"] == "Basic Plan"
+
+
+def test_plans_cache_warmup_reads_the_database_it_runs_for(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "_buffer", None)
+    shared_cache.allocate()
+    other = build_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    create_db_and_tables(other)
+    with Session(other) as db:
+        db.add(Plan(name="Other Plan", price=100, description="Only in the other database"))
+        db.commit()
+
+    token = current_tenant.set("other")
+    try:
+        assert plans_cache_warmup(other, time.monotonic() + 10) == "1 plans loaded"
+        assert shared_cache.get("plans", 1)["name"] == "Other Plan"
+    finally:
+        current_tenant.reset(token)
+        other.dispose()
+    # Entries are kept per tenant
+    assert shared_cache.get("plans", 1) is None
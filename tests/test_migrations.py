@@ -0,0 +1,111 @@
+"""Upgrading a database created by the first release."""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+from sqlmodel import Session, func, select
+
+from app.db.db import build_engine, create_db_and_tables
+from app.db.migrations import MIGRATIONS, MigrationRunner
+from app.main import create_app
+from app.models import CustomerPlan, Plan, SchemaMigration, StatusEnum, Transaction
+from tests.conftest import AUTH
+
+# Schema of the first release, before any migration
+BASELINE_SCHEMA = [
+    """CREATE TABLE customer (
+        name VARCHAR(50) NOT NULL, description VARCHAR(255), age INTEGER NOT NULL, email VARCHAR NOT NULL,
+        id INTEGER NOT NULL, PRIMARY KEY (id), UNIQUE (email))""",
+    """CREATE TABLE "plan" (
+        name VARCHAR(50) NOT NULL, price INTEGER, description VARCHAR(255) NOT NULL,
+        id INTEGER NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE customerplan (
+        customer_id INTEGER NOT NULL, plan_id INTEGER NOT NULL, status VARCHAR(8) NOT NULL,
+        PRIMARY KEY (customer_id, plan_id),
+        FOREIGN KEY(customer_id) REFERENCES customer (id), FOREIGN KEY(plan_id) REFERENCES "plan" (id))""",
+    """CREATE TABLE "transaction" (
+        amount INTEGER NOT NULL, description VARCHAR(255) NOT NULL, id INTEGER NOT NULL, customer_id INTEGER NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(customer_id) REFERENCES customer (id))""",
+]
+
+CUSTOMERS = 10
+TRANSACTIONS = 120
+
+
+def create_baseline(engine) -> None:
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+        conn.execute(text('INSERT INTO "plan" (id, name, price, description) VALUES (1, \'Basic\', 10, \'Basic\'), '
+                          '(2, \'Premium\', 30, \'Premium\')'))
+        for id in range(1, CUSTOMERS + 1):
+            conn.execute(
+                text("INSERT INTO customer (id, name, age, email) VALUES (:id, :name, 30, :email)"),
+                {"id": id, "name": f"Customer {id}", "email": f"customer{id}@example.com"},
+            )
+            conn.execute(
+                text("INSERT INTO customerplan (customer_id, plan_id, status) VALUES (:id, :plan, :status)"),
+                {"id": id, "plan": 1 + id % 2, "status": "active" if id % 3 else "inactive"},
+            )
+        for id in range(1, TRANSACTIONS + 1):
+            conn.execute(
+                text('INSERT INTO "transaction" (id, amount, description, customer_id) VALUES (:id, 100, \'Old\', :customer)'),
+                {"id": id, "customer": 1 + id % CUSTOMERS},
+            )
+
+
+def migration_row(engine, version: int) -> SchemaMigration:
+    with Session(engine) as session:
+        return session.get(SchemaMigration, version)
+
+
+def test_upgrade_baseline_database(tmp_path, settings):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = build_engine(url)
+    create_baseline(engine)
+
+    create_db_and_tables(engine)
+
+    columns = {table: {column["name"] for column in inspect(engine).get_columns(table)}
+               for table in ("transaction", "customer", "plan", "planoperation", "idempotencyrecord")}
+    assert {"plan_id", "created_at"} <= columns["transaction"]
+    assert "deleted_at" in columns["customer"]
+    assert "active_member_count" in columns["plan"]
+    assert {"claim_token", "lease_expires_at"} <= columns["planoperation"]
+    assert "claimed_until" in columns["idempotencyrecord"]
+    status = {entry["version"]: entry["status"] for entry in MigrationRunner().get_status(engine)}
+    assert status == {
+        migration.version: "pending" if migration.backfill is not None else "completed"
+        for migration in MIGRATIONS
+    }
+
+    # Interrupted after its first batch, as by a shutdown
+    runner = MigrationRunner(batch_size=50, throttle_seconds=0.01)
+    runner._stop.wait = lambda timeout: runner._stop.set()
+    assert runner.run_backfills(engine) == 50
+    paused = migration_row(engine, 1)
+    assert paused.status == "running"
+    assert paused.backfill_cursor == 50
+    assert paused.lease_expires_at is None
+
+    # A later run picks up where it stopped
+    MigrationRunner(batch_size=50, throttle_seconds=0).run_backfills(engine)
+    assert {entry["status"] for entry in MigrationRunner().get_status(engine)} == {"completed"}
+    assert migration_row(engine, 1).rows_backfilled == TRANSACTIONS
+    with Session(engine) as session:
+        assert session.exec(select(func.count()).where(Transaction.created_at.is_(None))).one() == 0
+        for plan in session.exec(select(Plan)).all():
+            members = session.exec(
+                select(func.count()).where(CustomerPlan.plan_id == plan.id, CustomerPlan.status == StatusEnum.active)
+            ).one()
+            assert plan.active_member_count == members
+    engine.dispose()
+
+    # The app serves the upgraded database
+    app = create_app(settings.model_copy(update={"database_url": url, "startup_seed_demo_data": False}))
+    with TestClient(app) as client:
+        client.auth = AUTH
+        response = client.get("/api/v1/transactions", params={"limit": 1})
+        assert response.status_code == 200, response.text
+        assert response.json()["data"]["total"] == TRANSACTIONS
+        response = client.post("/api/v1/customers", json={"name": "New Customer", "age": 25, "email": "new@example.com"})
+        assert response.status_code == 201, response.text
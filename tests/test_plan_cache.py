@@ -0,0 +1,46 @@
+"""Plans read through the shared cache, or the request's session without it."""
+
+import pytest
+
+from app.db.shared_cache import shared_cache
+from app.services import plan as plan_module
+
+
+@pytest.fixture
+def sessions_opened(monkeypatch):
+    """Sessions the plan service opens besides the request's."""
+    opened = []
+    session = plan_module.Session
+
+    def counting(*args, **kwargs):
+        opened.append(args)
+        return session(*args, **kwargs)
+
+    monkeypatch.setattr(plan_module, "Session", counting)
+    return opened
+
+
+def test_without_shared_cache_plans_use_the_request_session(client, sessions_opened):
+    assert not shared_cache.enabled
+
+    assert client.get("/api/v1/plans/2").json()["data"]["name"] == "Pro Plan"
+    assert client.get("/api/v1/plans").json()["data"]["total"] == 3
+    assert client.get("/api/v1/plans/99").status_code == 404
+
+    assert sessions_opened == []
+
+
+def test_shared_cache_loads_each_plan_once_from_the_primary(client, sessions_opened, monkeypatch):
+    monkeypatch.setattr(shared_cache, "_buffer", None)
+    shared_cache.allocate()
+
+    for _ in range(3):
+        assert client.get("/api/v1/plans/2").json()["data"]["name"] == "Pro Plan"
+        assert client.get("/api/v1/plans").json()["data"]["total"] == 3
+    assert len(sessions_opened) == 2
+
+    # A write invalidates the cached plan and pages when it commits
+    assert client.patch("/api/v1/plans/2", json={"name": "Pro Plus", "price": 2999, "description": "Professional membership"}).status_code == 200
+    assert client.get("/api/v1/plans/2").json()["data"]["name"] == "Pro Plus"
+    assert [plan["name"] for plan in client.get("/api/v1/plans").json()["data"]["items"]][1] == "Pro Plus"
+    assert len(sessions_opened) == 4
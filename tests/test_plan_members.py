@@ -0,0 +1,50 @@
+"""Plan members, keyset-paginated, and the denormalized member counts."""
+
+from sqlalchemy import update
+from sqlmodel import func, select
+
+from app.models import CustomerPlan, Plan, StatusEnum
+from app.services.plan import plan_service
+from app.services.purge import purge_service
+
+
+def members(client, plan_id: int, **params) -> list:
+    ids, cursor = [], None
+    while True:
+        page = client.get(f"/api/v1/plans/{plan_id}/customers", params={**params, "limit": 2, "cursor": cursor}).json()["data"]
+        ids += [customer["id"] for customer in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def member_count(client, plan_id: int) -> int:
+    return client.get(f"/api/v1/plans/{plan_id}").json()["data"]["active_member_count"]
+
+
+def test_members_are_paged_in_customer_order_and_counted(client, session, monkeypatch):
+    monkeypatch.setattr(purge_service, "run", lambda db, job_id: None)
+    pro = 2
+    for customer_id in (4, 3, 2):
+        assert client.post(f"/api/v1/customers/{customer_id}/plans/{pro}").status_code == 200
+
+    assert members(client, pro) == [1, 2, 3, 4, 5]
+    assert members(client, pro, status="inactive") == []
+    assert member_count(client, pro) == 5
+
+    assert client.delete(f"/api/v1/customers/3/plans/{pro}").status_code == 200
+    # Soft-deleted customers are no longer members
+    assert client.delete("/api/v1/customers/4").status_code == 200
+
+    assert members(client, pro) == [1, 2, 5]
+    assert member_count(client, pro) == 3
+    # A recount agrees with the maintained counts
+    session.exec(update(Plan).values(active_member_count=0))
+    session.commit()
+    plan_service.recount_members(session)
+    for plan in session.exec(select(Plan)).all():
+        session.refresh(plan)
+        active = session.exec(
+            select(func.count()).where(CustomerPlan.plan_id == plan.id, CustomerPlan.status == StatusEnum.active)
+        ).one()
+        assert plan.active_member_count == active, plan.name
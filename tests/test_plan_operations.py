@@ -0,0 +1,61 @@
+"""Bulk plan operations, applied one chunk of customers per commit."""
+
+from sqlmodel import func, select
+
+from app.models import ChangeLogEntry, JobStatusEnum, PlanOperationCreate
+from app.services.plan_operations import plan_operation_service
+
+BASIC, PRO, ENTERPRISE = 1, 2, 3
+
+
+def start(client, **operation) -> dict:
+    response = client.post("/api/v1/plan-operations", json={"chunk_size": 1, **operation})
+    assert response.status_code == 202, response.text
+    # Runs as a background task once the response is sent
+    return client.get(f"/api/v1/plan-operations/{response.json()['data']['id']}").json()["data"]
+
+
+def members(client, plan_id: int) -> list:
+    return [customer["id"] for customer in client.get(f"/api/v1/plans/{plan_id}/customers").json()["data"]["items"]]
+
+
+def member_count(client, plan_id: int) -> int:
+    return client.get(f"/api/v1/plans/{plan_id}").json()["data"]["active_member_count"]
+
+
+def test_migrate_moves_members_once_and_keeps_counts_and_entitlements(client, session):
+    # Alice is on both plans: she must not end up with two Pro memberships
+    assert client.post(f"/api/v1/customers/4/plans/{PRO}").status_code == 200
+
+    operation = start(client, kind="migrate", plan_id=BASIC, target_plan_id=PRO)
+
+    assert (operation["status"], operation["progress"], operation["customers_processed"]) == ("completed", 1.0, 2)
+    assert members(client, BASIC) == []
+    assert members(client, PRO) == [1, 3, 4, 5]
+    assert (member_count(client, BASIC), member_count(client, PRO)) == (0, 4)
+    assert client.get("/api/v1/entitlements/4").json()["data"]["plan_ids"] == [PRO]
+    # One change per chunk
+    assert session.exec(select(func.count()).where(ChangeLogEntry.entity == "plan_members")).one() == 2
+
+
+def test_attach_and_set_status(client):
+    operation = start(client, kind="attach", plan_id=ENTERPRISE, has_plan_id=PRO)
+    assert (operation["status"], operation["memberships_changed"]) == ("completed", 2)
+    assert members(client, ENTERPRISE) == [1, 2, 5]
+    assert member_count(client, ENTERPRISE) == 3
+
+    operation = start(client, kind="set_status", plan_id=PRO, new_status="inactive", last_customer_id=4)
+    assert (operation["status"], operation["memberships_changed"]) == ("completed", 1)
+    assert member_count(client, PRO) == 1
+    assert client.get("/api/v1/entitlements/1").json()["data"]["plan_ids"] == [ENTERPRISE]
+    assert client.get("/api/v1/entitlements/5").json()["data"]["plan_ids"] == [PRO, ENTERPRISE]
+
+
+def test_leased_operation_is_left_to_its_runner(client, session):
+    operation = plan_operation_service.create(session, PlanOperationCreate(kind="attach", plan_id=ENTERPRISE))
+    assert plan_operation_service._claim(session, operation.id) is not None
+
+    result = plan_operation_service.run(session, operation.id)
+
+    assert (result.status, result.cursor, result.customers_processed) == (JobStatusEnum.running, 0, 0)
+    assert member_count(client, ENTERPRISE) == 1
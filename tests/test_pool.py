@@ -0,0 +1,62 @@
+"""Connection pool sizing, warmup and telemetry."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from app.db import db as database
+from app.db.pool import InstrumentedQueuePool, get_pool_stats, warm_up
+from app.main import create_app
+from tests.conftest import AUTH
+
+
+def test_exhausted_pool_counts_saturated_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        stats = get_pool_stats(engine)
+        assert (stats["checkouts"], stats["saturated_checkouts"], stats["timeouts"]) == (2, 1, 1)
+        assert stats["wait_ms_max"] >= 50
+
+        # Counters survive the pool being re-created
+        engine.dispose()
+        assert get_pool_stats(engine)["timeouts"] == 1
+    finally:
+        engine.dispose()
+
+
+def test_warm_up_stops_at_pool_capacity(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=2, max_overflow=0, pool_timeout=0.01)
+    try:
+        assert warm_up(engine, 5) == 2
+        assert engine.pool.checkedin() == 2
+    finally:
+        engine.dispose()
+
+
+def test_app_warms_sized_pool_reports_it_and_disposes_on_shutdown(settings):
+    settings = settings.model_copy(update={
+        "db_pool_size": 3,
+        "db_max_overflow": 1,
+        "db_pool_warmup_connections": 2,
+        "db_query_cache_size": 100,
+    })
+    with TestClient(create_app(settings)) as client:
+        client.auth = AUTH
+        assert client.get("/api/v1/plans").status_code == 200
+
+        response = client.get("/api/v1/admin/pool")
+        assert response.status_code == 200, response.text
+        primary = response.json()["data"]["primary"]
+        assert (primary["pool_class"], primary["size"], primary["max_overflow"]) == ("InstrumentedQueuePool", 3, 1)
+        assert primary["checked_in"] >= 2
+        assert primary["compiled_cache"]["capacity"] == 100
+        assert primary["compiled_cache"]["entries"] > 0
+
+    assert database.engine.pool.checkedin() == 0
@@ -0,0 +1,41 @@
+"""Customer deletion and background purge."""
+
+from sqlmodel import func, select
+
+from app.models import Transaction
+from app.services.purge import purge_service
+
+
+def test_deleted_customer_is_hidden_then_purged_in_chunks(client, session, monkeypatch):
+    monkeypatch.setattr(purge_service, "chunk_size", 10)
+    monkeypatch.setattr(purge_service, "throttle_seconds", 0)
+    customer = client.post("/api/v1/customers", json={"name": "Leaving Soon", "age": 50, "email": "leaving@example.com"}).json()["data"]
+    for n in range(25):
+        client.post("/api/v1/transactions", json={"customer_id": customer["id"], "amount": 10, "description": f"Payment {n}"})
+    client.post("/api/v1/analytics/refresh")
+
+    # The purge runs as a background task once the response is sent
+    response = client.delete(f"/api/v1/customers/{customer['id']}")
+    assert response.status_code == 200, response.text
+
+    assert client.get(f"/api/v1/customers/{customer['id']}").status_code == 404
+    job = client.get(f"/api/v1/customers/{customer['id']}/purge").json()["data"]
+    assert (job["status"], job["transactions_total"], job["transactions_deleted"], job["progress"]) == ("completed", 25, 25, 1.0)
+    assert session.exec(select(func.count()).where(Transaction.customer_id == customer["id"])).one() == 0
+
+    summary = client.get("/api/v1/analytics/summary").json()["data"]
+    assert summary["total_revenue"] == session.exec(select(func.sum(Transaction.amount))).one()
+    top = client.get("/api/v1/analytics/top-customers", params={"n": 100}).json()["data"]
+    assert customer["id"] not in {row["customer_id"] for row in top}
+
+
+def test_email_of_deleted_customer_can_be_reused(client, monkeypatch):
+    # Keep the soft-deleted row around, as while its purge is still running
+    monkeypatch.setattr(purge_service, "run", lambda db, job_id: None)
+    first = client.post("/api/v1/customers", json={"name": "First Owner", "age": 30, "email": "reused@example.com"}).json()["data"]
+    assert client.delete(f"/api/v1/customers/{first['id']}").status_code == 200
+
+    response = client.post("/api/v1/customers", json={"name": "Second Owner", "age": 30, "email": "reused@example.com"})
+
+    assert response.status_code == 201, response.text
+    assert response.json()["data"]["id"] != first["id"]
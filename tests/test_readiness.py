@@ -0,0 +1,71 @@
+"""The readiness probe and the shutdown drain."""
+
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.readiness import ReadinessProbe, drain
+from app.db import db as database
+from app.main import create_app
+
+
+def ready(client):
+    response = client.get("/ready")
+    return response.status_code, response.json()["data"]
+
+
+def test_ready_checks_database_pool_and_event_loop(client):
+    code, result = ready(client)
+
+    assert (code, result["status"]) == (200, "ready")
+    assert set(result["checks"]) == {"event_loop", "pool", "database"}
+    assert all(check["ok"] for check in result["checks"].values())
+
+
+def test_failed_check_makes_the_app_not_ready(settings):
+    with TestClient(create_app(settings.model_copy(update={"ready_min_pool_headroom": 1_000}))) as client:
+        code, result = ready(client)
+
+    assert (code, result["status"]) == (503, "not_ready")
+    assert not result["checks"]["pool"]["ok"]
+    assert result["checks"]["database"]["ok"]
+
+
+def test_draining_fails_at_once_and_a_new_app_serves_again(settings):
+    with TestClient(create_app(settings)) as client:
+        assert ready(client)[0] == 200
+        drain.begin("test")
+        assert ready(client) == (503, {"ready": False, "status": "draining", "checks": {}})
+
+    # Shutdown drained, then disposed the engines
+    assert drain.draining
+    assert database.engine.pool.checkedin() == 0
+
+    with TestClient(create_app(settings)) as client:
+        assert ready(client)[0] == 200
+
+
+def test_probes_share_one_check_within_the_ttl(monkeypatch):
+    # Left draining by the last app's shutdown
+    monkeypatch.setattr(drain, "started", None)
+    probe = ReadinessProbe(cache_ttl=60)
+    runs = []
+
+    async def run_checks():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        probe._result = {"ready": True, "status": "ready", "checks": {}}
+        probe._checked_at = time.monotonic()
+        return probe._result
+
+    monkeypatch.setattr(probe, "_run_checks", run_checks)
+
+    async def probes():
+        results = await asyncio.gather(*(probe.check() for _ in range(5)))
+        return results + [await probe.check()]
+
+    results = asyncio.run(probes())
+    assert len(runs) == 1
+    assert all(result["ready"] for result in results)
+    assert asyncio.run(probe.check(started=False))["status"] == "starting"
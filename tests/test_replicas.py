@@ -0,0 +1,92 @@
+"""Read-replica routing, with two SQLite files as primary and replica."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlmodel import SQLModel, select
+
+from app.db.db import build_engine
+from app.db.replicas import ReadYourWritesMiddleware, ReplicaPool, RoutingSession, replica_reads_allowed
+from app.models import Plan
+
+
+@pytest.fixture
+def primary(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def replica_path(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    return tmp_path / "replica.db"
+
+
+@pytest.fixture
+def replica(replica_path):
+    # Read-only, so a missing file fails instead of being created
+    engine = build_engine(f"sqlite:///file:{replica_path}?mode=ro&uri=true")
+    yield engine
+    engine.dispose()
+
+
+def test_session_reads_from_replica_until_it_writes(primary, replica):
+    with RoutingSession(primary, replica) as session:
+        assert session.get_bind(clause=select(Plan)) is replica
+        assert session.get_bind(clause=select(Plan).with_for_update()) is primary
+        # Locking reads count as writes: everything after them uses the primary
+        assert session.get_bind(clause=select(Plan)) is primary
+
+    with RoutingSession(primary, replica) as session:
+        assert session.get_bind(clause=update(Plan).values(name="x")) is primary
+        assert session.get_bind(clause=select(Plan)) is primary
+
+    with RoutingSession(primary, replica) as session:
+        session.add(Plan(name="Gold", description="Premium", price=30.0))
+        session.commit()
+        assert session.exec(select(Plan)).all()[0].name == "Gold"
+
+    with RoutingSession(primary) as session:
+        assert session.get_bind(clause=select(Plan)) is primary
+
+
+def test_writes_pin_the_client_to_the_primary():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(replica_reads_allowed.get())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    client = TestClient(ReadYourWritesMiddleware(app, pin_seconds=60))
+    assert "x-read-primary-until" not in client.get("/").headers
+    response = client.post("/")
+    until = response.headers["x-read-primary-until"]
+    assert response.cookies["read_primary_until"] == until
+
+    client.get("/")
+    client.cookies.clear()
+    client.get("/", headers={"X-Read-Primary-Until": until})
+    client.get("/")
+
+    assert seen == [True, False, False, False, True]
+
+
+def test_pool_fails_over_to_the_primary_when_the_replica_goes_away(replica, replica_path):
+    pool = ReplicaPool([replica], check_interval=0)
+    assert pool.choose() is replica
+
+    replica.dispose()
+    replica_path.unlink()
+
+    assert pool.choose() is None
+    stats = pool.get_stats()["replicas"][0]
+    assert (stats["healthy"], stats["failures"], stats["reads"]) == (False, 1, 1)
+
+    # Back in rotation once a probe succeeds again
+    create_engine(f"sqlite:///{replica_path}").connect().close()
+    assert pool.choose() is replica
@@ -0,0 +1,44 @@
+"""Customer search."""
+
+
+def search(client, q: str, **params) -> dict:
+    response = client.get("/api/v1/customers/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def create(client, name: str, email: str, description: str = None) -> dict:
+    response = client.post("/api/v1/customers", json={"name": name, "age": 30, "email": email, "description": description})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]
+
+
+def test_search_matches_prefixes_of_name_email_and_description(client):
+    zelda = create(client, "Zelda Quartermaine", "zq@example.com", "Prefers annual billing")
+
+    assert [c["id"] for c in search(client, "quarter")["items"]] == [zelda["id"]]
+    assert [c["id"] for c in search(client, "zq@example")["items"]] == [zelda["id"]]
+    assert [c["id"] for c in search(client, "annual")["items"]] == [zelda["id"]]
+    assert search(client, "nomatchxyz")["items"] == []
+
+
+def test_index_follows_updates_and_deletes(client):
+    customer = create(client, "Original Name", "renamed@example.com")
+    response = client.patch(f"/api/v1/customers/{customer['id']}", json={"name": "Brandnew Name", "age": 30, "email": "renamed@example.com"})
+    assert response.status_code == 200, response.text
+
+    assert search(client, "original")["items"] == []
+    assert [c["id"] for c in search(client, "brandnew")["items"]] == [customer["id"]]
+
+    assert client.delete(f"/api/v1/customers/{customer['id']}").status_code == 200
+    assert search(client, "brandnew")["items"] == []
+
+
+def test_results_page_with_a_cursor(client):
+    ids = {create(client, f"Pager Person {n}", f"pager{n}@example.com")["id"] for n in range(5)}
+
+    first = search(client, "pager", limit=3)
+    second = search(client, "pager", limit=3, cursor=first["next_cursor"])
+
+    assert len(first["items"]) == 3 and first["next_cursor"]
+    assert {c["id"] for c in first["items"] + second["items"]} == ids
@@ -0,0 +1,69 @@
+"""Request coalescing."""
+
+import asyncio
+import threading
+import time
+
+from app.services.single_flight import SingleFlight
+
+
+class SlowService:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get(self, db, id: int) -> dict:
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.05)
+        if id < 0:
+            raise LookupError(id)
+        return {"id": id, "session": db}
+
+
+async def gather(single_flight: SingleFlight, endpoint: str, method, *ids: int) -> list:
+    return await asyncio.gather(
+        *(single_flight.run(endpoint, method, "session", id) for id in ids), return_exceptions=True
+    )
+
+
+def test_concurrent_identical_reads_share_one_call():
+    service = SlowService()
+    single_flight = SingleFlight(["get"])
+
+    results = asyncio.run(gather(single_flight, "get", service.get, 1, 1, 1, 2))
+
+    assert results == [{"id": 1, "session": "session"}] * 3 + [{"id": 2, "session": "session"}]
+    assert service.calls == 2
+    stats = single_flight.get_stats()
+    assert (stats["calls"], stats["executions"], stats["in_flight"]) == (4, 2, 0)
+
+
+def test_waiters_get_the_same_exception():
+    service = SlowService()
+
+    results = asyncio.run(gather(SingleFlight(["get"]), "get", service.get, -1, -1))
+
+    assert [type(result) for result in results] == [LookupError, LookupError]
+    assert service.calls == 1
+
+
+def test_endpoints_not_opted_in_call_through():
+    service = SlowService()
+
+    results = asyncio.run(gather(SingleFlight([]), "get", service.get, 1, 1))
+
+    assert results == [{"id": 1, "session": "session"}] * 2
+    assert service.calls == 2
+
+
+def test_opted_in_endpoint_returns_plan_json(client):
+    from app.services.single_flight import single_flight
+
+    single_flight.endpoints.add("get_plan")
+    try:
+        response = client.get("/api/v1/plans/1")
+    finally:
+        single_flight.endpoints.discard("get_plan")
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["id"] == 1
@@ -0,0 +1,69 @@
+"""Per-tenant databases: the engine registry and the tenant header."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.db import db as database
+from app.db.tenancy import EngineRegistry
+from app.main import create_app
+from tests.conftest import AUTH
+
+
+def test_registry_creates_once_per_tenant_and_evicts_least_recently_used():
+    created = []
+
+    def factory(tenant):
+        created.append(tenant)
+        return create_engine("sqlite://")
+
+    registry = EngineRegistry(factory, max_engines=2)
+    a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is a
+    registry.get("c")
+
+    stats = registry.get_stats()
+    assert created == ["a", "b", "c"]
+    assert stats["open"] == ["a", "c"]
+    assert (stats["created"], stats["evicted"]) == (3, 1)
+
+    registry.get("b")
+    assert created == ["a", "b", "c", "b"]
+    registry.dispose_all()
+    assert registry.items() == []
+
+
+@pytest.fixture
+def tenant_client(settings, tmp_path):
+    settings = settings.model_copy(update={
+        "tenants": ["acme"],
+        "tenant_database_url": f"sqlite:///{tmp_path}/tenants/{{tenant}}.db",
+    })
+    with TestClient(create_app(settings)) as client:
+        client.auth = AUTH
+        yield client
+
+
+def test_tenant_header_routes_to_the_tenant_database(tenant_client, tmp_path):
+    acme = {"X-Tenant-ID": "acme"}
+    response = tenant_client.post("/api/v1/customers", headers=acme,
+                                  json={"name": "Acme Buyer", "age": 40, "email": "buyer@acme.example"})
+    assert response.status_code == 201, response.text
+    customer_id = response.json()["data"]["id"]
+
+    emails = {c["email"] for c in tenant_client.get("/api/v1/customers", headers=acme, params={"limit": 100}).json()["data"]["items"]}
+    default = {c["email"] for c in tenant_client.get("/api/v1/customers", params={"limit": 100}).json()["data"]["items"]}
+    assert "buyer@acme.example" in emails
+    assert "buyer@acme.example" not in default
+    assert tenant_client.get(f"/api/v1/customers/{customer_id}", headers=acme).json()["data"]["email"] == "buyer@acme.example"
+
+    assert (tmp_path / "tenants" / "acme.db").exists()
+    assert database.tenant_engines.get_stats()["open"] == ["acme"]
+
+
+def test_unknown_tenant_is_rejected(tenant_client):
+    response = tenant_client.get("/api/v1/customers", headers={"X-Tenant-ID": "globex"})
+
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "UNKNOWN_TENANT"
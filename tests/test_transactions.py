@@ -0,0 +1,51 @@
+"""Transaction time ranges and time series."""
+
+from datetime import datetime, timezone
+
+from app.models import Transaction
+from app.services.analytics import analytics_service
+
+DAYS = {
+    datetime(2024, 3, 1, 9, tzinfo=timezone.utc): 100,
+    datetime(2024, 3, 1, 23, 59, tzinfo=timezone.utc): 200,
+    datetime(2024, 3, 2, 0, 0, tzinfo=timezone.utc): 400,
+    datetime(2024, 3, 9, 12, tzinfo=timezone.utc): 800,
+}
+
+
+def add_dated_transactions(session) -> None:
+    for created_at, amount in DAYS.items():
+        session.add(Transaction(customer_id=1, amount=amount, description="Dated", created_at=created_at))
+    session.commit()
+
+
+def timeseries(client, **params) -> list:
+    response = client.get("/api/v1/transactions/timeseries", params=params)
+    assert response.status_code == 200, response.text
+    return [(point["bucket"], point["amount"], point["transaction_count"]) for point in response.json()["data"]]
+
+
+def test_range_filter_is_half_open(client, session):
+    add_dated_transactions(session)
+
+    response = client.get("/api/v1/transactions", params={"from": "2024-03-01T00:00:00Z", "to": "2024-03-02T00:00:00Z"})
+
+    assert response.status_code == 200, response.text
+    assert sorted(item["amount"] for item in response.json()["data"]["items"]) == [100, 200]
+
+
+def test_timeseries_buckets(client, session):
+    add_dated_transactions(session)
+    march = {"from": "2024-03-01T00:00:00Z", "to": "2024-04-01T00:00:00Z"}
+
+    expected_days = [("2024-03-01", 300, 2), ("2024-03-02", 400, 1), ("2024-03-09", 800, 1)]
+    assert timeseries(client, bucket="day", **march) == expected_days
+    assert timeseries(client, bucket="week", **march) == [("2024-02-26", 700, 3), ("2024-03-04", 800, 1)]
+    assert timeseries(client, bucket="month", **march) == [("2024-03-01", 1500, 4)]
+
+    # Closed days are read from the daily buckets with the same result
+    analytics_service.close_days(session)
+    assert timeseries(client, bucket="day", **march) == expected_days
+    assert timeseries(client, bucket="day", **{"from": "2024-03-01T12:00:00Z", "to": "2024-03-09T00:00:00Z"}) == [
+        ("2024-03-01", 200, 1), ("2024-03-02", 400, 1),
+    ]
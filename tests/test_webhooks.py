@@ -0,0 +1,91 @@
+"""Webhook outbox, delivery and retries."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlmodel import select, update
+
+from app.db import db as database
+from app.models import DeliveryStatusEnum, WebhookDelivery
+from app.services.webhooks import WebhookDispatcher, sign, webhook_service
+
+
+def register(client, **endpoint) -> dict:
+    response = client.post("/api/v1/webhooks/endpoints", json=endpoint)
+    assert response.status_code == 201, response.text
+    return response.json()["data"]
+
+
+def create_transaction(client) -> dict:
+    response = client.post("/api/v1/transactions", json={"customer_id": 1, "amount": 300, "description": "Hooked"})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]
+
+
+def deliveries(session) -> list:
+    session.expire_all()
+    return session.exec(select(WebhookDelivery).order_by(WebhookDelivery.id)).all()
+
+
+def make_due(session) -> None:
+    session.exec(update(WebhookDelivery).values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    session.commit()
+
+
+def dispatch(handler) -> None:
+    """Fan out, claim and send what is due once, answering with ``handler``."""
+    async def run() -> None:
+        dispatcher = WebhookDispatcher(webhook_service, engine=database.engine)
+        dispatcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        await dispatcher.dispatch_once()
+        await dispatcher.drain()
+        await dispatcher._client.aclose()
+
+    asyncio.run(run())
+
+
+def test_fan_out_retry_and_delivery(client, session):
+    endpoint = register(client, url="http://hooks.test/all", secret="s3cret")
+    register(client, url="http://hooks.test/plans", event_types="customer.plan_added")
+    transaction = create_transaction(client)
+
+    dispatch(lambda request: httpx.Response(500))
+    (delivery,) = deliveries(session)
+    assert delivery.endpoint_id == endpoint["id"]
+    assert (delivery.status, delivery.attempts, delivery.last_error) == (DeliveryStatusEnum.pending, 1, "HTTP 500")
+    assert delivery.next_attempt_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+
+    received = []
+
+    def accept(request: httpx.Request) -> httpx.Response:
+        assert request.headers["X-Webhook-Signature"] == sign("s3cret", request.content)
+        received.extend(json.loads(request.content)["events"])
+        return httpx.Response(204)
+
+    make_due(session)
+    dispatch(accept)
+    (delivery,) = deliveries(session)
+    assert (delivery.status, delivery.attempts) == (DeliveryStatusEnum.delivered, 2)
+    assert [(event["type"], event["data"]["id"]) for event in received] == [("transaction.created", transaction["id"])]
+
+
+def test_outcomes_of_an_expired_claim_are_ignored(client, session):
+    register(client, url="http://hooks.test/all")
+    create_transaction(client)
+    webhook_service.fan_out(session)
+
+    (stale,) = webhook_service.claim_due(session)
+    make_due(session)
+    (current,) = webhook_service.claim_due(session)
+    ids = [current["delivery_id"]]
+    assert current["claim_token"] != stale["claim_token"]
+
+    assert webhook_service.record_delivered(session, ids, stale["claim_token"]) == 0
+    assert webhook_service.record_failed(session, ids, stale["claim_token"], "timeout") == 0
+    (delivery,) = deliveries(session)
+    assert (delivery.status, delivery.attempts) == (DeliveryStatusEnum.pending, 0)
+
+    assert webhook_service.record_delivered(session, ids, current["claim_token"]) == 1
+    assert deliveries(session)[0].status == DeliveryStatusEnum.delivered